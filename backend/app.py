@@ -1,28 +1,52 @@
-from flask import Flask, request, jsonify
-from flask_cors import CORS
+import time
+_import_started = time.perf_counter()
+
 import os
-import tempfile
-from werkzeug.utils import secure_filename
 from datetime import datetime
 import csv
 import random
 import logging
 import sys
 import argparse
+import threading
+import atexit
+import contextvars
+import secrets
+from contextlib import contextmanager
+
+from bm25_index import BM25Index
+from typo_index import TypoIndex
+from normalizer import Normalizer
+from tokenizer import tokenize
+from intents import IntentRouter
+from change_log import ChangeLog
+from list_pages import ListPages
+from query_cache import QueryCache
+from suggest_index import SuggestIndex
+from journal import Journal, SYNC_POLICIES
+from persistence import BackgroundWriter
+from sqlite_store import SQLiteStore
+from kb_snapshot import KBSnapshot, SnapshotQuestions, compile_snapshot
+from file_watcher import FileWatcher
+from kb_state import KBState, trivia_record
+from compact_store import CompactQuestions, PagedStringTable, TriviaQuestion, memory_report
+from trivia_sessions import TriviaGame, TriviaSessions
+from csv_import import (ImportJob, ImportJobs, StagedImport, CONFLICT_POLICIES,
+                        expand_import_paths, find_conflicts, row_records, stage_csv_file)
+
+# The trivia game of the request being served; see ChatBot.trivia_session()
+_current_trivia_game = contextvars.ContextVar("trivia_game", default=None)
+
+# (phase, seconds) in the order they ran, reported by --profile-startup
+startup_timings = [("import modules", time.perf_counter() - _import_started)]
 
-app = Flask(__name__)
-CORS(app, resources={
-    r"/api/*": {
-        "origins": ["http://localhost:3000", "http://localhost:3001"],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    },
-    r"/trivia/*": {
-        "origins": ["http://localhost:3000", "http://localhost:3001"],
-        "methods": ["GET", "POST", "OPTIONS"],
-        "allow_headers": ["Content-Type"]
-    }
-})
+@contextmanager
+def timed(phase):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        startup_timings.append((phase, time.perf_counter() - started))
 
 class MyArgumentParser(argparse.ArgumentParser):
     def error(self, message):
@@ -31,24 +55,75 @@ class MyArgumentParser(argparse.ArgumentParser):
         self.exit(2, f'{self.prog}: error: {message}\n')
 
 class ChatBot:
-    def __init__(self):
-        self.questions = {}
-        self.trivia_questions = []
-        self.trivia_active = False
-        self.trivia_score = 0
-        self.trivia_total = 0
-        self.current_trivia_question = None
-        self.trivia_questions_remaining = []
+    def __init__(self, snapshot_path="questions.kb", answer_cache_bytes=None):
+        # With a cache budget, answer bodies are paged to disk (see _new_question_store)
+        self.answer_cache_bytes = answer_cache_bytes
+        # The published KB. Readers take this reference once per request and
+        # need no lock; writers publish a new KBState (see _editing)
+        self.kb = KBState(0, self._new_question_store(), [])
+        # Serializes writers; readers only wait on it for the first index build
+        self.kb_lock = threading.RLock()
+        # Game used outside any session (CLI); the API plays one game per session
+        self.default_trivia_game = TriviaGame()
+        self.trivia_sessions = TriviaSessions()
         self.DEBUG = False
+        # Append-only edit log; None means every edit rewrites the CSVs
+        self.journal = None
+        # Debounced writer thread; None means edits save synchronously
+        self.writer = None
+        # SQLite storage backend; None means the CSV files are the store
+        self.store = None
+        self.store_seq = 0
+        # Writer process edits are sent to (a prefork worker's WriterClient);
+        # None means edits apply to this KB
+        self.primary = None
+        # Called with (version, records) for every published edit
+        self.change_listeners = []
+        
+        # Minimum cosine similarity for a fuzzy match to count as an answer;
+        # a question matching one of two topic words scores about 0.45
+        self.match_threshold = 0.6
+        self.normalizer = Normalizer()
+        # Edits that added or removed keys, and how many of them the TF-IDF
+        # index (rebuilt in the background, see _refresh_tfidf) reflects
+        self.key_changes = 0
+        self.tfidf_changes = 0
+        self.tfidf_rebuilding = False
+        self._reset_indexes()
+        
+        self.intent_router = IntentRouter()
+        self.register_builtin_intents()
+        
+        # Cached lookups carry the KB version they were made against
+        self.query_cache = QueryCache(max_size=1024, ttl=300)
+        # Serialized /api/question/list and /api/trivia/list responses
+        self.list_pages = ListPages()
+        # Tells this run's KB versions from another's, which also start at 0
+        self.kb_epoch = secrets.token_hex(4)
+        # Recent CSV imports (for progress reporting); one applies at a time
+        self.import_jobs = ImportJobs()
+        self.import_lock = threading.Lock()
+        self.watcher = None
         
-        # Load existing data
-        self.load_questions_from_csv("questions.csv")
-        self.load_trivia_from_csv("trivia.csv")
+        # Load existing data, from the compiled snapshot when it is current
+        self.snapshot = None
+        if self.snapshot_is_current(snapshot_path):
+            with timed("map snapshot"):
+                self.load_snapshot(snapshot_path)
+        else:
+            with timed("load questions"):
+                self.load_questions_from_csv("questions.csv")
+            with timed("load trivia"):
+                self.load_trivia_from_csv("trivia.csv")
         
-        # Create default trivia if none exists
+        # Create default trivia if none exists; it reaches trivia.csv with
+        # the next trivia save rather than making every start write a file
         if not self.trivia_questions:
             self.create_default_trivia()
-            self.save_trivia_to_csv("trivia.csv")
+        
+        # Edits from here on, for /api/changes; the initial load isn't one
+        self.change_log = ChangeLog(self.kb.version)
+        self.change_listeners.append(self.change_log.record)
     
     def setup_logging(self, enable_logging, log_level):
         if enable_logging:
@@ -67,16 +142,28 @@ class ChatBot:
     def get_current_date(self):
         return datetime.now().strftime("%Y-%m-%d")
     
-    def save_questions_to_csv(self, filename="questions.csv"):
+    def save_questions_to_csv(self, filename="questions.csv", questions=None):
+        if questions is None:
+            questions = self.questions
         try:
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
+            # Write a temp file and rename it over the original so a crash
+            # never leaves a half-written CSV behind
+            temp_filename = filename + ".tmp"
+            with open(temp_filename, mode='w', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
                 writer.writerow(['question', 'answer1', 'answer2', 'answer3', 'answer4'])
-                for question, answers in self.questions.items():
-                    row = [question] + list(answers)[:4] + [''] * (4 - len(answers))
+                for question, answers in questions.items():
+                    answers = list(answers)[:4]
+                    row = [question] + answers + [''] * (4 - len(answers))
                     writer.writerow(row)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_filename, filename)
+            if self.watcher is not None:
+                # Our own write, not an edit to reload
+                self.watcher.refresh(filename)
             if self.DEBUG:
-                print(f"DEBUG: Saved {len(self.questions)} questions to '{filename}'")
+                print(f"DEBUG: Saved {len(questions)} questions to '{filename}'")
             return True
         except Exception as e:
             logging.error(f"Failed to save questions to '{filename}': {str(e)}")
@@ -84,12 +171,15 @@ class ChatBot:
                 print(f"Error: Failed to save questions to '{filename}': {str(e)}")
             return False
     
-    def save_trivia_to_csv(self, filename="trivia.csv"):
+    def save_trivia_to_csv(self, filename="trivia.csv", trivia_questions=None):
+        if trivia_questions is None:
+            trivia_questions = self.trivia_questions
         try:
-            with open(filename, mode='w', newline='', encoding='utf-8') as file:
+            temp_filename = filename + ".tmp"
+            with open(temp_filename, mode='w', newline='', encoding='utf-8') as file:
                 writer = csv.writer(file)
                 writer.writerow(['question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer'])
-                for trivia in self.trivia_questions:
+                for trivia in trivia_questions:
                     row = [
                         trivia['question'],
                         trivia['options'][0],
@@ -99,8 +189,14 @@ class ChatBot:
                         trivia['correct_answer']
                     ]
                     writer.writerow(row)
+                file.flush()
+                os.fsync(file.fileno())
+            os.replace(temp_filename, filename)
+            if self.watcher is not None:
+                # Our own write, not an edit to reload
+                self.watcher.refresh(filename)
             if self.DEBUG:
-                print(f"DEBUG: Saved {len(self.trivia_questions)} trivia questions to '{filename}'")
+                print(f"DEBUG: Saved {len(trivia_questions)} trivia questions to '{filename}'")
             return True
         except Exception as e:
             logging.error(f"Failed to save trivia questions to '{filename}': {str(e)}")
@@ -189,7 +285,8 @@ class ChatBot:
                 'correct_answer': 'Writing assistance and tutoring'
             }
         ]
-        self.trivia_questions.extend(default_trivia)
+        with self._editing() as kb:
+            kb.trivia.extend(TriviaQuestion.from_mapping(item) for item in default_trivia)
         logging.info(f"Created {len(default_trivia)} default trivia questions")
     
     def load_trivia_from_csv(self, filename="trivia.csv"):
@@ -205,23 +302,10 @@ class ChatBot:
                             print(f"DEBUG: Invalid trivia CSV header on load: {header}")
                         return
                     
-                    count = 0
-                    for row in reader:
-                        question = row['question'].strip()
-                        options = [
-                            row['option_a'].strip(),
-                            row['option_b'].strip(),
-                            row['option_c'].strip(),
-                            row['option_d'].strip()
-                        ]
-                        correct_answer = row['correct_answer'].strip()
-                        if question and all(options) and correct_answer:
-                            self.trivia_questions.append({
-                                'question': question,
-                                'options': options,
-                                'correct_answer': correct_answer
-                            })
-                            count += 1
+                    items = list(self._read_trivia_rows(reader))
+                    with self._editing() as kb:
+                        kb.trivia.extend(items)
+                    count = len(items)
                     if self.DEBUG:
                         print(f"DEBUG: Loaded {count} trivia questions from '{filename}' on startup")
             except Exception as e:
@@ -244,14 +328,9 @@ class ChatBot:
                         return
                     
                     count = 0
-                    for row in reader:
-                        q = row['question'].strip().lower()
-                        answers = []
-                        for k in ['answer1', 'answer2', 'answer3', 'answer4']:
-                            if k in row and row[k].strip():
-                                answers.append(row[k].strip())
-                        if q and answers:
-                            self.questions[q] = answers
+                    with self._editing() as kb:
+                        for q, answers in self._read_question_rows(reader):
+                            kb.store_answers(q, answers)
                             count += 1
                     if self.DEBUG:
                         print(f"DEBUG: Loaded {count} questions from '{filename}' on startup")
@@ -262,16 +341,188 @@ class ChatBot:
         elif self.DEBUG:
             print(f"DEBUG: No questions.csv found at {filename} on startup")
     
+    def _read_trivia_rows(self, reader):
+        for row in reader:
+            question = row['question'].strip()
+            options = [
+                row['option_a'].strip(),
+                row['option_b'].strip(),
+                row['option_c'].strip(),
+                row['option_d'].strip()
+            ]
+            correct_answer = row['correct_answer'].strip()
+            if question and all(options) and correct_answer:
+                yield TriviaQuestion(question, options, correct_answer)
+    
+    def _read_question_rows(self, reader):
+        for row in reader:
+            q = row['question'].strip().lower()
+            answers = []
+            for k in ['answer1', 'answer2', 'answer3', 'answer4']:
+                if k in row and row[k].strip():
+                    answers.append(row[k].strip())
+            if q and answers:
+                yield q, answers
+    
+    def enable_hot_reload(self, interval=2.0):
+        """Poll questions.csv and trivia.csv and apply external edits as they land"""
+        if self.store is not None:
+            logging.warning("Hot reload is not available with SQLite storage")
+            return False
+        self.watcher = FileWatcher({
+            "questions.csv": self.reload_questions_from_csv,
+            "trivia.csv": self.reload_trivia_from_csv
+        }, interval=interval)
+        atexit.register(self.watcher.close)
+        return True
+    
+    def reload_questions_from_csv(self, filename="questions.csv"):
+        """Apply the difference between the questions CSV and the KB.
+
+        The file is parsed without holding kb_lock; only the changed entries
+        are then applied, and published as one new version, so queries see
+        the old or the new KB and never a mix. Edits the file doesn't hold
+        yet (see _unsaved_records) are kept on top of it, as a restart would.
+        Returns (added, changed, removed) counts, or None if the file could
+        not be read or the reload was skipped (the KB is left as it was).
+        """
+        with open(filename, mode='r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames
+            if not header or 'question' not in header or 'answer1' not in header:
+                logging.warning(f"Not reloading {filename}: invalid CSV header {header}")
+                return None
+            new_questions = dict(self._read_question_rows(reader))
+        
+        with self.kb_lock:
+            unsaved = self._unsaved_records()
+            if unsaved is None:
+                return None
+            # Applied to new_questions in place
+            expected = KBState(0, new_questions, [])
+            for record in unsaved:
+                if record["op"] not in ("add_trivia", "set_trivia"):
+                    self._apply_journal_record(expected, record)
+            questions = self.kb.questions
+            removed = [q for q in questions if q not in new_questions]
+            added = [q for q in new_questions if q not in questions]
+            changed = [q for q, answers in new_questions.items()
+                       if q in questions and questions[q] != answers]
+            if removed or added or changed:
+                with self._editing() as kb:
+                    for q in removed:
+                        kb.delete(q)
+                    for q in added + changed:
+                        kb.store_answers(q, new_questions[q])
+        
+        logging.info(f"Reloaded {filename}: {len(added)} added, {len(changed)} changed, {len(removed)} removed")
+        return len(added), len(changed), len(removed)
+    
+    def reload_trivia_from_csv(self, filename="trivia.csv"):
+        """Swap in the trivia questions from the CSV, plus those not saved to it
+        yet (see _unsaved_records); games in progress keep their questions"""
+        with open(filename, mode='r', encoding='utf-8', newline='') as f:
+            reader = csv.DictReader(f)
+            header = reader.fieldnames
+            required_headers = ['question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+            if not header or not all(h in header for h in required_headers):
+                logging.warning(f"Not reloading {filename}: invalid trivia CSV header {header}")
+                return None
+            trivia_questions = list(self._read_trivia_rows(reader))
+        
+        with self.kb_lock:
+            unsaved = self._unsaved_records()
+            if unsaved is None:
+                return None
+            # Applied to trivia_questions in place
+            expected = KBState(0, {}, trivia_questions)
+            for record in unsaved:
+                if record["op"] in ("add_trivia", "set_trivia"):
+                    self._apply_journal_record(expected, record)
+            with self._editing() as kb:
+                kb.trivia = expected.trivia
+        logging.info(f"Reloaded {len(trivia_questions)} trivia questions from {filename}")
+        return len(trivia_questions)
+    
+    @contextmanager
+    def trivia_session(self, session_id):
+        """Play the trivia game of session_id for the duration of the block.
+
+        In a prefork worker the game is kept by the writer, as the caller's
+        next request may reach another worker: it is checked out for the
+        block and checked back in if it changed (see WriterClient).
+
+        A session is only kept once its game starts, so callers that just
+        ask questions (scripts, clients without cookies) don't fill the
+        session table.
+        """
+        game = self.trivia_sessions.get(session_id, create=False)
+        kept = game is not None
+        if not kept:
+            game = TriviaGame(session_id)
+        with game.lock:
+            if self.primary is not None:
+                game.restore(self.primary.checkout_trivia_game(session_id))
+                before = game.state()
+            token = _current_trivia_game.set(game)
+            try:
+                yield game
+            finally:
+                _current_trivia_game.reset(token)
+                if self.primary is not None and game.state() != before:
+                    self.primary.checkin_trivia_game(session_id, game.state())
+            state = game.state() if not kept and game.active else None
+        if state is not None:
+            kept_game = self.trivia_sessions.add(game)
+            if kept_game is not game:
+                # Started by another request at the same time; the last one wins
+                with kept_game.lock:
+                    kept_game.restore(state)
+    
+    def has_trivia_session(self, session_id):
+        return session_id in self.trivia_sessions
+    
+    def trivia_session_stats(self):
+        if self.primary is not None:
+            return self.primary.call("trivia_session_stats")
+        self.trivia_sessions.expire()
+        return self.trivia_sessions.stats()
+    
+    @property
+    def trivia_game(self):
+        return _current_trivia_game.get() or self.default_trivia_game
+    
+    @property
+    def trivia_active(self):
+        return self.trivia_game.active
+    
+    @property
+    def trivia_score(self):
+        return self.trivia_game.score
+    
+    @property
+    def trivia_total(self):
+        return self.trivia_game.total
+    
+    @property
+    def current_trivia_question(self):
+        return self.trivia_game.current
+    
+    @property
+    def trivia_questions_remaining(self):
+        return self.trivia_game.remaining
+    
     def start_trivia_game(self, num_questions=10):
-        if len(self.trivia_questions) < num_questions:
+        trivia_questions = self.trivia_questions
+        if len(trivia_questions) < num_questions:
             if self.DEBUG:
-                print(f"Error: Not enough trivia questions available. Need {num_questions}, have {len(self.trivia_questions)}")
+                print(f"Error: Not enough trivia questions available. Need {num_questions}, have {len(trivia_questions)}")
             return False
         
-        self.trivia_active = True
-        self.trivia_score = 0
-        self.trivia_total = 0
-        self.trivia_questions_remaining = random.sample(self.trivia_questions, num_questions)
+        game = self.trivia_game
+        game.reset()
+        game.active = True
+        game.remaining = random.sample(trivia_questions, num_questions)
         
         if self.DEBUG:
             print("🎯 TRIVIA GAME ACTIVATED! 🎯")
@@ -280,20 +531,22 @@ class ChatBot:
         return True
     
     def ask_next_trivia_question(self):
-        if not self.trivia_questions_remaining:
+        game = self.trivia_game
+        if not game.remaining:
             self.end_trivia_game()
             return None
         
-        self.current_trivia_question = self.trivia_questions_remaining.pop(0)
+        game.current = game.remaining.pop(0)
         return {
-            'question': self.current_trivia_question['question'],
-            'options': self.current_trivia_question['options'],
-            'question_number': (self.trivia_total + 1),
-            'total_questions': (self.trivia_total + len(self.trivia_questions_remaining) + 1)
+            'question': game.current['question'],
+            'options': list(game.current['options']),
+            'question_number': (game.total + 1),
+            'total_questions': (game.total + len(game.remaining) + 1)
         }
     
     def process_trivia_answer(self, user_input):
-        if not self.trivia_active or not self.current_trivia_question:
+        game = self.trivia_game
+        if not game.active or not game.current:
             return "no_active_game"
         
         user_answer = user_input.strip().upper()
@@ -303,47 +556,40 @@ class ChatBot:
             return "invalid"
         
         selected_index = option_map[user_answer]
-        correct_index = self.current_trivia_question['options'].index(
-            self.current_trivia_question['correct_answer']
-        )
+        correct_index = game.current['options'].index(game.current['correct_answer'])
         
-        self.trivia_total += 1
+        game.total += 1
         result = "incorrect"
         
         if selected_index == correct_index:
-            self.trivia_score += 1
+            game.score += 1
             result = "correct"
         
-        correct_answer = self.current_trivia_question['correct_answer']
-        self.current_trivia_question = None
+        correct_answer = game.current['correct_answer']
+        game.current = None
         
         return {
             'result': result,
             'correct_answer': correct_answer,
-            'score': self.trivia_score,
-            'total': self.trivia_total
+            'score': game.score,
+            'total': game.total
         }
     
     def end_trivia_game(self):
-        if not self.trivia_active:
+        game = self.trivia_game
+        if not game.active:
             return None
         
-        self.trivia_active = False
-        percentage = (self.trivia_score / self.trivia_total * 100) if self.trivia_total > 0 else 0
+        percentage = (game.score / game.total * 100) if game.total > 0 else 0
         
         result = {
-            "score": self.trivia_score,
-            "total": self.trivia_total,
+            "score": game.score,
+            "total": game.total,
             "percentage": percentage,
             "message": self._get_trivia_result_message(percentage)
         }
         
-        # Reset game state
-        self.trivia_score = 0
-        self.trivia_total = 0
-        self.current_trivia_question = None
-        self.trivia_questions_remaining = []
-        
+        game.reset()
         return result
     
     def _get_trivia_result_message(self, percentage):
@@ -363,44 +609,503 @@ class ChatBot:
         if correct_answer not in [option_a, option_b, option_c, option_d]:
             return False
 
+        if self.primary is not None:
+            return self.primary.call("add_trivia_question", question, option_a, option_b,
+                                     option_c, option_d, correct_answer)
+
         new_trivia = {
             'question': question.strip(),
             'options': [option_a.strip(), option_b.strip(), option_c.strip(), option_d.strip()],
             'correct_answer': correct_answer.strip()
         }
 
-        self.trivia_questions.append(new_trivia)
-        self.save_trivia_to_csv("trivia.csv")
+        with self.kb_lock:
+            with self._editing() as kb:
+                kb.trivia.append(TriviaQuestion.from_mapping(new_trivia))
+            self._persist_trivia({"op": "add_trivia", "trivia": new_trivia})
         return True
     
+    def _new_question_store(self):
+        if self.answer_cache_bytes is None:
+            return CompactQuestions()
+        # Only keys and answer offsets stay resident; bodies are read from a
+        # scratch file through an LRU cache of answer_cache_bytes
+        return CompactQuestions(strings=PagedStringTable(self.answer_cache_bytes))
+    
+    def answer_cache_stats(self):
+        strings = getattr(self.questions, "strings", None)
+        return strings.stats() if isinstance(strings, PagedStringTable) else None
+    
+    @property
+    def questions(self):
+        return self.kb.questions
+    
+    @property
+    def trivia_questions(self):
+        return self.kb.trivia
+    
+    @property
+    def kb_version(self):
+        return self.kb.version
+    
+    @contextmanager
+    def _editing(self):
+        """Yield a private copy of the KB to change, published when the block exits.
+
+        Writers are serialized on kb_lock. Readers never wait: they keep the
+        state they took until the new one replaces it, and an edit that
+        raises is never published.
+        """
+        with self.kb_lock:
+            kb = self.kb.edit()
+            yield kb
+            self._publish(kb)
+    
+    def _publish(self, kb):
+        previous = self.kb
+        self.kb = kb
+        # The derived indexes follow the published keys; lookups check what
+        # they return against the state they read, so a reader running
+        # between the swap and these updates only misses the edit
+        for q in kb.removed:
+            self._unindex_question(q)
+        for q in kb.added:
+            self._index_question(q)
+        if kb.added or kb.removed:
+            self.key_changes += 1
+            if self.indexes_ready:
+                self._refresh_tfidf()
+        if self.change_listeners:
+            records = kb.change_records(previous)
+            for listener in self.change_listeners:
+                listener(kb.version, records)
+    
+    def apply_changes(self, version, records):
+        """Publish records from another process's KB as its version `version`"""
+        with self._editing() as kb:
+            for record in records:
+                if record["op"] == "add_trivia":
+                    # Unlike journal replays these never overlap, and may repeat a question
+                    kb.trivia.append(TriviaQuestion.from_mapping(record["trivia"]))
+                else:
+                    self._apply_journal_record(kb, record)
+            kb.version = version
+    
+    def _reset_indexes(self):
+        # The search indexes are built from self.questions by _ensure_indexes
+        # the first time a lookup needs more than an exact or canonical match
+        self.indexes_ready = False
+        self.tfidf_index = None
+        self.bm25_index = None
+        self.typo_index = None
+        self.suggest_index = None
+        # Times each question has been answered, used to rank suggestions
+        self.hit_counts = {}
+        # Canonical form of every key -> the key as stored, filled on the
+        # first lookup that misses an exact key
+        self.canonical_index = {}
+        self.canonical_ready = False
+        # True while snapshot keys are missing from canonical_index and
+        # resolve through the snapshot's own canonical table instead
+        self.snapshot_canonical = False
+    
+    def _ensure_canonical_index(self):
+        if self.canonical_ready:
+            return
+        # Under kb_lock so no edit is published while the index catches up
+        with self.kb_lock, timed("build canonical index"):
+            if self.canonical_ready:
+                return
+            for q in self.kb.questions:
+                self.canonical_index.setdefault(self.normalizer(q), q)
+            self.canonical_ready = True
+    
+    def _ensure_indexes(self):
+        if self.indexes_ready:
+            return
+        with self.kb_lock, timed("build indexes"):
+            if self.indexes_ready:
+                return
+            # Imported here so one-shot CLI runs never load numpy/scipy
+            from tfidf_index import TfidfIndex
+            self.tfidf_index = TfidfIndex()
+            self.bm25_index = BM25Index()
+            self.typo_index = TypoIndex(max_edit_distance=2)
+            self.suggest_index = SuggestIndex()
+            self.indexes_ready = True
+            self._ensure_canonical_index()
+            for q in self.kb.questions:
+                self._index_question(q)
+            self.snapshot_canonical = False
+            self.tfidf_index.build(self.kb.questions.keys())
+            self.tfidf_changes = self.key_changes
+    
+    def _refresh_tfidf(self):
+        """Rebuild the TF-IDF index in the background and swap it in when done"""
+        with self.kb_lock:
+            if self.tfidf_rebuilding:
+                return
+            self.tfidf_rebuilding = True
+        threading.Thread(target=self._rebuild_tfidf, name="tfidf-rebuild", daemon=True).start()
+    
+    def _rebuild_tfidf(self):
+        from tfidf_index import TfidfIndex
+        while True:
+            # Read the counter before the state: the state is then at least as new
+            changes = self.key_changes
+            index = TfidfIndex()
+            index.build(self.kb.questions.keys())
+            with self.kb_lock:
+                # A reset KB builds its own indexes from scratch
+                if not self.indexes_ready:
+                    self.tfidf_rebuilding = False
+                    return
+                self.tfidf_index = index
+                self.tfidf_changes = changes
+                if self.key_changes == changes:
+                    self.tfidf_rebuilding = False
+                    return
+    
+    def _index_question(self, q):
+        if self.canonical_ready:
+            self.canonical_index.setdefault(self.normalizer(q), q)
+        if not self.indexes_ready:
+            return
+        self.bm25_index.add(q, q)
+        self.typo_index.add(q)
+        self.suggest_index.add(q)
+    
+    def _unindex_question(self, q):
+        if self.canonical_ready:
+            canonical = self.normalizer(q)
+            if self.canonical_index.get(canonical) == q:
+                del self.canonical_index[canonical]
+        self.hit_counts.pop(q, None)
+        if not self.indexes_ready:
+            return
+        self.bm25_index.remove(q)
+        self.typo_index.remove(q)
+        self.suggest_index.remove(q)
+    
+    def snapshot_is_current(self, path):
+        if not path or not os.path.exists(path):
+            return False
+        snapshot_mtime = os.path.getmtime(path)
+        return all(not os.path.exists(source) or os.path.getmtime(source) <= snapshot_mtime
+                   for source in ("questions.csv", "trivia.csv"))
+    
+    def load_snapshot(self, path):
+        """Serve the KB from a memory-mapped snapshot built by compile_snapshot.
+
+        Only the trivia list is decoded up front; search indexes are built
+        the first time a lookup needs more than an exact or canonical match.
+        """
+        snapshot = KBSnapshot(path)
+        trivia_questions = [TriviaQuestion.from_mapping(item) for item in snapshot.trivia()]
+        with self.kb_lock:
+            self.snapshot = snapshot
+            self._reset_indexes()
+            # Only keys added later need canonical_index entries
+            self.canonical_ready = True
+            self.snapshot_canonical = True
+            self.kb = KBState(self.kb.version + 1, SnapshotQuestions(snapshot), trivia_questions)
+        if self.DEBUG:
+            print(f"DEBUG: Mapped {len(self.questions)} questions from snapshot '{path}'")
+    
+    def compile_snapshot(self, path="questions.kb"):
+        kb = self.kb
+        count = compile_snapshot(kb.questions, kb.trivia, path, self.normalizer)
+        logging.info(f"Compiled {count} questions into {path}")
+        return count
+    
+    def memory_report(self):
+        """Bytes per entry of the loaded KB ("after") against plain dicts and lists ("before")"""
+        kb = self.kb
+        return memory_report(kb.questions, kb.trivia)
+    
+    def set_normalizer(self, normalizer):
+        with self.kb_lock:
+            self.normalizer = normalizer
+            self.canonical_index = {}
+            self.canonical_ready = False
+            self.snapshot_canonical = False
+            self.query_cache.clear()
+    
+    def resolve_question_key(self, query, kb=None):
+        """The key query is stored under in kb (default: the published KB), or None"""
+        if kb is None:
+            kb = self.kb
+        q = query.strip().lower()
+        if q in kb.questions:
+            return q
+        self._ensure_canonical_index()
+        canonical = self.normalizer(q)
+        # The index is shared by all versions, so check the key against this one
+        key = self.canonical_index.get(canonical)
+        if key is None and self.snapshot_canonical:
+            # Keys still only in the snapshot resolve through its compiled canonical table
+            key = self.snapshot.canonical_key(canonical)
+        if key is not None and key not in kb.questions:
+            key = None
+        return key
+    
     def add_question(self, question, answer):
+        if self.primary is not None:
+            return self.primary.call("add_question", question, answer)
         q = question.strip().lower()
         a = answer.strip()
         if not q or not a:
             return False
         
-        if q in self.questions:
-            if a not in self.questions[q]:
-                self.questions[q].append(a)
-        else:
-            self.questions[q] = [a]
-        
-        self.save_questions_to_csv()
+        with self.kb_lock:
+            with self._editing() as kb:
+                # Store variants of a known question under its existing key
+                q = self.resolve_question_key(q, kb) or q
+                kb.store_answer(q, a)
+            self._persist_questions({"op": "add_question", "question": q, "answer": a})
         return True
     
     def remove_question(self, question):
-        q = question.strip().lower()
-        if q in self.questions:
-            del self.questions[q]
+        if self.primary is not None:
+            return self.primary.call("remove_question", question)
+        with self.kb_lock:
+            q = self.resolve_question_key(question)
+            if q is None:
+                return False
+            with self._editing() as kb:
+                kb.delete(q)
+            self._persist_questions({"op": "remove_question", "question": q})
+        return True
+    
+    # Both are called under kb_lock, right after the edit is published, so
+    # records reach the journal or the database in the order of the versions
+    def _unsaved_records(self):
+        """Journal-style records of the edits the CSVs don't hold yet, which
+        a reload of them has to keep: the journal, or what the background
+        writer hasn't saved. None means the reload should be skipped.
+        Call under kb_lock."""
+        if self.journal is not None:
+            return list(self.journal.replay())
+        writer = self.writer
+        if writer is None or writer.last_persisted_version >= writer.version:
+            return []
+        _, changes = self.change_log.since(writer.last_persisted_version, self.kb.version)
+        if changes is None:
+            # Too far behind to tell which edits are pending; saving them
+            # overwrites the file, which then holds nothing new to reload
+            logging.warning("Saving pending edits over an external change to the CSVs")
+            writer.flush()
+            return None
+        records = [{"op": "remove_question", "question": q} for q in changes["removed"]]
+        records += [{"op": "set_question", "question": item["question"], "answers": item["answers"]}
+                    for item in changes["changed"]]
+        if changes["trivia"] is not None:
+            records.append({"op": "set_trivia", "trivia": changes["trivia"]})
+        records += [{"op": "add_trivia", "trivia": trivia} for trivia in changes["trivia_added"]]
+        return records
+    
+    def _persist_questions(self, *records):
+        if self.store is not None:
+            self.store.apply_many(records)
+        elif self.journal is not None:
+            for record in records:
+                self.journal.append(record)
+            self._maybe_compact_journal()
+        elif self.writer is not None:
+            self.writer.mark_dirty("questions", self.kb.version)
+        else:
             self.save_questions_to_csv("questions.csv")
-            return True
-        return False
     
-    def list_questions(self):
-        return list(self.questions.keys())
+    def _persist_trivia(self, record):
+        if self.store is not None:
+            self.store.apply(record)
+        elif self.journal is not None:
+            self.journal.append(record)
+            self._maybe_compact_journal()
+        elif self.writer is not None:
+            self.writer.mark_dirty("trivia", self.kb.version)
+        else:
+            self.save_trivia_to_csv("trivia.csv")
+    
+    def use_sqlite_storage(self, path):
+        """Keep the KB in a SQLite database instead of the CSV files.
+
+        A new database is seeded from the CSVs loaded at startup; an existing
+        one replaces them. Edits made by other processes sharing the database
+        are picked up by sync_with_store().
+        """
+        store = SQLiteStore(path)
+        if store.is_empty():
+            kb = self.kb
+            records = [{"op": "set_question", "question": q, "answers": answers}
+                       for q, answers in kb.questions.items()]
+            records += [{"op": "add_trivia", "trivia": trivia.to_dict()} for trivia in kb.trivia]
+            store.apply_many(records)
+            logging.info(f"Seeded {path} with {len(kb.questions)} questions")
+        else:
+            self._replace_kb(store.load_questions(), store.load_trivia())
+        self.store = store
+        self.store_seq = store.last_change()
+        store.has_external_changes()
     
-    def list_trivia_questions(self):
-        return [q['question'] for q in self.trivia_questions]
+    def _replace_kb(self, questions, trivia_questions):
+        kb = KBState(self.kb.version + 1, self._new_question_store(),
+                     [TriviaQuestion.from_mapping(item) for item in trivia_questions])
+        for q, answers in questions.items():
+            kb.store_answers(q, answers)
+        with self.kb_lock:
+            self.snapshot = None
+            self._reset_indexes()
+            kb.version = self.kb.version + 1
+            self.kb = kb
+    
+    def sync_with_store(self):
+        """Apply edits committed to the SQLite store by other processes"""
+        if self.store is None or not self.store.has_external_changes():
+            return
+        with self.kb_lock:
+            seq, changed, trivia_changed = self.store.changes_since(self.store_seq)
+            if seq is None:
+                self._replace_kb(self.store.load_questions(), self.store.load_trivia())
+                self.store_seq = self.store.last_change()
+                return
+            
+            if changed or trivia_changed:
+                with self._editing() as kb:
+                    for q in changed:
+                        answers = self.store.get_answers(q)
+                        if answers is None:
+                            if q in kb.questions:
+                                kb.delete(q)
+                        else:
+                            kb.store_answers(q, answers)
+                    if trivia_changed:
+                        kb.trivia = [TriviaQuestion.from_mapping(item) for item in self.store.load_trivia()]
+            self.store_seq = seq
+    
+    def enable_background_writer(self, debounce=0.5, max_delay=5.0):
+        """Save the CSVs from a writer thread instead of the request thread"""
+        # A published KB never changes, so it is written out without copying
+        self.writer = BackgroundWriter({
+            "questions": lambda: self.save_questions_to_csv("questions.csv", self.kb.questions),
+            "trivia": lambda: self.save_trivia_to_csv("trivia.csv", self.kb.trivia)
+        }, debounce=debounce, max_delay=max_delay, version=self.kb.version)
+        atexit.register(self.writer.close)
+    
+    def flush(self, timeout=None):
+        if self.journal is not None:
+            self.journal.sync()
+        if self.writer is not None:
+            return self.writer.flush(timeout)
+        return True
+    
+    def enable_journal(self, path, **options):
+        """Log edits to an append-only journal instead of rewriting the CSVs.
+
+        Records left by a previous run are replayed over the loaded CSV
+        snapshot first; the CSVs are only rewritten by compaction.
+        """
+        journal = Journal(path, **options)
+        replayed = 0
+        with self._editing() as kb:
+            for record in journal.replay():
+                self._apply_journal_record(kb, record)
+                replayed += 1
+        if replayed:
+            logging.info(f"Replayed {replayed} journal records from {path}")
+            if self.DEBUG:
+                print(f"DEBUG: Replayed {replayed} journal records from '{path}'")
+        self.journal = journal
+        atexit.register(journal.close)
+        self._maybe_compact_journal()
+    
+    def _apply_journal_record(self, kb, record):
+        op = record.get("op")
+        if op == "add_question":
+            kb.store_answer(record["question"], record["answer"])
+        elif op == "set_question":
+            kb.store_answers(record["question"], record["answers"])
+        elif op == "remove_question":
+            if record["question"] in kb.questions:
+                kb.delete(record["question"])
+        elif op == "add_trivia":
+            # Replays may overlap a snapshot that already contains the record
+            if record["trivia"] not in kb.trivia:
+                kb.trivia.append(TriviaQuestion.from_mapping(record["trivia"]))
+        elif op == "set_trivia":
+            kb.trivia = [TriviaQuestion.from_mapping(item) for item in record["trivia"]]
+        else:
+            logging.warning(f"Unknown journal record: {record}")
+    
+    def _maybe_compact_journal(self, force=False):
+        if not (force or self.journal.needs_compaction()) or not self.journal.begin_compaction():
+            return None
+        # Everything in the rotated journal is already published, so the
+        # current KB covers it; later edits go to the fresh journal
+        kb = self.kb
+        thread = threading.Thread(
+            target=self._compact_journal, args=(kb.questions, kb.trivia),
+            name="journal-compaction", daemon=True)
+        thread.start()
+        return thread
+    
+    def _compact_journal(self, questions, trivia_questions):
+        if self.save_questions_to_csv("questions.csv", questions) and \
+                self.save_trivia_to_csv("trivia.csv", trivia_questions):
+            self.journal.finish_compaction()
+            logging.info("Compacted journal into questions.csv and trivia.csv")
+        else:
+            logging.error("Journal compaction failed; keeping rotated journal for replay")
+    
+    def compact_journal(self):
+        thread = self._maybe_compact_journal(force=True)
+        if thread is not None:
+            thread.join()
+        return thread is not None
+    
+    def changes_since(self, version, epoch=None):
+        """What changed in the KB after `version`, or a request to resync.
+
+        Edits are merged per question: `changed` holds the questions added or
+        changed and their answers, `removed` those removed, and
+        `trivia_added` the trivia questions added. `trivia` is the whole
+        trivia list if it was replaced (reloaded), to apply before those
+        additions. Versions of another run (a different epoch) or older than
+        the change log can't be caught up; a version the log started after
+        (such as 0) is sent the whole KB.
+        """
+        self.sync_with_store()
+        kb = self.kb
+        head, changes = self.change_log.since(version, kb.version)
+        result = {"since": version, "kb_version": head, "epoch": self.kb_epoch}
+        if epoch is not None and epoch != self.kb_epoch:
+            result["resync"] = True
+            return result
+        if changes is None and version <= self.change_log.start:
+            result["kb_version"] = kb.version
+            changes = {"changed": [{"question": q, "answers": list(answers)}
+                                   for q, answers in kb.questions.items()],
+                       "removed": [],
+                       "trivia": [trivia_record(item) for item in kb.trivia],
+                       "trivia_added": []}
+        if changes is None:
+            result["resync"] = True
+            return result
+        result["resync"] = False
+        result.update(changes)
+        return result
+    
+    def list_questions(self, kb=None):
+        self.sync_with_store()
+        if kb is None:
+            kb = self.kb
+        return list(kb.questions.keys())
+    
+    def list_trivia_questions(self, kb=None):
+        self.sync_with_store()
+        if kb is None:
+            kb = self.kb
+        return [q['question'] for q in kb.trivia]
     
     def import_questions_from_csv(self, filename):
         if not os.path.exists(filename):
@@ -408,105 +1113,396 @@ class ChatBot:
             return False
         
         try:
-            with open(filename, newline='', encoding='utf-8') as csvfile:
-                reader = csv.DictReader(csvfile)
-                if not reader.fieldnames or 'question' not in reader.fieldnames or 'answer1' not in reader.fieldnames:
-                    logging.warning(f"Import failed for {filename}: Missing required headers")
-                    return False
-                
-                imported = 0
-                for row in reader:
-                    q = row['question'].strip().lower()
-                    answers = [row[key].strip() for key in ['answer1', 'answer2', 'answer3', 'answer4'] 
-                             if row.get(key) and row[key].strip()]
-                    if q and answers:
-                        self.questions[q] = answers
-                        imported += 1
-                
-                logging.info(f"Successfully imported {imported} questions from {filename}")
-                self.save_questions_to_csv("questions.csv")
-                return True
+            with open(filename, 'rb') as f:
+                job = self.import_questions_stream(f, source=filename)
+            return job.status == "applied"
         except Exception as e:
             logging.error(f"Failed to import questions from {filename}: {str(e)}")
             return False
     
-    def answer_question(self, query):
-        q = query.strip().lower()
+    def import_questions_stream(self, stream, source="upload", on_error="skip",
+                                max_rows=None, max_bytes=None, conflict="last-wins"):
+        """Import a question CSV from a byte stream; returns the ImportJob.
+
+        Rows are validated and staged on disk first, so a malformed file (or
+        any invalid row with on_error="reject") leaves the KB untouched. The
+        staged rows are then applied in batches under the conflict policy
+        (see import_questions_from_files), yielding between them so
+        concurrent requests keep being answered.
+        """
+        if conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy: {conflict}")
+        job = ImportJob(source, on_error)
+        self.import_jobs.add(job)
+        with StagedImport(job, max_rows=max_rows, max_bytes=max_bytes) as staged:
+            if not staged.parse(stream):
+                logging.warning(f"Import failed for {source}: {job.message}")
+                return job
+            
+            conflicts = self._apply_staged([staged], conflict)
+            if conflicts:
+                shown = ", ".join(repr(q) for q, _ in conflicts[:5])
+                job.finish("failed", f"Questions imported twice or already known: {shown}")
+                logging.warning(f"Import failed for {source}: {job.message}")
+                return job
+        
+        job.finish("applied")
+        logging.info(f"Successfully imported {job.rows_applied} questions from {source}")
+        return job
+    
+    def import_questions_from_files(self, specs, conflict="last-wins", on_error="skip",
+                                    workers=None, max_rows=None, max_bytes=None):
+        """Import many question CSVs (files, directories or globs) as one change.
+
+        Files are parsed and validated in a process pool, then applied in the
+        given order under the conflict policy:
+          last-wins - a later row replaces the answers of an earlier one
+          merge     - answers are added to those already known
+          reject    - any question appearing twice, or already in the KB,
+                      fails the whole import
+        Nothing is applied unless every file staged cleanly, and the KB is
+        persisted once at the end. Returns a summary dict.
+        """
+        if conflict not in CONFLICT_POLICIES:
+            raise ValueError(f"Unknown conflict policy: {conflict}")
+        paths = expand_import_paths(specs)
+        summary = {"status": "failed", "message": None, "conflict": conflict,
+                   "files": [], "conflicts": [], "rows_applied": 0}
+        if not paths:
+            summary["message"] = "No files to import"
+            return summary
+        
+        if len(paths) == 1 or workers == 1:
+            results = [stage_csv_file(path, on_error, max_rows, max_bytes) for path in paths]
+        else:
+            from concurrent.futures import ProcessPoolExecutor
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(stage_csv_file, paths, [on_error] * len(paths),
+                                        [max_rows] * len(paths), [max_bytes] * len(paths)))
         
-        # Handle time/date questions
-        if q in ("what is the time?", "what's the time?", "time?"):
+        staged_imports = []
+        try:
+            for job, staging_path in results:
+                self.import_jobs.add(job)
+                if staging_path is not None:
+                    staged_imports.append(StagedImport(job, staging_path=staging_path))
+            failed = [job for job, staging_path in results if staging_path is None]
+            conflicts = []
+            if failed:
+                summary["message"] = f"{len(failed)} of {len(paths)} files failed to parse"
+            else:
+                conflicts = self._apply_staged(staged_imports, conflict)
+            
+            if conflicts:
+                summary["conflicts"] = [{"question": q, "source": source} for q, source in conflicts]
+                summary["message"] = "Questions imported twice or already in the knowledge base"
+            elif not failed:
+                for staged in staged_imports:
+                    staged.job.finish("applied")
+                summary["status"] = "applied"
+                summary["rows_applied"] = sum(staged.job.rows_applied for staged in staged_imports)
+                logging.info(f"Successfully imported {summary['rows_applied']} questions from {len(paths)} files")
+            
+            if summary["status"] != "applied":
+                for staged in staged_imports:
+                    staged.job.finish("failed", summary["message"])
+                logging.warning(f"Import failed: {summary['message']}")
+        finally:
+            for staged in staged_imports:
+                staged.close()
+        summary["files"] = [job.to_dict() for job, _ in results]
+        return summary
+    
+    def _apply_staged(self, staged_imports, conflict="last-wins"):
+        """Apply staged rows to a copy of the KB, publish it as one version,
+        then persist. Queries keep being answered from the previous version
+        throughout and never see a partly applied import.
+
+        Returns the (question, source) conflicts that stop a "reject"
+        import, checked against the KB the rows would be applied to; an
+        empty list once applied.
+        """
+        if self.primary is not None:
+            # Parsed and staged here; the writer applies the staging files
+            conflicts, applied = self.primary.call(
+                "apply_staged", [staged.staging_path for staged in staged_imports], conflict)
+            for staged, rows in zip(staged_imports, applied):
+                staged.job.rows_applied = rows
+            # The writer knows the files by their staging paths
+            sources = {staged.staging_path: staged.job.source for staged in staged_imports}
+            return [(q, sources.get(source, source)) for q, source in conflicts]
+        with self.import_lock, self.kb_lock:
+            if conflict == "reject":
+                conflicts = find_conflicts(staged_imports, existing=self.kb.questions)
+                if conflicts:
+                    return conflicts
+            # With SQLite, commit first so a failed transaction leaves the
+            # in-memory KB untouched; other backends persist after applying
+            if self.store is not None:
+                self.store.apply_many(record for staged in staged_imports
+                                      for record in staged.records(conflict))
+            with self._editing() as kb:
+                for staged in staged_imports:
+                    staged.job.status = "applying"
+                    for batch in staged.batches(IMPORT_BATCH_SIZE):
+                        for q, answers in batch:
+                            if conflict == "merge":
+                                for a in answers:
+                                    kb.store_answer(q, a)
+                            else:
+                                kb.store_answers(q, answers)
+                        staged.job.rows_applied += len(batch)
+            if self.store is None and self.journal is not None:
+                # Journaled only once published, so a compaction that starts
+                # meanwhile snapshots a KB that already holds these rows
+                for staged in staged_imports:
+                    for batch in staged.batches(IMPORT_BATCH_SIZE):
+                        self._persist_questions(*[record for q, answers in batch
+                                                  for record in row_records(q, answers, conflict)])
+            elif self.store is None:
+                self._persist_questions()
+        return []
+    
+    def find_similar_question(self, query, kb=None):
+        return self.find_similar_questions([query], kb)[0]
+    
+    def find_similar_questions(self, queries, kb=None):
+        if kb is None:
+            kb = self.kb
+        self._ensure_indexes()
+        results = self.tfidf_index.query_many(queries, self.match_threshold)
+        # The index may predate the latest edits until its rebuild lands
+        return [(key, score) if key is None or key in kb.questions else (None, 0.0)
+                for key, score in results]
+    
+    def index_stats(self):
+        self._ensure_indexes()
+        # Walking the typo index is not safe against a concurrent edit
+        with self.kb_lock:
             return {
-                "response": f"The current time is {self.get_current_time()}.",
-                "type": "time"
+                "questions": len(self.questions),
+                "kb_version": self.kb_version,
+                "bm25_terms": len(self.bm25_index.postings),
+                "tfidf_terms": len(self.tfidf_index.vocabulary),
+                "tfidf_stale": self.tfidf_changes != self.key_changes,
+                "typo": self.typo_index.memory_usage(),
+                "answer_pages": self.answer_cache_stats()
             }
-        elif q in ("what is the date?", "what's the date?", "date?"):
+    
+    def suggest_questions(self, prefix, limit=10):
+        prefix = prefix.lstrip().lower()
+        if not prefix:
+            return []
+        kb = self.kb
+        self._ensure_indexes()
+        return [key for key in self.suggest_index.complete(prefix, limit, self.hit_counts)
+                if key in kb.questions]
+    
+    def search_questions(self, query, k=5):
+        q = query.strip().lower()
+        if self.store is not None:
+            # FTS5 ranks candidates inside SQLite, shared by every process
+            results = self.store.search(" ".join(tokenize(q)), k)
+        else:
+            kb = self.kb
+            self._ensure_indexes()
+            results = [(question, score) for question, score in self.bm25_index.search(q, k)
+                       if question in kb.questions]
+        return [{"question": question, "score": round(score, 4)} for question, score in results]
+    
+    def register_builtin_intents(self):
+        self.intent_router.register(
+            "time", self._handle_time,
+            phrases=("what is the time?", "what's the time?", "time?"))
+        self.intent_router.register(
+            "date", self._handle_date,
+            phrases=("what is the date?", "what's the date?", "date?"))
+        self.intent_router.register("trivia", self._handle_trivia_command, phrases=("trivia",))
+        self.intent_router.register(
+            "trivia_answer", self._handle_trivia_answer, when=lambda: self.trivia_active)
+    
+    def _handle_time(self, query):
+        return {
+            "response": f"The current time is {self.get_current_time()}.",
+            "type": "time"
+        }
+    
+    def _handle_date(self, query):
+        return {
+            "response": f"Today's date is {self.get_current_date()}.",
+            "type": "date"
+        }
+    
+    def _handle_trivia_command(self, query):
+        if self.trivia_active:
+            result = self.end_trivia_game()
             return {
-                "response": f"Today's date is {self.get_current_date()}.",
-                "type": "date"
+                "response": f"Trivia game ended. Final score: {result['score']}/{result['total']}",
+                "trivia_result": result,
+                "type": "trivia_end"
+            }
+        if self.start_trivia_game(5):
+            next_question = self.ask_next_trivia_question()
+            return {
+                "response": "Trivia game started! Here's your first question:",
+                "trivia_question": next_question,
+                "type": "trivia_start"
+            }
+        return {
+            "response": "Not enough trivia questions available to start the game.",
+            "type": "error"
+        }
+    
+    def _handle_trivia_answer(self, query):
+        # While trivia is active, treat all input as a potential answer
+        result = self.process_trivia_answer(query)
+        if result == "no_active_game":
+            return {
+                "response": "No active trivia game. Type 'trivia' to start one.",
+                "type": "error"
+            }
+        elif result == "invalid":
+            return {
+                "response": "Please answer with A, B, C, or D.",
+                "type": "trivia_invalid"
             }
         
-        # Handle trivia commands
-        if q == "trivia":
-            if self.trivia_active:
-                result = self.end_trivia_game()
-                return {
-                    "response": f"Trivia game ended. Final score: {result['score']}/{result['total']}",
-                    "trivia_result": result,
-                    "type": "trivia_end"
-                }
-            else:
-                if self.start_trivia_game(5):
-                    next_question = self.ask_next_trivia_question()
-                    return {
-                        "response": "Trivia game started! Here's your first question:",
-                        "trivia_question": next_question,
-                        "type": "trivia_start"
-                    }
-                return {
-                    "response": "Not enough trivia questions available to start the game.",
-                    "type": "error"
-                }
-        
-        # If trivia is active, treat all input as potential trivia answers
-        if self.trivia_active:
-            result = self.process_trivia_answer(query)
-            if result == "no_active_game":
-                return {
-                    "response": "No active trivia game. Type 'trivia' to start one.",
-                    "type": "error"
-                }
-            elif result == "invalid":
-                return {
-                    "response": "Please answer with A, B, C, or D.",
-                    "type": "trivia_invalid"
-                }
-            else:
-                response = {
-                    "response": "✅ Correct!" if result['result'] == "correct" else "❌ Incorrect!",
-                    "type": "trivia_answer",
-                    "result": result['result'],
-                    "correct_answer": result['correct_answer'],
-                    "score": result['score'],
-                    "total": result['total']
-                }
-                
-                # Get next question or end game
-                if len(self.trivia_questions_remaining) > 0:
-                    next_question = self.ask_next_trivia_question()
-                    response["next_question"] = next_question
-                else:
-                    final_result = self.end_trivia_game()
-                    response["trivia_result"] = final_result
-                    response["type"] = "trivia_final_result"
+        response = {
+            "response": "✅ Correct!" if result['result'] == "correct" else "❌ Incorrect!",
+            "type": "trivia_answer",
+            "result": result['result'],
+            "correct_answer": result['correct_answer'],
+            "score": result['score'],
+            "total": result['total']
+        }
+        
+        # Get next question or end game
+        if len(self.trivia_questions_remaining) > 0:
+            next_question = self.ask_next_trivia_question()
+            response["next_question"] = next_question
+        else:
+            final_result = self.end_trivia_game()
+            response["trivia_result"] = final_result
+            response["type"] = "trivia_final_result"
+        
+        return response
+    
+    def answer_question(self, query):
+        """Answer one query from the published KB; the response carries its kb_version.
+
+        No lock is taken: the KB state read at the start is used throughout,
+        so edits published meanwhile never show up half-applied.
+        """
+        self.sync_with_store()
+        kb = self.kb
+        response = self._answer_question(query, kb)
+        response["kb_version"] = kb.version
+        return response
+    
+    def _cache_version(self, kb):
+        # Fuzzy matches also depend on how current the TF-IDF index is
+        return (kb.version, self.tfidf_changes)
+    
+    def _answer_question(self, query, kb):
+        q = query.strip().lower()
+        
+        # Built-in intents (time, date, trivia) take precedence over the KB
+        # and are never cached
+        response = self.intent_router.route(q, query)
+        if response is not None:
+            return response
+        
+        cache_key = self.normalizer(q)
+        version = self._cache_version(kb)
+        # An exact key answers for itself, also when another key (cached
+        # under the same canonical form) differs from it only in punctuation
+        match = (q, {}) if q in kb.questions else self.query_cache.get(cache_key, version)
+        if match is None:
+            match = self._lookup_match(q, kb)
+            if match is None:
+                match = self._similar_match(*self.find_similar_question(q, kb))
+            self.query_cache.put(cache_key, version, match)
+        return self._match_response(match, kb)
+    
+    def answer_questions(self, queries):
+        """Answer a batch of queries, all from the same published KB"""
+        self.sync_with_store()
+        kb = self.kb
+        results = self._answer_questions(queries, kb)
+        for result in results:
+            result["kb_version"] = kb.version
+        return results
+    
+    def _answer_questions(self, queries, kb):
+        results = [None] * len(queries)
+        pending = []
+        version = self._cache_version(kb)
+        for i, query in enumerate(queries):
+            try:
+                if not isinstance(query, str):
+                    raise ValueError("Question must be a string")
+                q = query.strip().lower()
+                response = self.intent_router.route(q, query)
+                if response is not None:
+                    results[i] = response
+                    continue
                 
-                return response
+                cache_key = self.normalizer(q)
+                match = (q, {}) if q in kb.questions else self.query_cache.get(cache_key, version)
+                if match is None:
+                    match = self._lookup_match(q, kb)
+                    if match is None:
+                        pending.append((i, q, cache_key))
+                        continue
+                    self.query_cache.put(cache_key, version, match)
+                results[i] = self._match_response(match, kb)
+            except Exception as e:
+                results[i] = {"error": str(e), "type": "error"}
         
-        # Answer regular questions
-        if q in self.questions and self.questions[q]:
-            return {
-                "response": random.choice(self.questions[q]),
+        # Score every remaining question against the KB in one pass
+        if pending:
+            try:
+                similar = self.find_similar_questions([q for _, q, _ in pending], kb)
+                for (i, _, cache_key), (key, score) in zip(pending, similar):
+                    match = self._similar_match(key, score)
+                    self.query_cache.put(cache_key, version, match)
+                    results[i] = self._match_response(match, kb)
+            except Exception as e:
+                for i, _, _ in pending:
+                    results[i] = {"error": str(e), "type": "error"}
+        return results
+    
+    def _lookup_match(self, q, kb):
+        # Regular questions, exactly or by canonical form
+        key = self.resolve_question_key(q, kb)
+        if key:
+            return (key, {})
+        
+        # Tolerate small typos before falling back to similarity search
+        self._ensure_indexes()
+        key, distance = self.typo_index.lookup(q)
+        if key and key in kb.questions:
+            return (key, {"matched_question": key, "edit_distance": distance})
+        return None
+    
+    def _similar_match(self, key, score):
+        if key:
+            return (key, {"matched_question": key, "score": round(score, 4)})
+        return (None, {})
+    
+    def _match_response(self, match, kb):
+        # Matches hold the resolved key rather than an answer so that
+        # cached lookups still rotate through the available answers
+        key, details = match
+        answers = kb.questions.get(key) if key else None
+        if answers:
+            self.hit_counts[key] = self.hit_counts.get(key, 0) + 1
+            response = {
+                "response": random.choice(answers),
                 "type": "answer"
             }
+            response.update(details)
+            return response
         
         return {
             "response": "I don't have an answer for that question. Try 'trivia' to play the trivia game!",
@@ -550,230 +1546,94 @@ class ChatBot:
                 print("\nGoodbye!")
                 break
 
-# Initialize chatbot
-chatbot = ChatBot()
+# Staged import rows are applied this many at a time
+IMPORT_BATCH_SIZE = 1000
 
-# Allowed file extensions for upload
-ALLOWED_EXTENSIONS = {'csv'}
+_chatbot = None
+_chatbot_lock = threading.Lock()
 
-def allowed_file(filename):
-    return '.' in filename and \
-           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+def get_chatbot(**options):
+    """The process-wide ChatBot, created (and the KB loaded) on first use.
 
-@app.route("/api/ask", methods=["POST"])
-def ask_question():
-    try:
-        data = request.get_json()
-        if not data or 'question' not in data:
-            return jsonify({"error": "Invalid request format"}), 400
-            
-        response = chatbot.answer_question(data["question"])
-        return jsonify(response)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+    options are passed to the constructor by whichever caller gets there first.
+    """
+    global _chatbot
+    with _chatbot_lock:
+        if _chatbot is None:
+            if "answer_cache_bytes" not in options and os.environ.get("CHATBOT_ANSWER_CACHE_MB"):
+                options["answer_cache_bytes"] = int(float(os.environ["CHATBOT_ANSWER_CACHE_MB"]) * 1024 * 1024)
+            bot = ChatBot(**options)
+            if os.environ.get("CHATBOT_STORAGE") == "sqlite":
+                bot.use_sqlite_storage(os.environ.get("CHATBOT_DB", "chatbot.db"))
+            elif os.environ.get("CHATBOT_JOURNAL"):
+                bot.enable_journal(os.environ["CHATBOT_JOURNAL"],
+                                   sync_policy=os.environ.get("CHATBOT_SYNC_POLICY", "batch"))
+            _chatbot = bot
+    return _chatbot
 
-@app.route("/api/question/add", methods=["POST"])
-def add_question():
-    try:
-        data = request.get_json()
-        if not data or 'question' not in data or 'answer' not in data:
-            return jsonify({"error": "Invalid request format"}), 400
-            
-        success = chatbot.add_question(data["question"], data["answer"])
-        if success:
-            return jsonify({"status": "success", "message": "Question added successfully"})
-        return jsonify({"error": "Failed to add question"}), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/api/question/remove", methods=["POST"])
-def remove_question():
-    try:
-        data = request.get_json()
-        if not data or 'question' not in data:
-            return jsonify({"error": "Invalid request format"}), 400
-            
-        success = chatbot.remove_question(data["question"])
-        if success:
-            return jsonify({"status": "success", "message": "Question removed successfully"})
-        return jsonify({"error": "Question not found"}), 404
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/api/question/list", methods=["GET"])
-def list_questions():
-    try:
-        questions = chatbot.list_questions()
-        return jsonify({"questions": questions})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+_server_ready = False
 
-@app.route("/api/trivia/list", methods=["GET"])
-def list_trivia_questions():
-    try:
-        questions = chatbot.list_trivia_questions()
-        return jsonify({"trivia_questions": questions})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+def get_server_chatbot(warm_indexes=True):
+    """The process-wide ChatBot, set up once for serving HTTP"""
+    global _server_ready
+    chatbot = get_chatbot()
+    with _chatbot_lock:
+        if _server_ready:
+            return chatbot
+        _server_ready = True
+    if chatbot.journal is None and chatbot.store is None and chatbot.writer is None:
+        chatbot.enable_background_writer()
+    # Pick up edits deployed straight to the CSVs; 0 turns polling off
+    reload_interval = float(os.environ.get("CHATBOT_RELOAD_INTERVAL", "2.0"))
+    if reload_interval > 0 and chatbot.store is None:
+        chatbot.enable_hot_reload(reload_interval)
+    # Build the search indexes while the server starts accepting requests
+    if warm_indexes:
+        threading.Thread(target=chatbot._ensure_indexes, name="index-warmup", daemon=True).start()
+    return chatbot
 
-@app.route("/api/trivia/start", methods=["POST"])
-def start_trivia():
-    try:
-        data = request.get_json()
-        num_questions = min(int(data.get("num_questions", 5)), 20)  # Default to 5, max 20
-        
-        if chatbot.trivia_active:
-            chatbot.end_trivia_game()
-            
-        success = chatbot.start_trivia_game(num_questions)
-        if not success:
-            return jsonify({
-                "error": "Failed to start trivia",
-                "details": "Not enough questions available"
-            }), 400
-            
-        first_question = chatbot.ask_next_trivia_question()
-        return jsonify({
-            "status": "started",
-            "current_question": first_question,
-            "score": chatbot.trivia_score,
-            "total": num_questions,
-            "game_active": chatbot.trivia_active
-        })
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/api/trivia/answer", methods=["POST"])
-def answer_trivia():
-    try:
-        data = request.get_json()
-        if not data or 'answer' not in data:
-            return jsonify({"error": "Invalid request format"}), 400
-            
-        result = chatbot.process_trivia_answer(data["answer"])
-        
-        if isinstance(result, str) and result == "no_active_game":
-            return jsonify({"error": "No active trivia game"}), 400
-        elif isinstance(result, str) and result == "invalid":
-            return jsonify({"error": "Invalid answer format. Please use A, B, C, or D."}), 400
-        
-        response = {
-            "status": "answered",
-            "result": result['result'],
-            "correct_answer": result['correct_answer'],
-            "score": result['score'],
-            "total": result['total']
-        }
-        
-        # Check if there are more questions
-        if chatbot.trivia_questions_remaining:
-            next_question = chatbot.ask_next_trivia_question()
-            response["next_question"] = next_question
-        else:
-            # Game over
-            final_result = chatbot.end_trivia_game()
-            response["game_over"] = True
-            response["final_result"] = final_result
-        
-        return jsonify(response)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+def serve(mode="flask", host="0.0.0.0", port=5040, debug=False, workers=1):
+    """Serve the API with the Flask dev server, or the asyncio app under uvicorn.
 
-@app.route("/api/trivia/end", methods=["POST"])
-def end_trivia():
-    try:
-        if chatbot.trivia_active:
-            result = chatbot.end_trivia_game()
-            return jsonify({
-                "status": "ended",
-                "final_score": result
-            })
-        return jsonify({"status": "no_active_game"})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/api/trivia/status", methods=["GET"])
-def trivia_status():
-    return jsonify({
-        "active": chatbot.trivia_active,
-        "score": chatbot.trivia_score,
-        "total": chatbot.trivia_total,
-        "current_question": chatbot.current_trivia_question['question'] if chatbot.current_trivia_question else None
-    })
-
-@app.route("/api/trivia/add", methods=["POST"])
-def add_trivia_question():
-    try:
-        data = request.get_json()
-        required_fields = ['question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
-        if not data or not all(field in data for field in required_fields):
-            return jsonify({"error": "Missing required fields"}), 400
-            
-        success = chatbot.add_trivia_question(
-            data['question'],
-            data['option_a'],
-            data['option_b'],
-            data['option_c'],
-            data['option_d'],
-            data['correct_answer']
-        )
-        
-        if success:
-            return jsonify({"status": "success", "message": "Trivia question added successfully"})
-        return jsonify({
-            "error": "Failed to add trivia question",
-            "details": "Make sure all fields are provided and correct answer matches one of the options"
-        }), 400
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
-
-@app.route("/api/upload", methods=["POST"])
-def upload_file():
-    try:
-        if 'file' not in request.files:
-            return jsonify({"error": "No file part in the request"}), 400
-            
-        file = request.files['file']
-        if file.filename == '':
-            return jsonify({"error": "No file selected"}), 400
-            
-        if not allowed_file(file.filename):
-            return jsonify({
-                "error": "Invalid file type",
-                "allowed_types": list(ALLOWED_EXTENSIONS)
-            }), 400
-            
-        filename = secure_filename(file.filename)
-        temp_path = os.path.join(tempfile.gettempdir(), filename)
-        file.save(temp_path)
-        
+    With several workers this process only writes the KB; the workers
+    answer requests (see prefork.py).
+    """
+    logging.basicConfig(level=logging.INFO)
+    if mode == "asgi":
         try:
-            if filename.endswith('.csv'):
-                success = chatbot.import_questions_from_csv(temp_path)
-            else:
-                return jsonify({
-                    "error": "Unsupported file type",
-                    "allowed_types": ["csv"]
-                }), 400
-            
-            if not success:
-                return jsonify({
-                    "error": "Failed to process file",
-                    "details": "No valid questions found or invalid format"
-                }), 400
-                
-            message = f"Successfully imported questions from {filename}"
-            return jsonify({"message": message})
-        except Exception as import_error:
-            return jsonify({
-                "error": "Failed to process file",
-                "details": str(import_error)
-            }), 400
-        finally:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+            import uvicorn
+        except ImportError:
+            print("Error: --serve asgi needs uvicorn (pip install uvicorn)")
+            sys.exit(2)
+    if workers > 1:
+        from prefork import run_prefork
+        run_prefork(get_server_chatbot(warm_indexes=False), mode, host, port, workers)
+        return
+    chatbot = get_server_chatbot()
+    if mode == "asgi":
+        from asgi_server import create_asgi_app
+        uvicorn.run(create_asgi_app(chatbot), host=host, port=port, access_log=False)
+    else:
+        create_server().run(debug=debug, host=host, port=port)
+
+def create_server():
+    with timed("import flask"):
+        from server import create_app
+    return create_app(get_chatbot())
+
+def __getattr__(name):
+    # `app.chatbot` and `from app import app` still work, built on first access
+    if name == "chatbot":
+        return get_chatbot()
+    if name == "app":
+        return create_server()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def print_startup_profile():
+    total = time.perf_counter() - _import_started
+    for phase, seconds in startup_timings:
+        print(f"{phase:<20}{seconds * 1000:10.1f} ms", file=sys.stderr)
+    print(f"{'total':<20}{total * 1000:10.1f} ms", file=sys.stderr)
 
 def main():
     parser = MyArgumentParser(
@@ -786,6 +1646,16 @@ def main():
     group.add_argument('--import-questions', action='store_true', help='Import questions from a file')
     group.add_argument('--interactive', action='store_true', help='Run in interactive chat mode')
     group.add_argument('--add-trivia', action='store_true', help='Add a new trivia question')
+    group.add_argument('--export-questions', action='store_true',
+                       help='Export all questions to a CSV file (used with --filepath)')
+    group.add_argument('--compile-kb', action='store_true',
+                       help='Compile the CSVs into a memory-mapped snapshot (output path via --filepath)')
+    group.add_argument('--memory-report', action='store_true',
+                       help='Show the memory used per question and trivia entry, compact vs plain')
+    group.add_argument('--serve', choices=['flask', 'asgi'],
+                       help='Serve the HTTP API: the Flask dev server, or the asyncio (ASGI) mode under uvicorn')
+    group.add_argument('--compact-journal', action='store_true',
+                       help='Fold the edit journal into the CSV files (used with --journal)')
     parser.add_argument('--question', help='Ask a question directly, or specify with --add/--remove')
     parser.add_argument('--answer', help='Answer for the new question (used with --add)')
     parser.add_argument('--trivia-question', help='Trivia question text (used with --add-trivia)')
@@ -795,10 +1665,49 @@ def main():
     parser.add_argument('--option-d', help='Option D for trivia question (used with --add-trivia)')
     parser.add_argument('--correct-answer', help='Correct answer for trivia (must match one of the options)')
     parser.add_argument('--filepath', help='Path to the file for import (used with --import-questions)')
+    parser.add_argument('--files', nargs='+',
+                        help='CSV files, directories or glob patterns to import (used with --import-questions)')
+    parser.add_argument('--conflict', choices=CONFLICT_POLICIES, default='last-wins',
+                        help='How to combine questions imported more than once (default: last-wins)')
+    parser.add_argument('--workers', type=int,
+                        help='Worker processes for --import-questions (default: CPU count) or --serve (default: 1)')
+    parser.add_argument('--match-threshold', type=float,
+                        help='Minimum similarity score for fuzzy question matching (0-1, default 0.6)')
+    parser.add_argument('--storage', choices=['csv', 'sqlite'], default='csv',
+                        help='Where the knowledge base is kept')
+    parser.add_argument('--db', default='chatbot.db', help='SQLite database path (used with --storage sqlite)')
+    parser.add_argument('--journal', help='Record edits in this append-only journal instead of rewriting the CSVs')
+    parser.add_argument('--sync-policy', choices=SYNC_POLICIES, default='batch',
+                        help='When journal records are fsynced (used with --journal)')
+    parser.add_argument('--background-writes', action='store_true',
+                        help='Save CSV edits from a background writer thread (flushed on exit)')
+    parser.add_argument('--keep-stopwords', action='store_true',
+                        help='Do not drop filler words when normalizing questions')
+    parser.add_argument('--answer-cache-mb', type=float,
+                        help='Keep answer bodies on disk, caching this many MB of recently used ones')
+    parser.add_argument('--port', type=int, default=5040, help='Port for --serve (default: 5040)')
     parser.add_argument('--debug', action='store_true', help='Enable debug mode')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Report import, load and index build time per phase on exit')
 
     args = parser.parse_args()
+    if args.profile_startup:
+        atexit.register(print_startup_profile)
+    options = {}
+    if args.answer_cache_mb is not None:
+        options["answer_cache_bytes"] = int(args.answer_cache_mb * 1024 * 1024)
+    chatbot = get_chatbot(**options)
     chatbot.DEBUG = args.debug
+    if args.match_threshold is not None:
+        chatbot.match_threshold = args.match_threshold
+    if args.keep_stopwords:
+        chatbot.set_normalizer(Normalizer(remove_stopwords=False))
+    if args.storage == 'sqlite':
+        chatbot.use_sqlite_storage(args.db)
+    elif args.journal:
+        chatbot.enable_journal(args.journal, sync_policy=args.sync_policy)
+    elif args.background_writes:
+        chatbot.enable_background_writer()
 
     if args.debug:
         print("DEBUG: Debug mode enabled")
@@ -858,14 +1767,70 @@ def main():
             print(f"{i}. {q}")
         return
 
+    # Export questions to CSV
+    if args.export_questions:
+        if not args.filepath:
+            print("Error: --filepath is required with --export-questions")
+            parser.print_help()
+            sys.exit(2)
+        success = chatbot.save_questions_to_csv(args.filepath)
+        print(f"Questions {'exported' if success else 'not exported'} to {args.filepath}")
+        return
+
+    # Compile the binary KB snapshot
+    if args.compile_kb:
+        path = args.filepath or "questions.kb"
+        count = chatbot.compile_snapshot(path)
+        print(f"Compiled {count} questions into {path}")
+        return
+
+    # Memory used by the loaded KB
+    if args.memory_report:
+        report = chatbot.memory_report()
+        print(f"{report['questions']} questions, {report['trivia']} trivia questions")
+        print(f"{'':<8}{'questions':>14}{'per question':>14}{'trivia':>12}{'per trivia':>12}")
+        for label in ("before", "after"):
+            sizes = report[label]
+            print(f"{label:<8}{sizes['questions_bytes']:>14,}{sizes['bytes_per_question']:>14,.1f}"
+                  f"{sizes['trivia_bytes']:>12,}{sizes['bytes_per_trivia']:>12,.1f}")
+        pages = chatbot.answer_cache_stats()
+        if pages:
+            print(f"Answer bodies on disk: {pages['file_bytes']:,} bytes in {pages['strings']:,} answers, "
+                  f"cache budget {pages['cache_budget']:,} bytes")
+        return
+
+    # Fold the journal into the CSV snapshot
+    if args.compact_journal:
+        if not args.journal:
+            print("Error: --journal is required with --compact-journal")
+            parser.print_help()
+            sys.exit(2)
+        compacted = chatbot.compact_journal()
+        print(f"Journal {'compacted' if compacted else 'not compacted'}: {args.journal}")
+        return
+
     # Import questions from file
     if args.import_questions:
-        if not args.filepath:
-            print("Error: --filepath is required with --import-questions")
+        if not args.filepath and not args.files:
+            print("Error: --filepath or --files is required with --import-questions")
             parser.print_help()
             sys.exit(2)
-        success = chatbot.import_questions_from_csv(args.filepath)
-        print(f"Questions {'imported' if success else 'not imported'} from {args.filepath}")
+        specs = ([args.filepath] if args.filepath else []) + (args.files or [])
+        summary = chatbot.import_questions_from_files(specs, conflict=args.conflict, workers=args.workers)
+        for file_summary in summary["files"]:
+            print(f"{file_summary['source']}: {file_summary['rows_staged']} rows, "
+                  f"{file_summary['error_count']} errors ({file_summary['status']})")
+        for item in summary["conflicts"]:
+            print(f"Duplicate question in {item['source']}: {item['question']}")
+        if summary["status"] == "applied":
+            print(f"Questions imported: {summary['rows_applied']}")
+        else:
+            print(f"Questions not imported: {summary['message']}")
+        return
+
+    # Serve the HTTP API
+    if args.serve:
+        serve(args.serve, port=args.port, debug=args.debug, workers=args.workers or 1)
         return
 
     # Interactive mode
@@ -875,7 +1840,8 @@ def main():
 
     # Just answer a question
     if args.question:
-        answer = chatbot.answer_question(args.question)
+        with timed("answer question"):
+            answer = chatbot.answer_question(args.question)
         print(f"Bot: {answer['response']}")
         return
 
@@ -887,5 +1853,4 @@ if __name__ == "__main__":
     if len(sys.argv) > 1:
         main()
     else:
-        logging.basicConfig(level=logging.INFO)
-        app.run(debug=True, host="0.0.0.0", port=5040)
\ No newline at end of file
+        serve(debug=True)
@@ -0,0 +1,524 @@
+"""asyncio (ASGI) serving mode for the chatbot API.
+
+The lookup routes (ask, suggest, the question lists, changes and trivia
+play) run inline on the event loop: they only read the published KB and
+never wait on I/O, so a single thread serves every keep-alive connection.
+(A prefork worker does ask the writer for a trivia game in play, a quick
+round trip over a pipe; see prefork.py.) All other routes
+(edits that save files, uploads and imports, stats) are passed to the Flask
+app from server.py on a thread pool, so both modes share one implementation
+and the same JSON contracts.
+
+Browsers can also open a WebSocket on /api/chat: one connection per session
+that carries ask, suggest and trivia play as small JSON frames, and on which
+the server pushes each next trivia question (see call_channel).
+
+Run with `python app.py --serve asgi`, or `uvicorn asgi_server:app`.
+"""
+import asyncio
+import json
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.cookies import CookieError, SimpleCookie
+from urllib.parse import parse_qs
+
+import server
+from list_pages import dump_json, etag, not_modified
+from server import CORS_ORIGINS, MAX_BATCH_SIZE, SESSION_COOKIE, SESSION_HEADER
+from trivia_sessions import new_session_id, valid_session_id
+
+# Threads running the routes handed to Flask
+WSGI_WORKERS = 8
+
+# Largest request body accepted by the inline routes
+MAX_JSON_BYTES = 1024 * 1024
+
+# Bodies handed to Flask (uploads) go to a temporary file past this size
+SPOOL_BYTES = 1024 * 1024
+
+# Inline routes by (method, path)
+ROUTES = {}
+
+# WebSocket path of the chat channel
+CHAT_PATH = "/api/chat"
+
+
+def route(method, path):
+    def register(handler):
+        ROUTES[(method, path)] = handler
+        return handler
+    return register
+
+
+class Request:
+    """The parts of an ASGI http request the inline routes use"""
+
+    __slots__ = ("method", "path", "args", "headers", "body", "sid", "new_sid")
+
+    def __init__(self, scope, body):
+        self.method = scope.get("method", "GET")
+        self.path = scope["path"]
+        self.args = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        self.headers = {name.decode("latin-1"): value.decode("latin-1") for name, value in scope["headers"]}
+        self.body = body
+        self.sid = None
+        self.new_sid = False
+
+    def arg(self, name, default=None, type=None):
+        values = self.args.get(name)
+        if not values:
+            return default
+        if type is None:
+            return values[0]
+        try:
+            return type(values[0])
+        except ValueError:
+            return default
+
+    def get_json(self):
+        if not self.body:
+            return None
+        try:
+            return json.loads(self.body)
+        except ValueError:
+            return None
+
+    def cookie(self, name):
+        header = self.headers.get("cookie")
+        if not header:
+            return None
+        cookies = SimpleCookie()
+        try:
+            cookies.load(header)
+        except CookieError:
+            return None
+        morsel = cookies.get(name)
+        return morsel.value if morsel is not None else None
+
+    def session_id(self):
+        """The caller's session id; a new one is minted if missing, and sent
+        back once the session is kept (a trivia game started)"""
+        if self.sid is None:
+            sid = self.headers.get(SESSION_HEADER.lower()) or self.cookie(SESSION_COOKIE)
+            self.new_sid = not valid_session_id(sid)
+            self.sid = new_session_id() if self.new_sid else sid
+        return self.sid
+
+
+@route("POST", "/api/ask")
+def ask_question(chatbot, request):
+    data = request.get_json()
+    if not data or 'question' not in data:
+        return 400, {"error": "Invalid request format"}
+    with chatbot.trivia_session(request.session_id()):
+        return 200, chatbot.answer_question(data["question"])
+
+
+@route("POST", "/api/ask/batch")
+def ask_questions(chatbot, request):
+    data = request.get_json()
+    if not data or not isinstance(data.get('questions'), list):
+        return 400, {"error": "Invalid request format"}
+    if len(data['questions']) > MAX_BATCH_SIZE:
+        return 400, {"error": f"Too many questions (max {MAX_BATCH_SIZE})"}
+    started = time.perf_counter()
+    with chatbot.trivia_session(request.session_id()):
+        answers = chatbot.answer_questions(data['questions'])
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    return 200, {"answers": answers, "count": len(answers), "elapsed_ms": round(elapsed_ms, 3)}
+
+
+@route("GET", "/api/suggest")
+def suggest_questions(chatbot, request):
+    prefix = request.arg("q", "")
+    limit = min(request.arg("limit", 10, type=int), 50)
+    return 200, {"suggestions": chatbot.suggest_questions(prefix, limit)}
+
+
+def list_response(chatbot, request, name):
+    """As server.list_response: (status, JSON bytes or None for a 304, headers)"""
+    chatbot.sync_with_store()
+    kb = chatbot.kb
+    tag = etag(chatbot.kb_epoch, kb.version)
+    headers = [(b"etag", tag.encode()), (b"cache-control", b"no-cache")]
+    if not_modified(request.headers.get("if-none-match"), tag):
+        return 304, None, headers
+    try:
+        body = chatbot.list_pages.get(name, kb, request.arg("q", ""), request.arg("cursor"),
+                                      request.arg("limit", type=int))
+    except ValueError as e:
+        return 400, {"error": str(e)}
+    return 200, body, headers
+
+
+@route("GET", "/api/question/list")
+def list_questions(chatbot, request):
+    return list_response(chatbot, request, "questions")
+
+
+@route("GET", "/api/trivia/list")
+def list_trivia_questions(chatbot, request):
+    return list_response(chatbot, request, "trivia_questions")
+
+
+@route("GET", "/api/changes")
+def kb_changes(chatbot, request):
+    since = request.arg("since", type=int)
+    if since is None:
+        return 400, {"error": "since must be a KB version"}
+    return 200, chatbot.changes_since(since, request.arg("epoch"))
+
+
+@route("POST", "/api/trivia/start")
+def start_trivia(chatbot, request):
+    data = request.get_json()
+    num_questions = min(int(data.get("num_questions", 5)), 20)
+    with chatbot.trivia_session(request.session_id()):
+        if chatbot.trivia_active:
+            chatbot.end_trivia_game()
+        if not chatbot.start_trivia_game(num_questions):
+            return 400, {"error": "Failed to start trivia", "details": "Not enough questions available"}
+        first_question = chatbot.ask_next_trivia_question()
+        return 200, {
+            "status": "started",
+            "current_question": first_question,
+            "score": chatbot.trivia_score,
+            "total": num_questions,
+            "game_active": chatbot.trivia_active
+        }
+
+
+@route("POST", "/api/trivia/answer")
+def answer_trivia(chatbot, request):
+    data = request.get_json()
+    if not data or 'answer' not in data:
+        return 400, {"error": "Invalid request format"}
+    with chatbot.trivia_session(request.session_id()):
+        result = chatbot.process_trivia_answer(data["answer"])
+        if result == "no_active_game":
+            return 400, {"error": "No active trivia game"}
+        elif result == "invalid":
+            return 400, {"error": "Invalid answer format. Please use A, B, C, or D."}
+        response = {
+            "status": "answered",
+            "result": result['result'],
+            "correct_answer": result['correct_answer'],
+            "score": result['score'],
+            "total": result['total']
+        }
+        if chatbot.trivia_questions_remaining:
+            response["next_question"] = chatbot.ask_next_trivia_question()
+        else:
+            response["game_over"] = True
+            response["final_result"] = chatbot.end_trivia_game()
+    return 200, response
+
+
+@route("POST", "/api/trivia/end")
+def end_trivia(chatbot, request):
+    with chatbot.trivia_session(request.session_id()):
+        result = chatbot.end_trivia_game()
+    if result is not None:
+        return 200, {"status": "ended", "final_score": result}
+    return 200, {"status": "no_active_game"}
+
+
+@route("GET", "/api/trivia/status")
+def trivia_status(chatbot, request):
+    with chatbot.trivia_session(request.session_id()):
+        current = chatbot.current_trivia_question
+        return 200, {
+            "active": chatbot.trivia_active,
+            "score": chatbot.trivia_score,
+            "total": chatbot.trivia_total,
+            "current_question": current['question'] if current else None
+        }
+
+
+class ChannelMessage:
+    """A chat channel frame, read by the inline routes as if it were a Request"""
+
+    __slots__ = ("data", "sid")
+
+    def __init__(self, data, sid):
+        self.data = data
+        self.sid = sid
+
+    def arg(self, name, default=None, type=None):
+        value = self.data.get(name, default)
+        if type is None or value is default:
+            return value
+        try:
+            return type(value)
+        except (TypeError, ValueError):
+            return default
+
+    def get_json(self):
+        return self.data
+
+    def session_id(self):
+        return self.sid
+
+
+# Chat channel message types, their route, and the reply fields sent as
+# pushed events of their own (event type by field)
+CHANNEL_ROUTES = {
+    "ask": (ask_question, {}),
+    "suggest": (suggest_questions, {}),
+    "trivia_start": (start_trivia, {"current_question": "trivia_question"}),
+    "trivia_answer": (answer_trivia, {"next_question": "trivia_question", "final_result": "trivia_over"}),
+    "trivia_end": (end_trivia, {}),
+    "trivia_status": (trivia_status, {}),
+}
+
+
+def wsgi_environ(scope, body):
+    server_addr = scope.get("server") or ("localhost", 80)
+    client = scope.get("client")
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+        "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+        "SERVER_NAME": server_addr[0],
+        "SERVER_PORT": str(server_addr[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0] if client else "",
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": body,
+        "wsgi.input_terminated": True,
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": False,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope["headers"]:
+        key = name.decode("latin-1").upper().replace("-", "_")
+        value = value.decode("latin-1")
+        if key not in ("CONTENT_TYPE", "CONTENT_LENGTH"):
+            key = "HTTP_" + key
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+def run_wsgi(wsgi_app, environ):
+    """Call a WSGI app to completion; returns (status, headers, body)"""
+    response = []
+
+    def start_response(status, headers, exc_info=None):
+        response[:] = [int(status.split(" ", 1)[0]), headers]
+
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b"".join(result)
+    finally:
+        if hasattr(result, "close"):
+            result.close()
+    return response[0], response[1], body
+
+
+class ASGIApp:
+    """Inline routes on the event loop, everything else through Flask"""
+
+    def __init__(self, chatbot, wsgi_app, workers=WSGI_WORKERS):
+        self.chatbot = chatbot
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="asgi-wsgi")
+        self.served_inline = 0
+        self.served_wsgi = 0
+        self.channels = 0
+        self.channel_frames = 0
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self.lifespan(receive, send)
+        elif scope["type"] == "http":
+            handler = ROUTES.get((scope["method"], scope["path"]))
+            if handler is None:
+                await self.call_wsgi(scope, receive, send)
+            else:
+                await self.call_inline(handler, scope, receive, send)
+        elif scope["type"] == "websocket":
+            await self.call_channel(scope, receive, send)
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await asyncio.get_running_loop().run_in_executor(None, self.executor.shutdown)
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def call_inline(self, handler, scope, receive, send):
+        body = await read_body(receive, MAX_JSON_BYTES)
+        if body is None:
+            await self.send_json(send, scope, 413, {"error": "Request body too large"})
+            return
+        request = Request(scope, body)
+        status, payload, *headers = await self.run(handler, request)
+        self.served_inline += 1
+        await self.send_json(send, scope, status, payload, request, *headers)
+
+    async def run(self, handler, request):
+        try:
+            if self.chatbot.indexes_ready:
+                return handler(self.chatbot, request)
+            # The first lookups wait for the index warm-up; don't stall the loop meanwhile
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, handler, self.chatbot, request)
+        except Exception as e:
+            return 500, {"error": str(e)}
+
+    async def call_channel(self, scope, receive, send):
+        """Serve the chat channel on one WebSocket.
+
+        The client sends {"id", "type", ...fields of the HTTP route's body}
+        and gets {"id", "type", "status", "data"} back, data being what the
+        route returns. The next trivia question and the final result are
+        not part of the reply: they are pushed as {"type": "trivia_question"
+        | "trivia_over", "data"}. The connection plays the trivia game of
+        the caller's session (header or cookie, as over HTTP), announced in
+        a first {"type": "session"} frame.
+        """
+        request = Request(scope, b"")
+        origin = request.headers.get("origin")
+        if scope["path"] != CHAT_PATH or (origin is not None and origin not in CORS_ORIGINS):
+            # Closing before the accept refuses the handshake with a 403
+            await send({"type": "websocket.close", "code": 1008})
+            return
+        if (await receive())["type"] != "websocket.connect":
+            return
+        sid = request.session_id()
+        headers = []
+        if request.cookie(SESSION_COOKIE) != sid:
+            headers.append((b"set-cookie", b"%s=%s; HttpOnly; Path=/; SameSite=Lax" % (SESSION_COOKIE.encode(), sid.encode())))
+        await send({"type": "websocket.accept", "headers": headers})
+        await send_frame(send, {"type": "session", "session_id": sid})
+        self.channels += 1
+        try:
+            while True:
+                message = await receive()
+                if message["type"] != "websocket.receive":
+                    break
+                text = message.get("text")
+                if text is None:
+                    text = (message.get("bytes") or b"").decode("utf-8", "replace")
+                await self.channel_frame(send, text, sid)
+        finally:
+            self.channels -= 1
+
+    async def channel_frame(self, send, text, sid):
+        self.channel_frames += 1
+        try:
+            data = json.loads(text) if len(text) <= MAX_JSON_BYTES else None
+        except ValueError:
+            data = None
+        if not isinstance(data, dict):
+            await send_frame(send, {"type": "error", "status": 400, "data": {"error": "Invalid message format"}})
+            return
+        route = CHANNEL_ROUTES.get(data.get("type"))
+        if route is None:
+            await send_frame(send, {"id": data.get("id"), "type": "error", "status": 400,
+                                    "data": {"error": f"Unknown message type: {data.get('type')}"}})
+            return
+        handler, pushed = route
+        status, payload = await self.run(handler, ChannelMessage(data, sid))
+        events = []
+        if status == 200:
+            events = [(event, payload.pop(field)) for field, event in pushed.items() if field in payload]
+        await send_frame(send, {"id": data.get("id"), "type": data["type"], "status": status, "data": payload})
+        for event, value in events:
+            await send_frame(send, {"type": event, "data": value})
+
+    async def send_json(self, send, scope, status, payload, request=None, extra_headers=()):
+        """Send payload as JSON; bytes are sent as they are, None as no body"""
+        if payload is None:
+            body = b""
+            headers = []
+        else:
+            body = payload if isinstance(payload, bytes) else dump_json(payload)
+            headers = [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ]
+        headers += extra_headers
+        origin = dict(scope["headers"]).get(b"origin")
+        if origin is not None and origin.decode("latin-1") in CORS_ORIGINS:
+            headers += [
+                (b"access-control-allow-origin", origin),
+                (b"access-control-allow-credentials", b"true"),
+                (b"access-control-expose-headers", SESSION_HEADER.encode() + b", ETag"),
+                (b"vary", b"Origin"),
+            ]
+        if request is not None and request.sid is not None and (
+                not request.new_sid or self.chatbot.has_trivia_session(request.sid)):
+            sid = request.sid.encode()
+            headers.append((SESSION_HEADER.lower().encode(), sid))
+            if request.cookie(SESSION_COOKIE) != request.sid:
+                headers.append((b"set-cookie", b"%s=%s; HttpOnly; Path=/; SameSite=Lax" % (SESSION_COOKIE.encode(), sid)))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+    async def call_wsgi(self, scope, receive, send):
+        with tempfile.SpooledTemporaryFile(max_size=SPOOL_BYTES) as body:
+            more_body = True
+            while more_body:
+                message = await receive()
+                if message["type"] == "http.disconnect":
+                    return
+                body.write(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            body.seek(0)
+            status, headers, content = await asyncio.get_running_loop().run_in_executor(
+                self.executor, run_wsgi, self.wsgi_app, wsgi_environ(scope, body))
+        self.served_wsgi += 1
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+async def send_frame(send, frame):
+    await send({"type": "websocket.send", "text": json.dumps(frame, ensure_ascii=False, separators=(",", ":"))})
+
+
+async def read_body(receive, limit):
+    """The whole request body, or None once it grows past limit"""
+    chunks = []
+    size = 0
+    more_body = True
+    while more_body:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunk = message.get("body", b"")
+        size += len(chunk)
+        if size > limit:
+            return None
+        chunks.append(chunk)
+        more_body = message.get("more_body", False)
+    return b"".join(chunks)
+
+
+def create_asgi_app(bot):
+    return ASGIApp(bot, server.create_app(bot))
+
+
+_app = None
+
+def __getattr__(name):
+    # `uvicorn asgi_server:app` serves the process-wide ChatBot, set up on first access
+    global _app
+    if name == "app":
+        if _app is None:
+            from app import get_server_chatbot
+            _app = create_asgi_app(get_server_chatbot())
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,148 @@
+"""Side-by-side load test of the Flask and asyncio (ASGI) serving modes.
+
+Starts `python app.py --serve <mode>` for each mode in turn and drives it
+with many concurrent keep-alive connections asking questions from the KB,
+then prints throughput and latency percentiles:
+
+    python bench_serving.py --connections 200 --duration 10
+
+--workers runs each mode pre-forked (see prefork.py); give several counts to
+see how throughput scales with the number of cores used.
+"""
+import argparse
+import asyncio
+import csv
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+
+async def request(reader, writer, method, path, body, host):
+    """Send one request; returns (status, keep_alive)"""
+    head = f"{method} {path} HTTP/1.1\r\nHost: {host}\r\nContent-Type: application/json\r\n" \
+           f"Content-Length: {len(body)}\r\n\r\n"
+    writer.write(head.encode() + body)
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("connection closed")
+    version, status = status_line.split(b" ", 2)[:2]
+    keep_alive = version == b"HTTP/1.1"
+    length = None
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.partition(b":")
+        name = name.strip().lower()
+        if name == b"content-length":
+            length = int(value)
+        elif name == b"connection":
+            keep_alive = value.strip().lower() == b"keep-alive"
+    if length is None:
+        await reader.read()
+        keep_alive = False
+    else:
+        await reader.readexactly(length)
+    return int(status), keep_alive
+
+
+async def client(port, questions, deadline, latencies, errors):
+    host = f"127.0.0.1:{port}"
+    reader = writer = None
+    while time.perf_counter() < deadline:
+        body = json.dumps({"question": random.choice(questions)}).encode()
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            status, keep_alive = await request(reader, writer, "POST", "/api/ask", body, host)
+        except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+            errors.append(1)
+            keep_alive, status = False, None
+        else:
+            latencies.append(time.perf_counter() - started)
+            if status != 200:
+                errors.append(status)
+        if not keep_alive and writer is not None:
+            writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def load(port, questions, connections, duration):
+    latencies = []
+    errors = []
+    deadline = time.perf_counter() + duration
+    await asyncio.gather(*(client(port, questions, deadline, latencies, errors) for _ in range(connections)))
+    return latencies, errors
+
+
+async def wait_ready(port, timeout):
+    deadline = time.perf_counter() + timeout
+    body = json.dumps({"question": "hello"}).encode()
+    while time.perf_counter() < deadline:
+        try:
+            reader, writer = await asyncio.open_connection("127.0.0.1", port)
+            status, _ = await request(reader, writer, "POST", "/api/ask", body, f"127.0.0.1:{port}")
+            writer.close()
+            if status == 200:
+                return
+        except (OSError, ConnectionError, asyncio.IncompleteReadError):
+            pass
+        await asyncio.sleep(0.2)
+    raise TimeoutError(f"server on port {port} did not come up")
+
+
+def percentile(values, fraction):
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def bench(mode, port, questions, connections, duration, workers=1):
+    env = dict(os.environ, CHATBOT_RELOAD_INTERVAL="0")
+    proc = subprocess.Popen([sys.executable, "app.py", "--serve", mode, "--port", str(port),
+                             "--workers", str(workers)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        asyncio.run(wait_ready(port, timeout=120))
+        latencies, errors = asyncio.run(load(port, questions, connections, duration))
+    finally:
+        proc.terminate()
+        proc.wait()
+    latencies.sort()
+    return {
+        "mode": mode,
+        "workers": workers,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": len(latencies) / duration,
+        "p50_ms": percentile(latencies, 0.50) * 1000 if latencies else 0.0,
+        "p99_ms": percentile(latencies, 0.99) * 1000 if latencies else 0.0
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare the Flask and ASGI serving modes under load")
+    parser.add_argument('--modes', nargs='+', choices=['flask', 'asgi'], default=['flask', 'asgi'])
+    parser.add_argument('--connections', type=int, default=100, help='Concurrent keep-alive connections')
+    parser.add_argument('--duration', type=float, default=10.0, help='Seconds of load per mode')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1], help='Worker process counts to run')
+    parser.add_argument('--port', type=int, default=5041)
+    args = parser.parse_args()
+
+    with open("questions.csv", encoding="utf-8", newline="") as f:
+        questions = [row[0] for row in csv.reader(f) if row][1:] or ["hello"]
+
+    print(f"{'mode':<8}{'workers':>8}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p99 ms':>10}")
+    for mode in args.modes:
+        for workers in args.workers:
+            result = bench(mode, args.port, questions, args.connections, args.duration, workers)
+            print(f"{result['mode']:<8}{result['workers']:>8}{result['requests']:>10}{result['errors']:>8}"
+                  f"{result['rps']:>10.1f}{result['p50_ms']:>10.2f}{result['p99_ms']:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import heapq
+import math
+
+from tokenizer import tokenize
+
+
+class BM25Index:
+    """Inverted index (token -> {question: term frequency}) with BM25 ranking.
+
+    Documents are added and removed one at a time so edits to the knowledge
+    base only touch the postings of the affected tokens. search() may run
+    while another thread edits: it copies each posting in one C-level call
+    and skips documents removed in the meantime.
+    """
+
+    def __init__(self, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings = {}
+        self.doc_lengths = {}
+        self.doc_terms = {}
+        self.total_length = 0
+
+    def __len__(self):
+        return len(self.doc_lengths)
+
+    def __contains__(self, doc_id):
+        return doc_id in self.doc_lengths
+
+    def add(self, doc_id, text):
+        if doc_id in self.doc_lengths:
+            self.remove(doc_id)
+
+        tokens = tokenize(text)
+        for token in tokens:
+            posting = self.postings.setdefault(token, {})
+            posting[doc_id] = posting.get(doc_id, 0) + 1
+        self.doc_lengths[doc_id] = len(tokens)
+        self.doc_terms[doc_id] = tuple(set(tokens))
+        self.total_length += len(tokens)
+
+    def remove(self, doc_id):
+        length = self.doc_lengths.pop(doc_id, None)
+        if length is None:
+            return False
+
+        for token in self.doc_terms.pop(doc_id):
+            posting = self.postings[token]
+            del posting[doc_id]
+            if not posting:
+                del self.postings[token]
+        self.total_length -= length
+        return True
+
+    def idf(self, token):
+        df = len(self.postings.get(token, ()))
+        n = len(self.doc_lengths)
+        return math.log(1 + (n - df + 0.5) / (df + 0.5))
+
+    def search(self, query, k=5):
+        """Return up to k (doc_id, score) pairs, best first"""
+        if not self.doc_lengths:
+            return []
+
+        avg_length = self.total_length / len(self.doc_lengths) or 1
+        scores = {}
+        for token in set(tokenize(query)):
+            posting = self.postings.get(token)
+            if not posting:
+                continue
+            idf = self.idf(token)
+            for doc_id, tf in tuple(posting.items()):
+                length = self.doc_lengths.get(doc_id)
+                if length is None:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * length / avg_length)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (self.k1 + 1) / (tf + norm)
+
+        return heapq.nlargest(k, scores.items(), key=lambda item: item[1])
@@ -0,0 +1,88 @@
+"""Recent KB edits, for clients that sync by asking what changed since a version.
+
+Every published version's records (see KBState.change_records) are kept
+until they add up to MAX_RECORDS. A version the log no longer reaches back
+to, or one from before a reload that replaced the KB wholesale, can only be
+caught up with a full resync. Versions up to `start`, the one the log began
+at, were never served, so clients asking from there (since=0) are sent the
+whole KB instead.
+"""
+import threading
+from collections import deque
+
+# Records kept in all; each version also counts as one, empty or not, and a
+# replaced trivia list as one per question
+MAX_RECORDS = 10000
+
+
+def record_cost(records):
+    return 1 + sum(len(record["trivia"]) if record["op"] == "set_trivia" else 1 for record in records)
+
+
+class ChangeLog:
+    def __init__(self, version, max_records=MAX_RECORDS):
+        self.max_records = max_records
+        self.entries = deque()
+        self.size = 0
+        self.start = version
+        # The log holds every change after `base`, up to `head`
+        self.base = version
+        self.head = version
+        self.lock = threading.Lock()
+
+    def record(self, version, records):
+        """Change listener: log the records that made `version`"""
+        with self.lock:
+            if version != self.head + 1:
+                # Not the next version (the KB was replaced), or too much to keep
+                self._restart(version)
+                return
+            self.head = version
+            cost = record_cost(records)
+            self.entries.append((version, records, cost))
+            self.size += cost
+            while self.size > self.max_records:
+                version, _, cost = self.entries.popleft()
+                self.size -= cost
+                self.base = version
+
+    def _restart(self, version):
+        self.entries.clear()
+        self.size = 0
+        self.base = self.head = version
+
+    def since(self, version, current):
+        """(head, records after `version` merged per question and trivia),
+        or (head, None) when the log can't tell; `current` is the published
+        version, which is ahead of the log after a wholesale replacement"""
+        with self.lock:
+            if current > self.head:
+                self._restart(current)
+            if not self.base <= version <= self.head:
+                return self.head, None
+            questions = {}
+            trivia = None
+            trivia_added = []
+            for entry_version, records, _ in self.entries:
+                if entry_version <= version:
+                    continue
+                for record in records:
+                    if record["op"] == "set_trivia":
+                        trivia = record["trivia"]
+                        trivia_added = []
+                    elif record["op"] == "add_trivia":
+                        trivia_added.append(record["trivia"])
+                    else:
+                        questions[record["question"]] = record.get("answers")
+            return self.head, {
+                "changed": [{"question": q, "answers": answers}
+                            for q, answers in questions.items() if answers is not None],
+                "removed": [q for q, answers in questions.items() if answers is None],
+                "trivia": trivia,
+                "trivia_added": trivia_added
+            }
+
+    def stats(self):
+        with self.lock:
+            return {"base": self.base, "head": self.head, "versions": len(self.entries),
+                    "records": self.size - len(self.entries), "max_records": self.max_records}
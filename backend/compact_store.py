@@ -0,0 +1,347 @@
+import hashlib
+import os
+import sys
+import tempfile
+import threading
+import weakref
+from array import array
+from collections import OrderedDict
+from collections.abc import Mapping, MutableMapping
+
+# Low bits of a packed range hold the answer count, the rest its start
+COUNT_BITS = 16
+COUNT_MASK = (1 << COUNT_BITS) - 1
+
+
+class StringTable:
+    """Deduplicated strings addressed by integer id"""
+
+    def __init__(self):
+        self.strings = []
+        self.ids = {}
+
+    def __len__(self):
+        return len(self.strings)
+
+    def __getitem__(self, string_id):
+        return self.strings[string_id]
+
+    def intern(self, text):
+        string_id = self.ids.get(text)
+        if string_id is None:
+            string_id = len(self.strings)
+            self.strings.append(text)
+            self.ids[text] = string_id
+        return string_id
+
+    def get_many(self, string_ids):
+        strings = self.strings
+        return [strings[i] for i in string_ids]
+
+    def new_table(self):
+        return StringTable()
+
+    def close(self):
+        pass
+
+
+class PagedStringTable:
+    """String table whose bodies live in a file and are read back by offset.
+
+    Only each string's offset and length, plus a 64-bit digest used to
+    deduplicate, stay in memory. Recently read strings are kept in an LRU
+    cache bounded by cache_bytes (of UTF-8 text), so resident memory is set
+    by the budget rather than by how much text the table holds. The file is
+    a scratch file in directory (default: the system temp dir), removed by
+    close(); the CSVs or the database remain the source of truth.
+    """
+
+    def __init__(self, cache_bytes=16 * 1024 * 1024, directory=None):
+        fd, self.path = tempfile.mkstemp(suffix='.pages', dir=directory)
+        self.directory = directory
+        self.cache_bytes = cache_bytes
+        self.file = open(fd, 'w+b')
+        # Removes the scratch file once the table is closed or collected
+        self._remove = weakref.finalize(self, _remove_scratch_file, self.file, self.path)
+        self.size = 0
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        self.digests = {}
+        self.cache = OrderedDict()
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @staticmethod
+    def _digest(data):
+        return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), 'little')
+
+    def _read(self, string_id):
+        offset, length = self.offsets[string_id], self.lengths[string_id]
+        self.file.seek(offset)
+        return self.file.read(length).decode('utf-8')
+
+    def intern(self, text):
+        data = text.encode('utf-8')
+        digest = self._digest(data)
+        with self.lock:
+            string_id = self.digests.get(digest)
+            # Confirm the match on disk so a digest collision cannot merge two answers
+            if string_id is not None and self.lengths[string_id] == len(data) and \
+                    self._read(string_id) == text:
+                return string_id
+            string_id = len(self.offsets)
+            self.file.seek(self.size)
+            self.file.write(data)
+            self.offsets.append(self.size)
+            self.lengths.append(len(data))
+            self.size += len(data)
+            self.digests.setdefault(digest, string_id)
+            return string_id
+
+    def __getitem__(self, string_id):
+        with self.lock:
+            text = self.cache.get(string_id)
+            if text is not None:
+                self.cache.move_to_end(string_id)
+                self.hits += 1
+                return text
+            self.misses += 1
+            text = self._read(string_id)
+            length = self.lengths[string_id]
+            if length <= self.cache_bytes:
+                self.cache[string_id] = text
+                self.cached_bytes += length
+                while self.cached_bytes > self.cache_bytes:
+                    evicted_id, _ = self.cache.popitem(last=False)
+                    self.cached_bytes -= self.lengths[evicted_id]
+            return text
+
+    def get_many(self, string_ids):
+        return [self[i] for i in string_ids]
+
+    def new_table(self):
+        return PagedStringTable(self.cache_bytes, self.directory)
+
+    def close(self):
+        with self.lock:
+            self._remove()
+            self.cache.clear()
+            self.cached_bytes = 0
+
+    def stats(self):
+        with self.lock:
+            return {
+                "path": self.path,
+                "strings": len(self.offsets),
+                "file_bytes": self.size,
+                "cache_budget": self.cache_bytes,
+                "cached_bytes": self.cached_bytes,
+                "cached_strings": len(self.cache),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+def _remove_scratch_file(file, path):
+    file.close()
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class CompactQuestions(MutableMapping):
+    """Question -> answers mapping with answers interned in a string table.
+
+    Each question maps to a single int packing the start and length of its
+    range in one array of answer ids, instead of a list of string objects.
+    Reads build a fresh list, so callers change answers by assigning a new
+    list. Ranges left behind by replacements are reclaimed by compact() once
+    they make up half of the array.
+    """
+
+    def __init__(self, items=(), strings=None):
+        self.strings = strings if strings is not None else StringTable()
+        self.answer_ids = array('I')
+        self.ranges = {}
+        self.garbage = 0
+        self.update(items)
+
+    def __getitem__(self, question):
+        packed = self.ranges[question]
+        start = packed >> COUNT_BITS
+        return self.strings.get_many(self.answer_ids[start:start + (packed & COUNT_MASK)])
+
+    def __contains__(self, question):
+        return question in self.ranges
+
+    def __setitem__(self, question, answers):
+        ids = [self.strings.intern(a) for a in answers]
+        if len(ids) > COUNT_MASK:
+            raise ValueError(f"Too many answers for one question: {len(ids)}")
+        old = self.ranges.get(question)
+        if old is not None and len(ids) <= old & COUNT_MASK:
+            # Shrinking or same size: rewrite the range in place
+            start = old >> COUNT_BITS
+            self.answer_ids[start:start + len(ids)] = array('I', ids)
+            self.garbage += (old & COUNT_MASK) - len(ids)
+            self.ranges[question] = (start << COUNT_BITS) | len(ids)
+            return
+        if old is not None:
+            self.garbage += old & COUNT_MASK
+        self.ranges[question] = (len(self.answer_ids) << COUNT_BITS) | len(ids)
+        self.answer_ids.extend(ids)
+        self._maybe_compact()
+
+    def __delitem__(self, question):
+        packed = self.ranges.pop(question)
+        self.garbage += packed & COUNT_MASK
+        self._maybe_compact()
+
+    def __iter__(self):
+        return iter(self.ranges)
+
+    def __len__(self):
+        return len(self.ranges)
+
+    def copy(self):
+        """An independent mapping with the same entries.
+
+        The string table is shared: it is only ever appended to, so ids held
+        by either copy stay valid.
+        """
+        other = CompactQuestions(strings=self.strings)
+        other.answer_ids = array('I', self.answer_ids)
+        other.ranges = dict(self.ranges)
+        other.garbage = self.garbage
+        return other
+
+    def _maybe_compact(self):
+        if self.garbage > 1024 and self.garbage * 2 > len(self.answer_ids):
+            self.compact()
+
+    def compact(self):
+        """Rebuild the id array and string table from the live entries only"""
+        old_strings, old_ids, old_ranges = self.strings, self.answer_ids, self.ranges
+        self.strings = old_strings.new_table()
+        self.answer_ids = array('I')
+        self.ranges = {}
+        self.garbage = 0
+        remap = {}
+        for question, packed in old_ranges.items():
+            start = packed >> COUNT_BITS
+            ids = []
+            for old_id in old_ids[start:start + (packed & COUNT_MASK)]:
+                new_id = remap.get(old_id)
+                if new_id is None:
+                    new_id = remap[old_id] = self.strings.intern(old_strings[old_id])
+                ids.append(new_id)
+            self.ranges[question] = (len(self.answer_ids) << COUNT_BITS) | len(ids)
+            self.answer_ids.extend(ids)
+        # Not closed here: copies made by copy() may still read the old
+        # table, which is released once the last of them is gone
+
+    def memory_usage(self):
+        return {
+            "ranges": sys.getsizeof(self.ranges) + sum(sys.getsizeof(q) + sys.getsizeof(p)
+                                                        for q, p in self.ranges.items()),
+            "answer_ids": sys.getsizeof(self.answer_ids),
+            "strings": deep_sizeof(self.strings),
+            "unique_answers": len(self.strings),
+            "garbage": self.garbage
+        }
+
+
+class TriviaQuestion:
+    """One trivia question; reads like the dict it replaces (item['options'])"""
+
+    __slots__ = ("question", "options", "correct_answer")
+
+    def __init__(self, question, options, correct_answer):
+        self.question = sys.intern(question)
+        self.options = tuple(sys.intern(option) for option in options)
+        self.correct_answer = sys.intern(correct_answer)
+
+    @classmethod
+    def from_mapping(cls, item):
+        if isinstance(item, cls):
+            return item
+        return cls(item['question'], item['options'], item['correct_answer'])
+
+    def __getitem__(self, field):
+        if field not in self.__slots__:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __eq__(self, other):
+        if isinstance(other, (TriviaQuestion, Mapping)):
+            return (self.question == other['question'] and list(self.options) == list(other['options'])
+                    and self.correct_answer == other['correct_answer'])
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((self.question, self.options, self.correct_answer))
+
+    def __repr__(self):
+        return f"TriviaQuestion({self.question!r}, {list(self.options)!r}, {self.correct_answer!r})"
+
+    def to_dict(self):
+        return {'question': self.question, 'options': list(self.options), 'correct_answer': self.correct_answer}
+
+
+def deep_sizeof(obj, seen=None, share_strings=True):
+    """Bytes held by obj and everything it references.
+
+    With share_strings=False every string reference is counted, which is
+    what a structure parsed row by row (no interning) costs.
+    """
+    if seen is None:
+        seen = set()
+    if isinstance(obj, str) and not share_strings:
+        return sys.getsizeof(obj)
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, CompactQuestions):
+        children = [obj.ranges, obj.answer_ids, obj.strings]
+    elif isinstance(obj, StringTable):
+        children = [obj.strings, obj.ids]
+    elif isinstance(obj, PagedStringTable):
+        children = [obj.offsets, obj.lengths, obj.digests, obj.cache]
+    elif isinstance(obj, dict):
+        children = [item for pair in obj.items() for item in pair]
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        children = obj
+    elif hasattr(obj, "__slots__"):
+        children = [getattr(obj, name) for name in obj.__slots__]
+    else:
+        children = []
+    return size + sum(deep_sizeof(child, seen, share_strings) for child in children)
+
+
+def memory_report(questions, trivia_questions):
+    """Bytes used by the KB as loaded, against plain dicts and lists of the same data"""
+    plain_questions = {q: list(answers) for q, answers in questions.items()}
+    plain_trivia = [{'question': t['question'], 'options': list(t['options']),
+                     'correct_answer': t['correct_answer']} for t in trivia_questions]
+
+    def sizes(question_bytes, trivia_bytes):
+        return {
+            "questions_bytes": question_bytes,
+            "bytes_per_question": round(question_bytes / len(questions), 1) if len(questions) else 0,
+            "trivia_bytes": trivia_bytes,
+            "bytes_per_trivia": round(trivia_bytes / len(trivia_questions), 1) if trivia_questions else 0
+        }
+
+    return {
+        "questions": len(questions),
+        "trivia": len(trivia_questions),
+        "before": sizes(deep_sizeof(plain_questions, share_strings=False),
+                        deep_sizeof(plain_trivia, share_strings=False)),
+        "after": sizes(deep_sizeof(questions), deep_sizeof(trivia_questions))
+    }
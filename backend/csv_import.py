@@ -0,0 +1,283 @@
+import csv
+import glob
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+ANSWER_COLUMNS = ('answer1', 'answer2', 'answer3', 'answer4')
+ERROR_POLICIES = ("skip", "reject")
+CONFLICT_POLICIES = ("last-wins", "merge", "reject")
+
+
+class ImportJob:
+    """Progress counters and outcome of one CSV import.
+
+    Counters are updated by the importing thread and may be read at any time
+    by others (e.g. a progress endpoint). Per-row errors are kept up to
+    max_errors; error_count keeps counting past that.
+    """
+
+    def __init__(self, source, on_error="skip", max_errors=100):
+        if on_error not in ERROR_POLICIES:
+            raise ValueError(f"Unknown error policy: {on_error}")
+        self.id = uuid.uuid4().hex
+        self.source = source
+        self.on_error = on_error
+        self.max_errors = max_errors
+        self.status = "parsing"
+        self.message = None
+        self.bytes_read = 0
+        self.rows_read = 0
+        self.rows_staged = 0
+        self.rows_applied = 0
+        self.error_count = 0
+        self.errors = []
+        self.started = time.time()
+        self.finished = None
+
+    def add_error(self, row, message):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append({"row": row, "error": message})
+
+    def finish(self, status, message=None):
+        self.status = status
+        self.message = message
+        self.finished = time.time()
+
+    @property
+    def done(self):
+        return self.finished is not None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "source": self.source,
+            "status": self.status,
+            "message": self.message,
+            "on_error": self.on_error,
+            "bytes_read": self.bytes_read,
+            "rows_read": self.rows_read,
+            "rows_staged": self.rows_staged,
+            "rows_applied": self.rows_applied,
+            "error_count": self.error_count,
+            "errors": list(self.errors),
+            "elapsed": round((self.finished or time.time()) - self.started, 3)
+        }
+
+
+class _CountingReader(io.RawIOBase):
+    """Raw byte stream that counts what it hands out and enforces a size limit"""
+
+    def __init__(self, stream, job, max_bytes=None):
+        self.stream = stream
+        self.job = job
+        self.max_bytes = max_bytes
+
+    def readable(self):
+        return True
+
+    def readinto(self, buffer):
+        data = self.stream.read(len(buffer))
+        if not data:
+            return 0
+        n = len(data)
+        buffer[:n] = data
+        self.job.bytes_read += n
+        if self.max_bytes is not None and self.job.bytes_read > self.max_bytes:
+            raise ValueError(f"File exceeds the {self.max_bytes} byte limit")
+        return n
+
+
+class StagedImport:
+    """Validate a question CSV from a byte stream into an on-disk staging file.
+
+    The stream is decoded in chunk_size pieces and parsed row by row, so
+    memory stays flat whatever the file size. Valid rows go to a temporary
+    file; nothing touches the knowledge base until parse() has seen the whole
+    input and reported success, which makes the apply all-or-nothing.
+    """
+
+    def __init__(self, job, max_rows=None, max_bytes=None, chunk_size=64 * 1024, staging_path=None):
+        self.job = job
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        if staging_path is None:
+            fd, staging_path = tempfile.mkstemp(suffix='.staging')
+            self.staging = open(fd, mode='w+', encoding='utf-8')
+        else:
+            # Rows staged by another process (see stage_csv_file)
+            self.staging = open(staging_path, mode='r', encoding='utf-8')
+        self.staging_path = staging_path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+        return False
+
+    def parse(self, stream):
+        """Stage every valid row; returns False (with job.message set) on failure"""
+        job = self.job
+        raw = io.BufferedReader(_CountingReader(stream, job, self.max_bytes), self.chunk_size)
+        text = io.TextIOWrapper(raw, encoding='utf-8-sig', newline='')
+        try:
+            reader = csv.DictReader(text)
+            if not reader.fieldnames or 'question' not in reader.fieldnames or 'answer1' not in reader.fieldnames:
+                job.finish("failed", "Missing required headers")
+                return False
+
+            for row in reader:
+                job.rows_read += 1
+                if self.max_rows is not None and job.rows_read > self.max_rows:
+                    job.finish("failed", f"File exceeds the {self.max_rows} row limit")
+                    return False
+                # Line of the row in the file, counting the header as line 1
+                error = self._stage(row)
+                if error:
+                    job.add_error(reader.line_num, error)
+        except UnicodeDecodeError:
+            job.finish("failed", "File is not valid UTF-8")
+            return False
+        except (csv.Error, ValueError) as e:
+            job.finish("failed", f"Line {reader.line_num}: {e}")
+            return False
+        finally:
+            text.detach()
+
+        if job.error_count and job.on_error == "reject":
+            job.finish("failed", f"{job.error_count} invalid rows")
+            return False
+        self.staging.flush()
+        return True
+
+    def _stage(self, row):
+        # Cells past the header (row[None]) are ignored, as they always were
+        q = (row['question'] or '').strip().lower()
+        answers = [row[key].strip() for key in ANSWER_COLUMNS if row.get(key) and row[key].strip()]
+        if not q and not answers:
+            # Blank line padded with commas; not worth reporting
+            return None
+        if not q:
+            return "Missing question"
+        if not answers:
+            return "No answers"
+        self.staging.write(json.dumps([q, answers], ensure_ascii=False) + "\n")
+        self.job.rows_staged += 1
+        return None
+
+    def batches(self, size=1000):
+        """Yield staged rows as lists of (question, answers), in file order"""
+        self.staging.seek(0)
+        batch = []
+        for line in self.staging:
+            batch.append(tuple(json.loads(line)))
+            if len(batch) >= size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+
+    def records(self, conflict="last-wins"):
+        for batch in self.batches():
+            for q, answers in batch:
+                yield from row_records(q, answers, conflict)
+
+    def keep(self):
+        """Close the staging file but leave it on disk; returns its path"""
+        self.staging.close()
+        return self.staging_path
+
+    def close(self):
+        self.staging.close()
+        if os.path.exists(self.staging_path):
+            os.remove(self.staging_path)
+
+
+def row_records(q, answers, conflict="last-wins"):
+    """Edit records applying one imported row under a conflict policy"""
+    if conflict == "merge":
+        return [{"op": "add_question", "question": q, "answer": a} for a in answers]
+    return [{"op": "set_question", "question": q, "answers": answers}]
+
+
+def stage_csv_file(path, on_error="skip", max_rows=None, max_bytes=None):
+    """Stage one CSV file; returns (job, staging path or None on failure).
+
+    Runs in a worker process, so only the job and the path travel back.
+    """
+    job = ImportJob(path, on_error)
+    staged = StagedImport(job, max_rows=max_rows, max_bytes=max_bytes)
+    try:
+        with open(path, 'rb') as f:
+            ok = staged.parse(f)
+    except OSError as e:
+        job.finish("failed", str(e))
+        ok = False
+    if not ok:
+        staged.close()
+        return job, None
+    job.status = "staged"
+    return job, staged.keep()
+
+
+def expand_import_paths(specs):
+    """Resolve files, directories (their *.csv files) and glob patterns, in order"""
+    paths = []
+    for spec in specs:
+        if os.path.isdir(spec):
+            matches = sorted(glob.glob(os.path.join(spec, '*.csv')))
+        elif glob.has_magic(spec):
+            matches = sorted(glob.glob(spec))
+        else:
+            matches = [spec]
+        for path in matches:
+            if path not in paths:
+                paths.append(path)
+    return paths
+
+
+def find_conflicts(staged_imports, existing=(), limit=100):
+    """Questions staged more than once across the imports, or already among
+    the `existing` ones, as (question, source) pairs"""
+    seen = set()
+    conflicts = []
+    for staged in staged_imports:
+        for batch in staged.batches():
+            for q, _ in batch:
+                if q in seen or q in existing:
+                    conflicts.append((q, staged.job.source))
+                    if len(conflicts) >= limit:
+                        return conflicts
+                seen.add(q)
+    return conflicts
+
+
+class ImportJobs:
+    """The most recent import jobs, by id"""
+
+    def __init__(self, max_jobs=20):
+        self.max_jobs = max_jobs
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def add(self, job):
+        with self.lock:
+            self.jobs[job.id] = job
+            finished = [j for j in self.jobs.values() if j.done]
+            while len(self.jobs) > self.max_jobs and finished:
+                del self.jobs[finished.pop(0).id]
+
+    def get(self, job_id):
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self):
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
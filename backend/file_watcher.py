@@ -0,0 +1,85 @@
+import logging
+import os
+import threading
+
+
+class FileWatcher:
+    """Poll files by (mtime, size) and run a callback when one changes.
+
+    A change is reported only once the new signature has been seen on two
+    consecutive polls, so a file that is still being written is not read
+    half-way. Callbacks run on the polling thread, off the request path.
+    """
+
+    def __init__(self, callbacks, interval=2.0):
+        self.callbacks = dict(callbacks)
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.signatures = {path: self._signature(path) for path in self.callbacks}
+        self.pending = {}
+        self.reloads = 0
+        self.failures = 0
+        self.stopped = threading.Event()
+        self.thread = None
+        if interval:
+            self.thread = threading.Thread(target=self._run, name="file-watcher", daemon=True)
+            self.thread.start()
+
+    @staticmethod
+    def _signature(path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def refresh(self, path):
+        """Record the current state of path as already seen"""
+        with self.lock:
+            if path in self.callbacks:
+                self.signatures[path] = self._signature(path)
+                self.pending.pop(path, None)
+
+    def poll(self):
+        """Check every file once; returns the paths whose callbacks ran"""
+        changed = []
+        for path, callback in self.callbacks.items():
+            signature = self._signature(path)
+            with self.lock:
+                if signature == self.signatures.get(path):
+                    self.pending.pop(path, None)
+                    continue
+                if path not in self.pending or self.pending[path] != signature:
+                    # Wait for the file to settle
+                    self.pending[path] = signature
+                    continue
+                del self.pending[path]
+                self.signatures[path] = signature
+            if signature is None:
+                # Deleted; keep serving what is loaded
+                continue
+            try:
+                callback(path)
+                self.reloads += 1
+                changed.append(path)
+            except Exception as e:
+                logging.error(f"Reloading {path} failed: {e}")
+                self.failures += 1
+        return changed
+
+    def _run(self):
+        while not self.stopped.wait(self.interval):
+            self.poll()
+
+    def close(self):
+        self.stopped.set()
+        if self.thread is not None:
+            self.thread.join()
+
+    def stats(self):
+        return {
+            "files": sorted(self.callbacks),
+            "interval": self.interval,
+            "reloads": self.reloads,
+            "failures": self.failures
+        }
@@ -0,0 +1,105 @@
+import re
+
+
+class Intent:
+    __slots__ = ("name", "handler", "phrases", "patterns", "when")
+
+    def __init__(self, name, handler, phrases=(), patterns=(), when=None):
+        self.name = name
+        self.handler = handler
+        self.phrases = tuple(phrases)
+        self.patterns = tuple(patterns)
+        self.when = when
+
+
+class IntentRouter:
+    """Dispatch built-in intents before the knowledge base lookup.
+
+    Exact phrases go into one dict and all regex patterns are joined into a
+    single compiled alternation, so routing costs one hash lookup and at most
+    one regex match however many intents are registered. Intents with a
+    `when` predicate only (e.g. an active trivia game) are checked last, in
+    registration order.
+    """
+
+    def __init__(self):
+        self.intents = {}
+        self.hits = {}
+        # (exact phrases, joined pattern, pattern group -> intent, conditional),
+        # replaced as a whole by compile()
+        self.tables = ({}, None, {}, [])
+        self.compiled = True
+
+    def register(self, name, handler, phrases=(), patterns=(), when=None):
+        if name in self.intents:
+            raise ValueError(f"Intent already registered: {name}")
+        self.intents[name] = Intent(name, handler, phrases, patterns, when)
+        self.hits[name] = 0
+        self.compiled = False
+
+    def unregister(self, name):
+        if self.intents.pop(name, None) is None:
+            return False
+        self.hits.pop(name, None)
+        self.compiled = False
+        return True
+
+    def compile(self):
+        # Built aside and swapped in with one assignment, so a concurrent
+        # match() never sees half-compiled tables
+        exact = {}
+        conditional = []
+        pattern_groups = {}
+        alternatives = []
+        group = 1
+        for intent in self.intents.values():
+            for phrase in intent.phrases:
+                exact.setdefault(phrase.strip().lower(), intent)
+            for pattern in intent.patterns:
+                # Each pattern is wrapped in its own group; lastindex on a
+                # match identifies the outer group and therefore the intent
+                pattern_groups[group] = intent
+                alternatives.append(f"({pattern})")
+                group += 1 + re.compile(pattern).groups
+            if intent.when is not None and not intent.phrases and not intent.patterns:
+                conditional.append(intent)
+        pattern = re.compile("|".join(alternatives)) if alternatives else None
+        self.tables = (exact, pattern, pattern_groups, conditional)
+        self.compiled = True
+
+    def match(self, q):
+        """Return the intent for the already lowercased query, or None"""
+        if not self.compiled:
+            self.compile()
+
+        exact, pattern, pattern_groups, conditional = self.tables
+        intent = exact.get(q)
+        if intent is None and pattern is not None:
+            m = pattern.fullmatch(q)
+            if m:
+                intent = pattern_groups[m.lastindex]
+        if intent is not None and (intent.when is None or intent.when()):
+            return intent
+
+        for intent in conditional:
+            if intent.when():
+                return intent
+        return None
+
+    def route(self, q, query):
+        intent = self.match(q)
+        if intent is None:
+            return None
+        self.hits[intent.name] += 1
+        return intent.handler(query)
+
+    def stats(self):
+        return [
+            {
+                "name": intent.name,
+                "phrases": len(intent.phrases),
+                "patterns": len(intent.patterns),
+                "hits": self.hits[intent.name]
+            }
+            for intent in self.intents.values()
+        ]
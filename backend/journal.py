@@ -0,0 +1,130 @@
+import json
+import logging
+import os
+import threading
+import time
+
+SYNC_POLICIES = ("always", "batch", "none")
+
+
+class Journal:
+    """Append-only log of knowledge base mutations (one JSON record per line).
+
+    Records are fsynced according to the sync policy:
+      always - fsync after every record
+      batch  - group commit: fsync once batch_size records are pending or
+               sync_interval seconds have passed since the oldest one
+      none   - leave flushing to the operating system
+
+    Compaction rotates the active file to `<path>.compacting`; once the
+    caller has written a fresh snapshot it calls finish_compaction() to drop
+    it. Replay reads a left-over rotated file first, so a crash mid-compaction
+    loses nothing as long as records are idempotent.
+    """
+
+    def __init__(self, path, sync_policy="batch", batch_size=64, sync_interval=1.0,
+                 compact_threshold=4 * 1024 * 1024):
+        if sync_policy not in SYNC_POLICIES:
+            raise ValueError(f"Unknown sync policy: {sync_policy}")
+        self.path = path
+        self.compacting_path = path + ".compacting"
+        self.sync_policy = sync_policy
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+        self.compact_threshold = compact_threshold
+        self.lock = threading.Lock()
+        self.pending = 0
+        self.oldest_pending = None
+        self.records_written = 0
+        self.file = open(self.path, mode='a', encoding='utf-8')
+        self.size = self.file.tell()
+
+        self.closed = threading.Event()
+        self.flusher = None
+        if self.sync_policy == "batch":
+            self.flusher = threading.Thread(target=self._flush_loop, name="journal-flusher", daemon=True)
+            self.flusher.start()
+
+    def replay(self):
+        """Yield every record from the rotated and active files, oldest first"""
+        for path in (self.compacting_path, self.path):
+            if not os.path.exists(path):
+                continue
+            with open(path, mode='r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, 1):
+                    if not line.strip():
+                        continue
+                    try:
+                        yield json.loads(line)
+                    except ValueError:
+                        # A torn final write from a crash; everything before it is intact
+                        logging.warning(f"Skipping corrupt journal record {path}:{line_number}")
+
+    def append(self, record):
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        with self.lock:
+            self.file.write(line)
+            self.file.flush()
+            self.size += len(line.encode('utf-8'))
+            self.records_written += 1
+            self.pending += 1
+            if self.oldest_pending is None:
+                self.oldest_pending = time.monotonic()
+            if self.sync_policy == "always" or (
+                    self.sync_policy == "batch" and self.pending >= self.batch_size):
+                self._sync()
+
+    def _sync(self):
+        if self.pending:
+            os.fsync(self.file.fileno())
+            self.pending = 0
+            self.oldest_pending = None
+
+    def sync(self):
+        with self.lock:
+            self._sync()
+
+    def _flush_loop(self):
+        while not self.closed.wait(self.sync_interval / 2):
+            with self.lock:
+                if self.oldest_pending is not None and \
+                        time.monotonic() - self.oldest_pending >= self.sync_interval:
+                    self._sync()
+
+    def needs_compaction(self):
+        return self.size >= self.compact_threshold and not os.path.exists(self.compacting_path)
+
+    def begin_compaction(self):
+        """Rotate the active file; returns False if a compaction is already running"""
+        with self.lock:
+            if os.path.exists(self.compacting_path):
+                return False
+            self._sync()
+            self.file.close()
+            os.replace(self.path, self.compacting_path)
+            self.file = open(self.path, mode='a', encoding='utf-8')
+            self.size = 0
+            return True
+
+    def finish_compaction(self):
+        if os.path.exists(self.compacting_path):
+            os.remove(self.compacting_path)
+
+    def close(self):
+        self.closed.set()
+        if self.flusher is not None:
+            self.flusher.join()
+        with self.lock:
+            if not self.file.closed:
+                self._sync()
+                self.file.close()
+
+    def stats(self):
+        return {
+            "path": self.path,
+            "sync_policy": self.sync_policy,
+            "size": self.size,
+            "records_written": self.records_written,
+            "unsynced": self.pending,
+            "compact_threshold": self.compact_threshold
+        }
@@ -0,0 +1,228 @@
+import mmap
+import os
+import struct
+from collections.abc import MutableMapping
+
+MAGIC = b"CBKB"
+FORMAT_VERSION = 1
+
+# magic, format version, question/answer/trivia/canonical counts, then the
+# byte offsets of the index, answer, canonical, trivia and string sections
+HEADER = struct.Struct("<4sIIIII5Q")
+INDEX_ENTRY = struct.Struct("<IIII")      # key offset, key length, first answer, answer count
+ANSWER_ENTRY = struct.Struct("<II")       # answer offset, answer length
+CANONICAL_ENTRY = struct.Struct("<III")   # canonical offset, canonical length, index entry
+TRIVIA_ENTRY = struct.Struct("<12I")      # question, four options, correct answer as (offset, length)
+
+
+class _StringTable:
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = {}
+
+    def add(self, text):
+        """Intern text and return its (offset, length) in the table"""
+        ref = self.offsets.get(text)
+        if ref is None:
+            encoded = text.encode('utf-8')
+            ref = (len(self.data), len(encoded))
+            self.data += encoded
+            self.offsets[text] = ref
+        return ref
+
+
+def compile_snapshot(questions, trivia_questions, path, normalizer=None):
+    """Write the KB as a versioned binary snapshot at path (atomically)"""
+    strings = _StringTable()
+    keys = sorted(questions, key=lambda q: q.encode('utf-8'))
+
+    index, answers = bytearray(), bytearray()
+    answer_count = 0
+    for key in keys:
+        key_off, key_len = strings.add(key)
+        key_answers = list(questions[key])
+        index += INDEX_ENTRY.pack(key_off, key_len, answer_count, len(key_answers))
+        for answer in key_answers:
+            answers += ANSWER_ENTRY.pack(*strings.add(answer))
+        answer_count += len(key_answers)
+
+    canonical = bytearray()
+    canonical_count = 0
+    if normalizer is not None:
+        seen = {}
+        for position, key in enumerate(keys):
+            seen.setdefault(normalizer(key), position)
+        for form in sorted(seen, key=lambda c: c.encode('utf-8')):
+            canonical += CANONICAL_ENTRY.pack(*strings.add(form), seen[form])
+            canonical_count += 1
+
+    trivia = bytearray()
+    for item in trivia_questions:
+        refs = []
+        for text in [item['question']] + list(item['options']) + [item['correct_answer']]:
+            refs.extend(strings.add(text))
+        trivia += TRIVIA_ENTRY.pack(*refs)
+
+    index_off = HEADER.size
+    answers_off = index_off + len(index)
+    canonical_off = answers_off + len(answers)
+    trivia_off = canonical_off + len(canonical)
+    strings_off = trivia_off + len(trivia)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, len(keys), answer_count, len(trivia_questions),
+                         canonical_count, index_off, answers_off, canonical_off, trivia_off, strings_off)
+
+    temp_path = path + ".tmp"
+    with open(temp_path, 'wb') as f:
+        for section in (header, index, answers, canonical, trivia, strings.data):
+            f.write(section)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(temp_path, path)
+    return len(keys)
+
+
+class KBSnapshot:
+    """Read-only view of a compiled snapshot, served from a memory map.
+
+    Lookups binary-search the sorted index directly in the mapped buffer and
+    decode only the strings they return, so opening a snapshot costs the same
+    whatever its size and every process mapping it shares the page cache.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        with open(path, 'rb') as f:
+            self.buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, self.question_count, self.answer_count, self.trivia_count,
+         self.canonical_count, self.index_off, self.answers_off, self.canonical_off,
+         self.trivia_off, self.strings_off) = HEADER.unpack_from(self.buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.buffer.close()
+            raise ValueError(f"Not a compatible KB snapshot: {path}")
+
+    def __len__(self):
+        return self.question_count
+
+    def __contains__(self, key):
+        return self._find(key) is not None
+
+    def _bytes(self, offset, length):
+        start = self.strings_off + offset
+        return self.buffer[start:start + length]
+
+    def _text(self, offset, length):
+        return self._bytes(offset, length).decode('utf-8')
+
+    def _search(self, target, base, entry, count):
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            fields = entry.unpack_from(self.buffer, base + mid * entry.size)
+            probe = self._bytes(fields[0], fields[1])
+            if probe < target:
+                lo = mid + 1
+            elif probe > target:
+                hi = mid
+            else:
+                return fields
+        return None
+
+    def _find(self, key):
+        return self._search(key.encode('utf-8'), self.index_off, INDEX_ENTRY, self.question_count)
+
+    def _answers(self, first, count):
+        return [
+            self._text(*ANSWER_ENTRY.unpack_from(self.buffer, self.answers_off + i * ANSWER_ENTRY.size))
+            for i in range(first, first + count)
+        ]
+
+    def get_answers(self, key):
+        fields = self._find(key)
+        if fields is None:
+            return None
+        return self._answers(fields[2], fields[3])
+
+    def key_at(self, position):
+        key_off, key_len, _, _ = INDEX_ENTRY.unpack_from(self.buffer, self.index_off + position * INDEX_ENTRY.size)
+        return self._text(key_off, key_len)
+
+    def keys(self):
+        for position in range(self.question_count):
+            yield self.key_at(position)
+
+    def canonical_key(self, canonical):
+        """Key stored for a canonical form compiled into the snapshot, or None"""
+        fields = self._search(canonical.encode('utf-8'), self.canonical_off, CANONICAL_ENTRY,
+                              self.canonical_count)
+        return self.key_at(fields[2]) if fields else None
+
+    def trivia(self):
+        items = []
+        for i in range(self.trivia_count):
+            refs = TRIVIA_ENTRY.unpack_from(self.buffer, self.trivia_off + i * TRIVIA_ENTRY.size)
+            texts = [self._text(refs[j], refs[j + 1]) for j in range(0, 12, 2)]
+            items.append({'question': texts[0], 'options': texts[1:5], 'correct_answer': texts[5]})
+        return items
+
+    def close(self):
+        self.buffer.close()
+
+
+class SnapshotQuestions(MutableMapping):
+    """The questions dict API over a snapshot plus in-memory edits.
+
+    Reads fall through to the mapped snapshot; additions and replacements
+    live in `changed` and removals in `removed`, so the snapshot itself is
+    never modified.
+    """
+
+    def __init__(self, snapshot):
+        self.snapshot = snapshot
+        self.changed = {}
+        self.removed = set()
+        self.size = len(snapshot)
+
+    def copy(self):
+        other = SnapshotQuestions(self.snapshot)
+        other.changed = dict(self.changed)
+        other.removed = set(self.removed)
+        other.size = self.size
+        return other
+
+    def __getitem__(self, key):
+        if key in self.changed:
+            return self.changed[key]
+        if key in self.removed:
+            raise KeyError(key)
+        answers = self.snapshot.get_answers(key)
+        if answers is None:
+            raise KeyError(key)
+        return answers
+
+    def __contains__(self, key):
+        if key in self.changed:
+            return True
+        return key not in self.removed and key in self.snapshot
+
+    def __setitem__(self, key, answers):
+        if key not in self:
+            self.size += 1
+        self.changed[key] = answers
+        self.removed.discard(key)
+
+    def __delitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        self.changed.pop(key, None)
+        if key in self.snapshot:
+            self.removed.add(key)
+        self.size -= 1
+
+    def __iter__(self):
+        for key in self.snapshot.keys():
+            if key not in self.removed and key not in self.changed:
+                yield key
+        yield from list(self.changed)
+
+    def __len__(self):
+        return self.size
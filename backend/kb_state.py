@@ -0,0 +1,70 @@
+class KBState:
+    """One version of the knowledge base: its questions, trivia and number.
+
+    A published state is never modified. Writers call edit() for a private
+    copy carrying the next version number, change that, and publish it by
+    swapping a single reference, so a reader that took the previous state
+    keeps a consistent view without taking any lock. The keys an edit adds,
+    removes and stores answers under are recorded so the derived indexes and
+    other processes (see change_records) can follow it.
+    """
+
+    __slots__ = ("version", "questions", "trivia", "added", "removed", "changed")
+
+    def __init__(self, version, questions, trivia):
+        self.version = version
+        self.questions = questions
+        self.trivia = trivia
+        self.added = set()
+        self.removed = set()
+        self.changed = set()
+
+    def edit(self):
+        return KBState(self.version + 1, self.questions.copy(), list(self.trivia))
+
+    def store_answer(self, q, a):
+        if q in self.questions:
+            answers = self.questions[q]
+            if a not in answers:
+                self.questions[q] = answers + [a]
+                self.changed.add(q)
+        else:
+            self.store_answers(q, [a])
+
+    def store_answers(self, q, answers):
+        if q not in self.questions:
+            if q in self.removed:
+                self.removed.discard(q)
+            else:
+                self.added.add(q)
+        self.questions[q] = answers
+        self.changed.add(q)
+
+    def delete(self, q):
+        del self.questions[q]
+        self.changed.discard(q)
+        if q in self.added:
+            self.added.discard(q)
+        else:
+            self.removed.add(q)
+
+    def change_records(self, previous):
+        """Journal-style records that turn previous into this state.
+
+        Trivia appended to the previous list get an add_trivia record each;
+        only a list replaced as a whole (a reload) is sent in full.
+        """
+        records = [{"op": "remove_question", "question": q} for q in self.removed]
+        records += [{"op": "set_question", "question": q, "answers": list(self.questions[q])}
+                    for q in self.changed]
+        kept = len(previous.trivia)
+        if len(self.trivia) >= kept and all(a is b for a, b in zip(self.trivia, previous.trivia)):
+            records += [{"op": "add_trivia", "trivia": trivia_record(item)} for item in self.trivia[kept:]]
+        else:
+            records.append({"op": "set_trivia", "trivia": [trivia_record(item) for item in self.trivia]})
+        return records
+
+
+def trivia_record(item):
+    return {"question": item["question"], "options": list(item["options"]),
+            "correct_answer": item["correct_answer"]}
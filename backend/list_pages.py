@@ -0,0 +1,123 @@
+"""Serialized responses of the question and trivia list routes.
+
+Both lists are served whole (in KB order, as before) or, when the caller
+passes `limit` or `cursor`, one page at a time in alphabetical order. A
+cursor names the last item of the previous page rather than an offset, so
+paging stays correct while questions are added or removed. `q` keeps only
+the items containing it, ignoring case.
+
+Responses are cached as JSON bytes per KB version. Their ETag is that
+version (see etag()), so a client that already holds it gets a 304 without
+the list being filtered or serialized at all.
+"""
+import base64
+import json
+from bisect import bisect_left, bisect_right
+
+from query_cache import QueryCache
+
+# Page size when only a cursor is given, and the largest one served
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+# The items each list serves, by its key in the response
+LISTS = {
+    "questions": lambda kb: list(kb.questions.keys()),
+    "trivia_questions": lambda kb: [q['question'] for q in kb.trivia],
+}
+
+
+def dump_json(payload):
+    # Byte for byte what Flask's jsonify() sends outside debug mode
+    return (json.dumps(payload, sort_keys=True, ensure_ascii=True, separators=(",", ":")) + "\n").encode()
+
+
+def encode_cursor(last, seen):
+    raw = json.dumps([last, seen], ensure_ascii=False, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """(last item of the previous page, how many copies of it were served)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        last, seen = json.loads(raw)
+    except ValueError:
+        raise ValueError("Invalid cursor")
+    if not isinstance(last, str) or not isinstance(seen, int) or seen < 1:
+        raise ValueError("Invalid cursor")
+    return last, seen
+
+
+def etag(epoch, version):
+    """ETag of every list response made from KB `version`.
+
+    `epoch` tells apart KB versions of different server runs, which all
+    start counting from zero (see ChatBot.kb_epoch).
+    """
+    return f'"{epoch}-{version}"'
+
+
+def not_modified(if_none_match, etag):
+    """Whether an If-None-Match header already names etag"""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
+
+
+class ListPages:
+    """Cache of list responses, keyed by list, filter and page"""
+
+    def __init__(self, max_size=256, ttl=300):
+        self.pages = QueryCache(max_size=max_size, ttl=ttl)
+        # Filtered (and, for paging, sorted) items the pages are cut from
+        self.items = QueryCache(max_size=16, ttl=ttl)
+
+    def get(self, name, kb, query="", cursor=None, limit=None):
+        """The JSON body listing `name` from kb; raises ValueError on bad paging"""
+        paged = cursor is not None or limit is not None
+        if paged:
+            limit = DEFAULT_PAGE_SIZE if limit is None else limit
+            if not 1 <= limit <= MAX_PAGE_SIZE:
+                raise ValueError(f"limit must be between 1 and {MAX_PAGE_SIZE}")
+            # Checked before the cache so a bad cursor is never stored
+            after = decode_cursor(cursor) if cursor else None
+        key = (name, query, cursor, limit)
+        body = self.pages.get(key, kb.version)
+        if body is not None:
+            return body
+
+        items = self.matching(name, kb, query, paged)
+        if not paged:
+            body = dump_json({name: items, "kb_version": kb.version})
+        else:
+            start = 0
+            if after is not None:
+                last, seen = after
+                start = min(bisect_left(items, last) + seen, bisect_right(items, last))
+            page = items[start:start + limit]
+            next_cursor = None
+            if start + limit < len(items):
+                last = page[-1]
+                next_cursor = encode_cursor(last, start + limit - bisect_left(items, last))
+            body = dump_json({name: page, "kb_version": kb.version,
+                              "next_cursor": next_cursor, "total": len(items)})
+        self.pages.put(key, kb.version, body)
+        return body
+
+    def matching(self, name, kb, query, ordered):
+        key = (name, query, ordered)
+        items = self.items.get(key, kb.version)
+        if items is None:
+            items = LISTS[name](kb)
+            if query:
+                folded = query.casefold()
+                items = [item for item in items if folded in item.casefold()]
+            if ordered:
+                items.sort()
+            self.items.put(key, kb.version, items)
+        return items
+
+    def stats(self):
+        return self.pages.stats()
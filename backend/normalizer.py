@@ -0,0 +1,98 @@
+import re
+import unicodedata
+
+CONTRACTIONS = {
+    "what's": "what is",
+    "where's": "where is",
+    "when's": "when is",
+    "who's": "who is",
+    "how's": "how is",
+    "that's": "that is",
+    "there's": "there is",
+    "it's": "it is",
+    "let's": "let us",
+    "can't": "cannot",
+    "won't": "will not",
+    "shan't": "shall not",
+    "i'm": "i am",
+    "n't": " not",
+    "'re": " are",
+    "'ve": " have",
+    "'ll": " will",
+    "'d": " would"
+}
+
+STOPWORDS = frozenset([
+    "a", "an", "the", "please", "pls", "plz", "hey", "hi", "hello", "um", "uh", "so", "just", "kindly"
+])
+
+# Words that carry no topic, left out of similarity scoring (see TfidfIndex).
+# Unlike STOPWORDS they stay in canonical forms: "who are you" is not "you".
+MATCH_STOPWORDS = STOPWORDS | frozenset([
+    "what", "who", "whom", "whose", "where", "when", "why", "how", "which",
+    "is", "are", "was", "were", "be", "been", "am", "do", "does", "did", "can", "could",
+    "will", "would", "shall", "should", "may", "might", "must", "have", "has", "had",
+    "i", "me", "my", "you", "your", "we", "us", "our", "he", "him", "his", "she", "her",
+    "it", "its", "they", "them", "their", "this", "that", "these", "those", "there",
+    "of", "to", "in", "on", "at", "for", "with", "from", "by", "about", "and", "or",
+    "not", "s", "tell", "know"
+])
+
+APOSTROPHES = str.maketrans({"‘": "'", "’": "'", "ʼ": "'", "`": "'"})
+
+
+class Normalizer:
+    """Canonical form of a question, compiled once from its configuration.
+
+    Steps run in order: unicode folding, contraction expansion, punctuation
+    removal, stopword removal and whitespace collapsing.
+    """
+
+    def __init__(self, fold_unicode=True, expand_contractions=True, strip_punctuation=True,
+                 remove_stopwords=True, stopwords=STOPWORDS, contractions=CONTRACTIONS):
+        self.fold_unicode = fold_unicode
+        self.expand_contractions = expand_contractions
+        self.strip_punctuation = strip_punctuation
+        self.remove_stopwords = remove_stopwords
+        self.stopwords = frozenset(stopwords)
+        self.contractions = dict(contractions)
+
+        # Whole-word contractions first, then the generic suffixes
+        whole = sorted((c for c in self.contractions if not c.startswith(("'", "n'"))), key=len, reverse=True)
+        suffixes = sorted((c for c in self.contractions if c.startswith(("'", "n'"))), key=len, reverse=True)
+        pattern = "|".join([r"\b" + re.escape(c) + r"\b" for c in whole] +
+                           [re.escape(c) + r"\b" for c in suffixes])
+        self.contraction_pattern = re.compile(pattern) if pattern else None
+        # Lets normalize() skip the contraction scan for text without an apostrophe
+        self.contractions_need_apostrophe = all("'" in c for c in self.contractions)
+        self.punctuation_pattern = re.compile(r"[^\w\s]+")
+
+    def __call__(self, text):
+        return self.normalize(text)
+
+    def normalize(self, text):
+        if "`" in text or not text.isascii():
+            text = text.translate(APOSTROPHES)
+        if text.isascii():
+            # Nothing to fold, and casefold() is lower() on ASCII
+            text = text.lower()
+        elif self.fold_unicode:
+            text = unicodedata.normalize("NFKD", text)
+            text = "".join(c for c in text if not unicodedata.combining(c))
+            text = text.casefold()
+        else:
+            text = text.lower()
+
+        if self.expand_contractions and self.contraction_pattern and \
+                ("'" in text or not self.contractions_need_apostrophe):
+            text = self.contraction_pattern.sub(lambda m: self.contractions[m.group(0)], text)
+
+        if self.strip_punctuation:
+            text = self.punctuation_pattern.sub(" ", text)
+
+        words = text.split()
+        if self.remove_stopwords:
+            kept = [w for w in words if w not in self.stopwords]
+            # Never reduce a question to nothing
+            words = kept or words
+        return " ".join(words)
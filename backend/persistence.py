@@ -0,0 +1,131 @@
+import logging
+import threading
+import time
+
+
+class BackgroundWriter:
+    """Run save callbacks on a dedicated thread, coalescing bursts of edits.
+
+    Edits call mark_dirty(kind, version) with the KB version they published
+    (or no version, to count edits). The writer waits until no edit has
+    arrived for `debounce` seconds (or at most `max_delay` seconds after the
+    first pending edit) and then runs each dirty kind's save callback once.
+    last_persisted_version is the newest version known to be on disk, so
+    callers that need durability can wait_for() the version of their edit.
+    """
+
+    def __init__(self, savers, debounce=0.5, max_delay=5.0, version=0):
+        self.savers = dict(savers)
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.condition = threading.Condition()
+        self.dirty = set()
+        # The version already on disk when the writer starts
+        self.version = version
+        self.last_persisted_version = version
+        self.first_mark = None
+        self.last_mark = None
+        self.flush_requested = False
+        self.closing = False
+        self.writes = 0
+        self.failures = 0
+        self.thread = threading.Thread(target=self._run, name="background-writer", daemon=True)
+        self.thread.start()
+
+    def mark_dirty(self, kind, version=None):
+        if kind not in self.savers:
+            raise ValueError(f"No saver registered for {kind}")
+        with self.condition:
+            now = time.monotonic()
+            self.dirty.add(kind)
+            self.version = self.version + 1 if version is None else max(self.version, version)
+            if self.first_mark is None:
+                self.first_mark = now
+            self.last_mark = now
+            self.condition.notify_all()
+            return self.version
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.dirty and not self.closing:
+                    self.condition.wait()
+                if not self.dirty:
+                    return
+
+                # Debounce: wait for the burst to settle, bounded by max_delay
+                while not self.flush_requested and not self.closing:
+                    now = time.monotonic()
+                    deadline = min(self.last_mark + self.debounce, self.first_mark + self.max_delay)
+                    if now >= deadline:
+                        break
+                    self.condition.wait(deadline - now)
+
+                kinds = self.dirty
+                target = self.version
+                self.dirty = set()
+                self.first_mark = self.last_mark = None
+                self.flush_requested = False
+
+            failed = set()
+            for kind in kinds:
+                try:
+                    if self.savers[kind]() is False:
+                        failed.add(kind)
+                except Exception as e:
+                    logging.error(f"Background save of {kind} failed: {e}")
+                    failed.add(kind)
+
+            with self.condition:
+                self.writes += len(kinds) - len(failed)
+                if failed:
+                    # Retry on the next cycle rather than claiming durability
+                    self.failures += len(failed)
+                    self.dirty |= failed
+                    now = time.monotonic()
+                    self.first_mark = self.first_mark or now
+                    self.last_mark = self.last_mark or now
+                    if self.closing:
+                        return
+                else:
+                    self.last_persisted_version = max(self.last_persisted_version, target)
+                self.condition.notify_all()
+
+    def wait_for(self, version, timeout=None):
+        """Block until version is persisted; returns False on timeout.
+
+        Versions past the last one marked had nothing to save, so they
+        only wait for the edits marked before them.
+        """
+        with self.condition:
+            return self.condition.wait_for(
+                lambda: self.last_persisted_version >= min(version, self.version), timeout)
+
+    def flush(self, timeout=None):
+        """Write pending changes now and wait for them to reach disk"""
+        with self.condition:
+            target = self.version
+            if self.last_persisted_version >= target:
+                return True
+            self.flush_requested = True
+            self.condition.notify_all()
+        return self.wait_for(target, timeout)
+
+    def close(self, timeout=5.0):
+        flushed = self.flush(timeout)
+        with self.condition:
+            self.closing = True
+            self.condition.notify_all()
+        self.thread.join(timeout)
+        return flushed
+
+    def stats(self):
+        with self.condition:
+            return {
+                "version": self.version,
+                "last_persisted_version": self.last_persisted_version,
+                "pending": sorted(self.dirty),
+                "writes": self.writes,
+                "failures": self.failures,
+                "debounce": self.debounce
+            }
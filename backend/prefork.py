@@ -0,0 +1,384 @@
+"""Pre-fork multi-process serving: worker processes over a single KB writer.
+
+The supervisor process owns the writer, the one ChatBot that applies edits
+and persists them (CSV, journal or SQLite, as configured). Workers are
+forked from a forkserver with the app modules preloaded and all accept on
+one listening socket. Each maps the same compiled snapshot, so the KB is
+shared through the page cache rather than loaded per process; only the
+search indexes and edits made since the snapshot are per worker.
+
+Edits made through a worker are sent to the writer over a pipe. Every
+version the writer publishes is broadcast to all workers as journal-style
+records (see KBState.change_records), which they publish under the same
+version number; that also retires their cached answers. The worker that
+made an edit waits for its broadcast before replying, so a client always
+reads its own writes.
+
+Per-caller state lives in the writer too, since a client's next request may
+reach another worker. A worker checks a session's trivia game out of the
+writer for the length of a request and back in if it changed; the writer
+broadcasts which sessions have a game in play, so requests of the others
+(most of them) need no round trip. Import jobs are reported to the writer
+as they run, and listed from there.
+"""
+import logging
+import multiprocessing
+import os
+import queue
+import signal
+import socket
+import sys
+import threading
+import time
+from multiprocessing.connection import wait
+
+from csv_import import ImportJob, StagedImport
+from kb_snapshot import compile_snapshot
+
+# Snapshot the workers map, recompiled from the writer's KB as they start
+SNAPSHOT_PATH = "workers.kb"
+
+# Edits a worker may ask the writer for
+WRITER_METHODS = ("add_question", "remove_question", "add_trivia_question", "apply_staged")
+
+# Per-caller state a worker keeps in the writer, run by Writer itself
+SESSION_METHODS = ("checkout_trivia_game", "checkin_trivia_game", "trivia_session_stats",
+                   "report_import_job", "import_job", "import_jobs")
+
+# Seconds between progress reports of a worker's running imports
+JOB_REPORT_INTERVAL = 0.5
+
+# Seconds a worker waits for the broadcast of its own edit
+READ_YOUR_WRITES_TIMEOUT = 30.0
+
+
+class WriterClient:
+    """Worker side of the channels to the writer, set as ChatBot.primary"""
+
+    def __init__(self, chatbot, requests, changes, timeout=READ_YOUR_WRITES_TIMEOUT):
+        self.chatbot = chatbot
+        self.requests = requests
+        self.changes = changes
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.applied = threading.Condition()
+        # Sessions with a trivia game in play, as broadcast by the writer
+        self.trivia_in_play = set()
+
+    def call(self, method, *args):
+        with self.lock:
+            self.requests.send((method, args))
+            status, result, version = self.requests.recv()
+        if status == "error":
+            raise RuntimeError(result)
+        with self.applied:
+            if not self.applied.wait_for(lambda: self.chatbot.kb.version >= version, self.timeout):
+                logging.warning(f"KB version {version} not received after {self.timeout}s")
+        return result
+
+    def checkout_trivia_game(self, session_id):
+        """session_id's game state from the writer, or None if not in play"""
+        if session_id not in self.trivia_in_play:
+            return None
+        state = self.call("checkout_trivia_game", session_id)
+        if state is None:
+            # Ended or expired since
+            self.trivia_in_play.discard(session_id)
+        return state
+
+    def checkin_trivia_game(self, session_id, state):
+        self.call("checkin_trivia_game", session_id, state)
+        # This worker sees its own change before the broadcast arrives
+        if state["active"]:
+            self.trivia_in_play.add(session_id)
+        else:
+            self.trivia_in_play.discard(session_id)
+
+    def follow(self):
+        """Publish each version broadcast by the writer, until it goes away"""
+        while True:
+            try:
+                message = self.changes.recv()
+            except (EOFError, OSError):
+                # Serving on without edits would go stale; let the supervisor decide
+                logging.warning("Lost the KB writer; shutting down")
+                os.kill(os.getpid(), signal.SIGTERM)
+                return
+            if message[0] == "trivia":
+                _, session_id, active = message
+                if active:
+                    self.trivia_in_play.add(session_id)
+                else:
+                    self.trivia_in_play.discard(session_id)
+                continue
+            version, records = message
+            if version > self.chatbot.kb.version:
+                self.chatbot.apply_changes(version, records)
+            with self.applied:
+                self.applied.notify_all()
+
+
+class JobReport:
+    """An import job as last reported by the worker running it"""
+
+    def __init__(self, report, done):
+        self.id = report["id"]
+        self.report = report
+        self.done = done
+
+    def to_dict(self):
+        return dict(self.report)
+
+
+class SharedImportJobs:
+    """A worker's ImportJobs: its jobs are reported to the writer until they
+    finish, so that any worker can list them"""
+
+    def __init__(self, client, interval=JOB_REPORT_INTERVAL):
+        self.client = client
+        self.interval = interval
+        self.lock = threading.Lock()
+        # Jobs still to report, by id
+        self.running = {}
+        self.thread = threading.Thread(target=self._run, name="import-job-reports", daemon=True)
+        self.thread.start()
+
+    def add(self, job):
+        with self.lock:
+            self.running[job.id] = job
+        self.client.call("report_import_job", job.to_dict(), job.done)
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            with self.lock:
+                jobs = list(self.running.values())
+            for job in jobs:
+                done = job.done
+                try:
+                    self.client.call("report_import_job", job.to_dict(), done)
+                except Exception as e:
+                    logging.warning(f"Could not report import job {job.id}: {e}")
+                    continue
+                if done:
+                    with self.lock:
+                        del self.running[job.id]
+
+    def get(self, job_id):
+        with self.lock:
+            job = self.running.get(job_id)
+        if job is not None:
+            return job
+        report = self.client.call("import_job", job_id)
+        return None if report is None else JobReport(report, True)
+
+    def list(self):
+        return self.client.call("import_jobs")
+
+
+class Subscriber:
+    """One worker's change channel, fed from a queue so the writer never
+    waits on a worker that is still starting or busy"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.queue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="kb-broadcast", daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            try:
+                self.conn.send(item)
+            except OSError:
+                break
+        self.conn.close()
+
+    def close(self):
+        self.queue.put(None)
+
+
+class Writer:
+    """Applies the workers' edits to the supervisor's ChatBot and
+    broadcasts every version it publishes"""
+
+    def __init__(self, chatbot, snapshot_path=SNAPSHOT_PATH):
+        self.chatbot = chatbot
+        self.snapshot_path = snapshot_path
+        self.snapshot_version = None
+        self.subscribers = {}
+        self.lock = threading.Lock()
+        chatbot.change_listeners.append(self.broadcast)
+
+    def broadcast(self, version, records):
+        # Called from _publish under kb_lock, so versions are queued in order
+        with self.lock:
+            subscribers = list(self.subscribers.values())
+        for subscriber in subscribers:
+            subscriber.queue.put((version, records))
+
+    def subscribe(self, worker_id, conn):
+        """Start broadcasting to conn; returns the version the snapshot holds.
+
+        The worker maps the snapshot and then applies every later version,
+        so registering and reading the KB happen under one kb_lock. It is
+        also told which trivia games are in play; changes to that are made
+        under self.lock, so none is missed.
+        """
+        with self.chatbot.kb_lock:
+            kb = self.chatbot.kb
+            with self.lock:
+                subscriber = self.subscribers[worker_id] = Subscriber(conn)
+                for session_id in self.chatbot.trivia_sessions.active_ids():
+                    subscriber.queue.put(("trivia", session_id, True))
+        # A published KB never changes, so it is compiled without the lock
+        if self.snapshot_version != kb.version:
+            compile_snapshot(kb.questions, kb.trivia, self.snapshot_path, self.chatbot.normalizer)
+            self.snapshot_version = kb.version
+        return kb.version
+
+    def unsubscribe(self, worker_id):
+        with self.lock:
+            subscriber = self.subscribers.pop(worker_id, None)
+        if subscriber is not None:
+            subscriber.close()
+
+    def serve(self, conn):
+        """Apply one worker's edits until it goes away"""
+        while True:
+            try:
+                method, args = conn.recv()
+            except (EOFError, OSError):
+                return
+            try:
+                if method == "apply_staged" or method in SESSION_METHODS:
+                    result = getattr(self, method)(*args)
+                elif method in WRITER_METHODS:
+                    result = getattr(self.chatbot, method)(*args)
+                else:
+                    raise ValueError(f"Unknown writer method: {method}")
+                reply = ("ok", result, self.chatbot.kb.version)
+            except Exception as e:
+                logging.error(f"Writer failed on {method}: {e}")
+                reply = ("error", str(e), self.chatbot.kb.version)
+            try:
+                conn.send(reply)
+            except OSError:
+                return
+
+    def apply_staged(self, paths, conflict):
+        # The staging files belong to the worker, which deletes them
+        staged_imports = [StagedImport(ImportJob(path), staging_path=path) for path in paths]
+        try:
+            conflicts = self.chatbot._apply_staged(staged_imports, conflict)
+            return conflicts, [staged.job.rows_applied for staged in staged_imports]
+        finally:
+            for staged in staged_imports:
+                staged.keep()
+
+    def checkout_trivia_game(self, session_id):
+        game = self.chatbot.trivia_sessions.get(session_id, create=False)
+        if game is None:
+            return None
+        with game.lock:
+            return game.state() if game.active else None
+
+    def checkin_trivia_game(self, session_id, state):
+        game = self.chatbot.trivia_sessions.get(session_id)
+        with game.lock, self.lock:
+            started_or_ended = game.active != state["active"]
+            game.restore(state)
+            if started_or_ended:
+                for subscriber in self.subscribers.values():
+                    subscriber.queue.put(("trivia", session_id, game.active))
+
+    def trivia_session_stats(self):
+        return self.chatbot.trivia_session_stats()
+
+    def report_import_job(self, report, done):
+        self.chatbot.import_jobs.add(JobReport(report, done))
+
+    def import_job(self, job_id):
+        job = self.chatbot.import_jobs.get(job_id)
+        return None if job is None else job.to_dict()
+
+    def import_jobs(self):
+        return self.chatbot.import_jobs.list()
+
+
+def _worker_main(mode, sock, snapshot_path, version, requests, changes, settings):
+    from app import ChatBot
+    chatbot = ChatBot(snapshot_path=snapshot_path, answer_cache_bytes=settings["answer_cache_bytes"])
+    if chatbot.snapshot is None:
+        # The writer saved the CSVs after compiling; the snapshot still holds `version`
+        chatbot.load_snapshot(snapshot_path)
+    chatbot.match_threshold = settings["match_threshold"]
+    # Workers publish the writer's versions, so they share its epoch too
+    chatbot.kb_epoch = settings["kb_epoch"]
+    client = WriterClient(chatbot, requests, changes)
+    chatbot.apply_changes(version, [])
+    chatbot.primary = client
+    chatbot.import_jobs = SharedImportJobs(client)
+    threading.Thread(target=client.follow, name="kb-follower", daemon=True).start()
+    threading.Thread(target=chatbot._ensure_indexes, name="index-warmup", daemon=True).start()
+
+    if mode == "asgi":
+        import uvicorn
+        from asgi_server import create_asgi_app
+        config = uvicorn.Config(create_asgi_app(chatbot), access_log=False, log_level="warning")
+        uvicorn.Server(config).run(sockets=[sock])
+    else:
+        from werkzeug.serving import make_server
+        from server import create_app
+        host, port = sock.getsockname()[:2]
+        make_server(host, port, create_app(chatbot), threaded=True, fd=sock.fileno()).serve_forever()
+
+
+def run_prefork(chatbot, mode="flask", host="0.0.0.0", port=5040, workers=2, snapshot_path=SNAPSHOT_PATH):
+    """Serve the API from `workers` processes, with chatbot as their writer"""
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload(["app", "server"] + (["asgi_server"] if mode == "asgi" else []))
+    sock = socket.create_server((host, port), backlog=2048)
+    writer = Writer(chatbot, snapshot_path)
+    settings = {"answer_cache_bytes": chatbot.answer_cache_bytes, "match_threshold": chatbot.match_threshold,
+                "kb_epoch": chatbot.kb_epoch}
+    processes = {}
+
+    def start(worker_id):
+        requests, worker_requests = context.Pipe()
+        worker_changes, changes = context.Pipe(duplex=False)
+        version = writer.subscribe(worker_id, changes)
+        process = context.Process(
+            target=_worker_main, name=f"chatbot-worker-{worker_id}", daemon=True,
+            args=(mode, sock, snapshot_path, version, worker_requests, worker_changes, settings))
+        process.start()
+        worker_requests.close()
+        worker_changes.close()
+        threading.Thread(target=writer.serve, args=(requests,), name=f"writer-{worker_id}", daemon=True).start()
+        processes[process.sentinel] = (worker_id, process, time.monotonic())
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+    for worker_id in range(workers):
+        start(worker_id)
+    logging.info(f"Serving on {host}:{port} with {workers} {mode} workers")
+    try:
+        while True:
+            for sentinel in wait(list(processes)):
+                worker_id, process, started = processes.pop(sentinel)
+                writer.unsubscribe(worker_id)
+                logging.warning(f"Worker {worker_id} exited with code {process.exitcode}; restarting")
+                # Don't spin on a worker that dies while starting
+                time.sleep(max(0.0, 1.0 - (time.monotonic() - started)))
+                start(worker_id)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for _, process, _ in processes.values():
+            process.terminate()
+        for _, process, _ in processes.values():
+            process.join()
+        sock.close()
+        chatbot.flush()
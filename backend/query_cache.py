@@ -0,0 +1,71 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class QueryCache:
+    """LRU cache with a TTL for resolved question lookups.
+
+    Every entry records the KB version it was computed against; a lookup
+    with a newer version treats it as a miss, so bumping the version on each
+    KB edit invalidates exactly the entries that may have gone stale.
+    Safe to share between request threads.
+    """
+
+    def __init__(self, max_size=1024, ttl=300):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key, version):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+
+            entry_version, expires, value = entry
+            if entry_version != version or expires < time.monotonic():
+                del self.entries[key]
+                self.invalidations += 1
+                self.misses += 1
+                return None
+
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, version, value):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (version, time.monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0
+        }
@@ -0,0 +1,509 @@
+"""Flask routes for the chatbot API.
+
+Kept apart from app.py so CLI runs never import Flask; create_app() binds
+the routes to a ChatBot and is called in server mode only.
+"""
+from flask import Flask, request, jsonify, g
+from flask_cors import CORS
+import os
+import tempfile
+import time
+from werkzeug.utils import secure_filename
+
+from csv_import import ERROR_POLICIES, CONFLICT_POLICIES
+from list_pages import etag, not_modified
+from trivia_sessions import new_session_id, valid_session_id
+
+# Browser origins allowed to call the API (the React dev server)
+CORS_ORIGINS = ["http://localhost:3000", "http://localhost:3001"]
+
+app = Flask(__name__)
+CORS(app, resources={
+    r"/api/*": {
+        "origins": CORS_ORIGINS,
+        "methods": ["GET", "POST", "OPTIONS"],
+        "allow_headers": ["Content-Type", "X-Session-Id", "If-None-Match"],
+        "expose_headers": ["X-Session-Id", "ETag"],
+        "supports_credentials": True
+    },
+    r"/trivia/*": {
+        "origins": CORS_ORIGINS,
+        "methods": ["GET", "POST", "OPTIONS"],
+        "allow_headers": ["Content-Type", "X-Session-Id"],
+        "expose_headers": ["X-Session-Id"],
+        "supports_credentials": True
+    }
+})
+
+# The ChatBot the routes serve, set by create_app()
+chatbot = None
+
+def create_app(bot):
+    global chatbot
+    chatbot = bot
+    return app
+
+# Allowed file extensions for upload
+ALLOWED_EXTENSIONS = {'csv'}
+
+# Largest number of questions accepted by /api/ask/batch
+MAX_BATCH_SIZE = 1000
+
+# Limits for /api/upload
+MAX_UPLOAD_BYTES = 1024 * 1024 * 1024
+MAX_UPLOAD_ROWS = 10000000
+
+# Each caller plays its own trivia game, found by this header or cookie
+SESSION_HEADER = "X-Session-Id"
+SESSION_COOKIE = "chatbot_session"
+
+def session_id():
+    """The caller's session id; a new one is minted if missing, and sent back
+    once the session is kept (a trivia game started)"""
+    if "session_id" not in g:
+        sid = request.headers.get(SESSION_HEADER) or request.cookies.get(SESSION_COOKIE)
+        g.new_session = not valid_session_id(sid)
+        g.session_id = new_session_id() if g.new_session else sid
+    return g.session_id
+
+@app.after_request
+def send_session_id(response):
+    sid = g.get("session_id")
+    if sid and (not g.new_session or chatbot.has_trivia_session(sid)):
+        response.headers[SESSION_HEADER] = sid
+        if request.cookies.get(SESSION_COOKIE) != sid:
+            response.set_cookie(SESSION_COOKIE, sid, httponly=True, samesite="Lax")
+    return response
+
+def allowed_file(filename):
+    return '.' in filename and \
+           filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+@app.route("/api/ask", methods=["POST"])
+def ask_question():
+    try:
+        data = request.get_json()
+        if not data or 'question' not in data:
+            return jsonify({"error": "Invalid request format"}), 400
+        
+        # "trivia" and trivia answers play the caller's own game
+        with chatbot.trivia_session(session_id()):
+            response = chatbot.answer_question(data["question"])
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/ask/batch", methods=["POST"])
+def ask_questions():
+    try:
+        data = request.get_json()
+        if not data or not isinstance(data.get('questions'), list):
+            return jsonify({"error": "Invalid request format"}), 400
+        if len(data['questions']) > MAX_BATCH_SIZE:
+            return jsonify({"error": f"Too many questions (max {MAX_BATCH_SIZE})"}), 400
+        
+        started = time.perf_counter()
+        # As for /api/ask, trivia commands in a batch play the caller's game
+        with chatbot.trivia_session(session_id()):
+            answers = chatbot.answer_questions(data['questions'])
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        return jsonify({
+            "answers": answers,
+            "count": len(answers),
+            "elapsed_ms": round(elapsed_ms, 3)
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/question/add", methods=["POST"])
+def add_question():
+    try:
+        data = request.get_json()
+        if not data or 'question' not in data or 'answer' not in data:
+            return jsonify({"error": "Invalid request format"}), 400
+            
+        success = chatbot.add_question(data["question"], data["answer"])
+        if success:
+            return jsonify({"status": "success", "message": "Question added successfully",
+                            "kb_version": chatbot.kb_version})
+        return jsonify({"error": "Failed to add question"}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/question/remove", methods=["POST"])
+def remove_question():
+    try:
+        data = request.get_json()
+        if not data or 'question' not in data:
+            return jsonify({"error": "Invalid request format"}), 400
+            
+        success = chatbot.remove_question(data["question"])
+        if success:
+            return jsonify({"status": "success", "message": "Question removed successfully",
+                            "kb_version": chatbot.kb_version})
+        return jsonify({"error": "Question not found"}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/question/search", methods=["POST"])
+def search_questions():
+    try:
+        data = request.get_json()
+        if not data or 'question' not in data:
+            return jsonify({"error": "Invalid request format"}), 400
+        
+        k = min(int(data.get("k", 5)), 50)  # Default to 5, max 50
+        results = chatbot.search_questions(data["question"], k)
+        return jsonify({"results": results})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/index/stats", methods=["GET"])
+def index_stats():
+    try:
+        return jsonify(chatbot.index_stats())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/cache/stats", methods=["GET"])
+def cache_stats():
+    try:
+        stats = chatbot.query_cache.stats()
+        stats["kb_version"] = chatbot.kb_version
+        stats["list_pages"] = chatbot.list_pages.stats()
+        stats["change_log"] = chatbot.change_log.stats()
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/persistence", methods=["GET"])
+def persistence_status():
+    try:
+        if chatbot.writer is None:
+            return jsonify({"background_writer": False})
+        stats = chatbot.writer.stats()
+        stats["background_writer"] = True
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/persistence/flush", methods=["POST"])
+def flush_persistence():
+    try:
+        data = request.get_json(silent=True) or {}
+        timeout = min(float(data.get("timeout", 10)), 60)
+        if chatbot.writer is not None and 'version' in data:
+            # The kb_version an edit response returned
+            persisted = chatbot.writer.wait_for(int(data['version']), timeout)
+        else:
+            persisted = chatbot.flush(timeout)
+        if not persisted:
+            return jsonify({"status": "timeout"}), 503
+        return jsonify({
+            "status": "persisted",
+            "last_persisted_version": chatbot.writer.last_persisted_version if chatbot.writer else None
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/journal/stats", methods=["GET"])
+def journal_stats():
+    try:
+        if chatbot.journal is None:
+            return jsonify({"enabled": False})
+        stats = chatbot.journal.stats()
+        stats["enabled"] = True
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/reload/stats", methods=["GET"])
+def reload_stats():
+    try:
+        if chatbot.watcher is None:
+            return jsonify({"enabled": False})
+        stats = chatbot.watcher.stats()
+        stats["enabled"] = True
+        return jsonify(stats)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/intents", methods=["GET"])
+def list_intents():
+    try:
+        return jsonify({"intents": chatbot.intent_router.stats()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/suggest", methods=["GET"])
+def suggest_questions():
+    try:
+        prefix = request.args.get("q", "")
+        limit = min(request.args.get("limit", 10, type=int), 50)  # Default to 10, max 50
+        return jsonify({"suggestions": chatbot.suggest_questions(prefix, limit)})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def list_response(name):
+    """One of the KB lists, paged and filtered as asked (see list_pages.py);
+    a 304 when the caller's copy is still current"""
+    chatbot.sync_with_store()
+    kb = chatbot.kb
+    tag = etag(chatbot.kb_epoch, kb.version)
+    headers = {"ETag": tag, "Cache-Control": "no-cache"}
+    if not_modified(request.headers.get("If-None-Match"), tag):
+        return app.response_class(status=304, headers=headers)
+    body = chatbot.list_pages.get(name, kb, request.args.get("q", ""), request.args.get("cursor"),
+                                  request.args.get("limit", type=int))
+    return app.response_class(body, mimetype="application/json", headers=headers)
+
+@app.route("/api/question/list", methods=["GET"])
+def list_questions():
+    try:
+        return list_response("questions")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/trivia/list", methods=["GET"])
+def list_trivia_questions():
+    try:
+        return list_response("trivia_questions")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/changes", methods=["GET"])
+def kb_changes():
+    try:
+        since = request.args.get("since", type=int)
+        if since is None:
+            return jsonify({"error": "since must be a KB version"}), 400
+        return jsonify(chatbot.changes_since(since, request.args.get("epoch")))
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/trivia/start", methods=["POST"])
+def start_trivia():
+    try:
+        data = request.get_json()
+        num_questions = min(int(data.get("num_questions", 5)), 20)  # Default to 5, max 20
+        
+        with chatbot.trivia_session(session_id()):
+            if chatbot.trivia_active:
+                chatbot.end_trivia_game()
+                
+            success = chatbot.start_trivia_game(num_questions)
+            if not success:
+                return jsonify({
+                    "error": "Failed to start trivia",
+                    "details": "Not enough questions available"
+                }), 400
+                
+            first_question = chatbot.ask_next_trivia_question()
+            return jsonify({
+                "status": "started",
+                "current_question": first_question,
+                "score": chatbot.trivia_score,
+                "total": num_questions,
+                "game_active": chatbot.trivia_active
+            })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/trivia/answer", methods=["POST"])
+def answer_trivia():
+    try:
+        data = request.get_json()
+        if not data or 'answer' not in data:
+            return jsonify({"error": "Invalid request format"}), 400
+        
+        with chatbot.trivia_session(session_id()):
+            result = chatbot.process_trivia_answer(data["answer"])
+            
+            if isinstance(result, str) and result == "no_active_game":
+                return jsonify({"error": "No active trivia game"}), 400
+            elif isinstance(result, str) and result == "invalid":
+                return jsonify({"error": "Invalid answer format. Please use A, B, C, or D."}), 400
+            
+            response = {
+                "status": "answered",
+                "result": result['result'],
+                "correct_answer": result['correct_answer'],
+                "score": result['score'],
+                "total": result['total']
+            }
+            
+            # Check if there are more questions
+            if chatbot.trivia_questions_remaining:
+                next_question = chatbot.ask_next_trivia_question()
+                response["next_question"] = next_question
+            else:
+                # Game over
+                final_result = chatbot.end_trivia_game()
+                response["game_over"] = True
+                response["final_result"] = final_result
+        
+        return jsonify(response)
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/trivia/end", methods=["POST"])
+def end_trivia():
+    try:
+        with chatbot.trivia_session(session_id()):
+            result = chatbot.end_trivia_game()
+        if result is not None:
+            return jsonify({
+                "status": "ended",
+                "final_score": result
+            })
+        return jsonify({"status": "no_active_game"})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/trivia/status", methods=["GET"])
+def trivia_status():
+    with chatbot.trivia_session(session_id()):
+        return jsonify({
+            "active": chatbot.trivia_active,
+            "score": chatbot.trivia_score,
+            "total": chatbot.trivia_total,
+            "current_question": chatbot.current_trivia_question['question'] if chatbot.current_trivia_question else None
+        })
+
+@app.route("/api/trivia/sessions", methods=["GET"])
+def trivia_sessions():
+    return jsonify(chatbot.trivia_session_stats())
+
+@app.route("/api/trivia/add", methods=["POST"])
+def add_trivia_question():
+    try:
+        data = request.get_json()
+        required_fields = ['question', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer']
+        if not data or not all(field in data for field in required_fields):
+            return jsonify({"error": "Missing required fields"}), 400
+            
+        success = chatbot.add_trivia_question(
+            data['question'],
+            data['option_a'],
+            data['option_b'],
+            data['option_c'],
+            data['option_d'],
+            data['correct_answer']
+        )
+        
+        if success:
+            return jsonify({"status": "success", "message": "Trivia question added successfully",
+                            "kb_version": chatbot.kb_version})
+        return jsonify({
+            "error": "Failed to add trivia question",
+            "details": "Make sure all fields are provided and correct answer matches one of the options"
+        }), 400
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/upload", methods=["POST"])
+def upload_file():
+    """Import questions from multipart file upload(s) or a raw text/csv body.
+
+    Invalid rows are skipped (and reported) unless on_error=reject is given,
+    which fails the whole import; several files are imported together under
+    the conflict policy (default last-wins).
+    """
+    try:
+        on_error = request.args.get('on_error', 'skip')
+        if on_error not in ERROR_POLICIES:
+            return jsonify({"error": "Invalid on_error", "allowed": list(ERROR_POLICIES)}), 400
+        conflict = request.args.get('conflict', 'last-wins')
+        if conflict not in CONFLICT_POLICIES:
+            return jsonify({"error": "Invalid conflict", "allowed": list(CONFLICT_POLICIES)}), 400
+        
+        if len(request.files.getlist('file')) > 1:
+            return upload_files(request.files.getlist('file'), conflict, on_error)
+        
+        if request.mimetype == 'text/csv':
+            # Parse straight from the request body
+            filename = secure_filename(request.args.get('filename', 'upload.csv')) or 'upload.csv'
+            stream = request.stream
+        else:
+            if 'file' not in request.files:
+                return jsonify({"error": "No file part in the request"}), 400
+                
+            file = request.files['file']
+            if file.filename == '':
+                return jsonify({"error": "No file selected"}), 400
+            filename = secure_filename(file.filename)
+            stream = file.stream
+            
+        if not allowed_file(filename):
+            return jsonify({
+                "error": "Invalid file type",
+                "allowed_types": list(ALLOWED_EXTENSIONS)
+            }), 400
+        
+        job = chatbot.import_questions_stream(stream, source=filename, on_error=on_error, conflict=conflict,
+                                              max_rows=MAX_UPLOAD_ROWS, max_bytes=MAX_UPLOAD_BYTES)
+        if job.status != "applied":
+            return jsonify({
+                "error": "Failed to process file",
+                "details": job.message,
+                "import": job.to_dict()
+            }), 400
+            
+        message = f"Successfully imported {job.rows_applied} questions from {filename}"
+        return jsonify({"message": message, "import": job.to_dict(), "kb_version": chatbot.kb_version})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+def upload_files(files, conflict, on_error):
+    filenames = [secure_filename(file.filename) for file in files]
+    invalid = [name for name in filenames if not allowed_file(name)]
+    if invalid:
+        return jsonify({
+            "error": "Invalid file type",
+            "files": invalid,
+            "allowed_types": list(ALLOWED_EXTENSIONS)
+        }), 400
+    
+    with tempfile.TemporaryDirectory() as upload_dir:
+        paths = []
+        for i, (file, filename) in enumerate(zip(files, filenames)):
+            # Prefix keeps upload order and tells same-named files apart
+            path = os.path.join(upload_dir, f"{i:04d}_{filename}")
+            file.save(path)
+            paths.append(path)
+        summary = chatbot.import_questions_from_files(paths, conflict=conflict, on_error=on_error,
+                                                      max_rows=MAX_UPLOAD_ROWS, max_bytes=MAX_UPLOAD_BYTES)
+    # Report the uploaded names rather than the temporary paths
+    names = dict(zip(paths, filenames))
+    for item in summary["files"] + summary["conflicts"]:
+        item["source"] = names.get(item["source"], item["source"])
+    
+    if summary["status"] != "applied":
+        return jsonify({
+            "error": "Failed to process files",
+            "details": summary["message"],
+            "import": summary
+        }), 400
+    message = f"Successfully imported {summary['rows_applied']} questions from {len(files)} files"
+    return jsonify({"message": message, "import": summary, "kb_version": chatbot.kb_version})
+
+@app.route("/api/import/jobs", methods=["GET"])
+def list_import_jobs():
+    try:
+        return jsonify({"jobs": chatbot.import_jobs.list()})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+
+@app.route("/api/import/jobs/<job_id>", methods=["GET"])
+def get_import_job(job_id):
+    try:
+        job = chatbot.import_jobs.get(job_id)
+        if job is None:
+            return jsonify({"error": "Import job not found"}), 404
+        return jsonify(job.to_dict())
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
@@ -0,0 +1,195 @@
+import json
+import sqlite3
+import threading
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS questions (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL UNIQUE,
+    answers TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trivia (
+    id INTEGER PRIMARY KEY,
+    question TEXT NOT NULL,
+    option_a TEXT NOT NULL,
+    option_b TEXT NOT NULL,
+    option_c TEXT NOT NULL,
+    option_d TEXT NOT NULL,
+    correct_answer TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS changes (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    question TEXT
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS questions_fts USING fts5(
+    question, content='questions', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS questions_ai AFTER INSERT ON questions BEGIN
+    INSERT INTO questions_fts(rowid, question) VALUES (new.id, new.question);
+    INSERT INTO changes(kind, question) VALUES ('question', new.question);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_ad AFTER DELETE ON questions BEGIN
+    INSERT INTO questions_fts(questions_fts, rowid, question) VALUES ('delete', old.id, old.question);
+    INSERT INTO changes(kind, question) VALUES ('question', old.question);
+END;
+CREATE TRIGGER IF NOT EXISTS questions_au AFTER UPDATE ON questions BEGIN
+    INSERT INTO changes(kind, question) VALUES ('question', new.question);
+END;
+CREATE TRIGGER IF NOT EXISTS trivia_ai AFTER INSERT ON trivia BEGIN
+    INSERT INTO changes(kind) VALUES ('trivia');
+END;
+"""
+
+# Hot-path statements are module constants so sqlite3's per-connection
+# statement cache always hands back the same prepared statement
+SELECT_ANSWERS = "SELECT answers FROM questions WHERE question = ?"
+UPSERT_ANSWERS = ("INSERT INTO questions(question, answers) VALUES (?, ?) "
+                  "ON CONFLICT(question) DO UPDATE SET answers = excluded.answers")
+DELETE_QUESTION = "DELETE FROM questions WHERE question = ?"
+INSERT_TRIVIA = ("INSERT INTO trivia(question, option_a, option_b, option_c, option_d, correct_answer) "
+                 "VALUES (?, ?, ?, ?, ?, ?)")
+SEARCH_QUESTIONS = ("SELECT question, -bm25(questions_fts) FROM questions_fts "
+                    "WHERE questions_fts MATCH ? ORDER BY bm25(questions_fts) LIMIT ?")
+CHANGES_SINCE = "SELECT seq, kind, question FROM changes WHERE seq > ? ORDER BY seq"
+PRUNE_CHANGES = "DELETE FROM changes WHERE seq <= (SELECT MAX(seq) FROM changes) - ?"
+
+
+class SQLiteStore:
+    """Questions and trivia in SQLite (WAL mode) with an FTS5 question index.
+
+    Each thread gets its own connection. Every write runs in one
+    transaction and logs the touched questions to the `changes` table, which
+    other processes sharing the database poll through changes_since().
+    """
+
+    def __init__(self, path, timeout=30.0, max_changes=100000):
+        self.path = path
+        self.timeout = timeout
+        self.max_changes = max_changes
+        self.local = threading.local()
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def connection(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=self.timeout, cached_statements=256,
+                                   isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self.local.conn = conn
+        return _Transaction(conn)
+
+    def is_empty(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT NOT EXISTS(SELECT 1 FROM questions) "
+                                "AND NOT EXISTS(SELECT 1 FROM trivia)").fetchone()[0] == 1
+
+    def load_questions(self):
+        with self.connection() as conn:
+            return {q: json.loads(answers) for q, answers in
+                    conn.execute("SELECT question, answers FROM questions ORDER BY id")}
+
+    def load_trivia(self):
+        with self.connection() as conn:
+            return [
+                {'question': row[0], 'options': list(row[1:5]), 'correct_answer': row[5]}
+                for row in conn.execute("SELECT question, option_a, option_b, option_c, option_d, "
+                                        "correct_answer FROM trivia ORDER BY id")
+            ]
+
+    def get_answers(self, question):
+        with self.connection() as conn:
+            row = conn.execute(SELECT_ANSWERS, (question,)).fetchone()
+            return json.loads(row[0]) if row else None
+
+    def apply(self, record):
+        self.apply_many([record])
+
+    def apply_many(self, records):
+        """Apply journal-style edit records in a single transaction"""
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            for record in records:
+                self._apply(conn, record)
+            conn.execute(PRUNE_CHANGES, (self.max_changes,))
+
+    def _apply(self, conn, record):
+        op = record["op"]
+        if op == "add_question":
+            row = conn.execute(SELECT_ANSWERS, (record["question"],)).fetchone()
+            answers = json.loads(row[0]) if row else []
+            if record["answer"] not in answers:
+                answers.append(record["answer"])
+            conn.execute(UPSERT_ANSWERS, (record["question"], json.dumps(answers)))
+        elif op == "set_question":
+            conn.execute(UPSERT_ANSWERS, (record["question"], json.dumps(record["answers"])))
+        elif op == "remove_question":
+            conn.execute(DELETE_QUESTION, (record["question"],))
+        elif op == "add_trivia":
+            trivia = record["trivia"]
+            conn.execute(INSERT_TRIVIA, (trivia['question'], *trivia['options'], trivia['correct_answer']))
+        else:
+            raise ValueError(f"Unknown record: {record}")
+
+    def search(self, query, k=5):
+        """Full-text candidates as (question, score) pairs, best first"""
+        terms = [term.replace('"', '""') for term in query.split() if term.strip()]
+        if not terms:
+            return []
+        match = " OR ".join(f'"{term}"' for term in terms)
+        with self.connection() as conn:
+            return conn.execute(SEARCH_QUESTIONS, (match, k)).fetchall()
+
+    def last_change(self):
+        with self.connection() as conn:
+            return conn.execute("SELECT COALESCE(MAX(seq), 0) FROM changes").fetchone()[0]
+
+    def has_external_changes(self):
+        """True if another connection committed since this thread last asked"""
+        with self.connection() as conn:
+            version = conn.execute("PRAGMA data_version").fetchone()[0]
+        changed = version != getattr(self.local, "data_version", None)
+        self.local.data_version = version
+        return changed
+
+    def changes_since(self, seq):
+        """Return (latest seq, changed question keys, whether trivia changed).
+
+        The seq is None when the change log no longer reaches back to seq
+        and the caller has to reload everything.
+        """
+        with self.connection() as conn:
+            oldest = conn.execute("SELECT MIN(seq) FROM changes").fetchone()[0]
+            if oldest is not None and oldest > seq + 1:
+                return None, set(), True
+            rows = conn.execute(CHANGES_SINCE, (seq,)).fetchall()
+        questions = {question for _, kind, question in rows if kind == 'question'}
+        trivia_changed = any(kind == 'trivia' for _, kind, _ in rows)
+        return (rows[-1][0] if rows else seq), questions, trivia_changed
+
+    def close(self):
+        conn = getattr(self.local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self.local.conn = None
+
+
+class _Transaction:
+    """Context manager that commits on success and rolls back on error"""
+
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.conn.in_transaction:
+            if exc_type is None:
+                self.conn.execute("COMMIT")
+            else:
+                self.conn.execute("ROLLBACK")
+        return False
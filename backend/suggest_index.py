@@ -0,0 +1,61 @@
+import bisect
+import heapq
+import threading
+
+
+class SuggestIndex:
+    """Prefix completion over question keys kept in one sorted list.
+
+    All keys sharing a prefix form a contiguous slice found with two
+    bisections. Added keys are buffered and merged on the next lookup, so a
+    bulk load costs one sort instead of one insertion per key. Removals
+    delete in place; lookups take the lock only to slice out their window.
+    """
+
+    def __init__(self, max_scan=500):
+        # Upper bound on keys examined when ranking by popularity
+        self.max_scan = max_scan
+        self.keys = []
+        self.pending = []
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.keys) + len(self.pending)
+
+    def build(self, keys):
+        with self.lock:
+            self.keys = sorted(keys)
+            self.pending = []
+
+    def add(self, key):
+        with self.lock:
+            self.pending.append(key)
+
+    def remove(self, key):
+        with self.lock:
+            self._merge()
+            i = bisect.bisect_left(self.keys, key)
+            if i < len(self.keys) and self.keys[i] == key:
+                del self.keys[i]
+                return True
+            return False
+
+    def _merge(self):
+        if not self.pending:
+            return
+        keys = self.keys + self.pending
+        keys.sort()
+        self.keys = keys
+        self.pending = []
+
+    def complete(self, prefix, limit=10, weights=None):
+        """Return up to limit keys starting with prefix, most popular first when weights are given"""
+        with self.lock:
+            self._merge()
+            keys = self.keys
+            start = bisect.bisect_left(keys, prefix)
+            end = bisect.bisect_left(keys, prefix + "\U0010ffff", lo=start)
+            if not weights:
+                return keys[start:min(end, start + limit)]
+            window = keys[start:min(end, start + self.max_scan)]
+        return heapq.nsmallest(limit, window, key=lambda key: (-weights.get(key, 0), key))
@@ -0,0 +1,196 @@
+import csv
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from app import ChatBot
+
+QUESTIONS = [
+    ("where is the library?", "In the main building."),
+    ("when does the gym open?", "At 6am."),
+    ("how do i reset my password?", "Use the IT portal."),
+]
+
+TRIVIA = [
+    (f"Trivia question {n}?", "Right", "Wrong 1", "Wrong 2", "Wrong 3", "Right") for n in range(6)
+]
+
+
+def write_questions(rows, filename="questions.csv"):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["question", "answer1", "answer2", "answer3", "answer4"])
+        for question, *answers in rows:
+            writer.writerow([question] + answers + [""] * (4 - len(answers)))
+
+
+def write_trivia(rows, filename="trivia.csv"):
+    with open(filename, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["question", "option_a", "option_b", "option_c", "option_d", "correct_answer"])
+        writer.writerows(rows)
+
+
+class ChatBotTestCase(unittest.TestCase):
+    """A real ChatBot over CSVs in a temporary working directory"""
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        # Cleanups run last first, so a test's own (closing a writer) still
+        # run in the temporary directory
+        self.addCleanup(os.chdir, os.getcwd())
+        os.chdir(directory.name)
+        write_questions(QUESTIONS)
+        write_trivia(TRIVIA)
+        self.bot = ChatBot()
+
+
+class TestAnswering(ChatBotTestCase):
+    def test_indexes_are_built_on_the_first_fuzzy_lookup(self):
+        self.assertFalse(self.bot.indexes_ready)
+        self.assertEqual(self.bot.answer_question("Where is the library?")["response"], "In the main building.")
+        self.assertFalse(self.bot.indexes_ready)
+        response = self.bot.answer_question("where is the libary?")
+        self.assertTrue(self.bot.indexes_ready)
+        self.assertEqual(response["matched_question"], "where is the library?")
+
+    def test_batch_answers_each_question_from_one_version(self):
+        results = self.bot.answer_questions(["When does the gym open?", "what's the weather?", 42])
+        self.assertEqual([result["type"] for result in results], ["answer", "unknown", "error"])
+        self.assertEqual(results[0]["response"], "At 6am.")
+        self.assertEqual({result["kb_version"] for result in results}, {self.bot.kb_version})
+
+    def test_batch_matches_like_single_questions(self):
+        queries = ["where is the libary?", "How do I reset my password"]
+        batch = self.bot.answer_questions(queries)
+        single = [self.bot.answer_question(query) for query in queries]
+        self.assertEqual([result["response"] for result in batch], [result["response"] for result in single])
+
+    def test_unrelated_questions_are_not_answered(self):
+        for query in ["Where is the cafeteria?", "What is the weather?!", "Who are they?", "How do I reset my phone?"]:
+            self.assertEqual(self.bot.answer_question(query)["type"], "unknown", query)
+        self.assertEqual([result["type"] for result in self.bot.answer_questions(["Where is the cafeteria?"])],
+                         ["unknown"])
+
+    def test_exact_keys_are_not_answered_from_the_cache(self):
+        write_questions([("what is ai?", "Artificial intelligence."), ("what is ai", "A three-toed sloth.")])
+        bot = ChatBot()
+        first = bot.answer_question("What is AI!")["response"]
+        # Whichever key the canonical form was cached for, each key keeps its answer
+        self.assertIn(first, ["Artificial intelligence.", "A three-toed sloth."])
+        self.assertEqual(bot.answer_question("what is ai?")["response"], "Artificial intelligence.")
+        self.assertEqual(bot.answer_question("What is AI")["response"], "A three-toed sloth.")
+        self.assertEqual([result["response"] for result in bot.answer_questions(["what is ai", "what is ai?"])],
+                         ["A three-toed sloth.", "Artificial intelligence."])
+
+    def test_edits_invalidate_cached_lookups(self):
+        self.assertEqual(self.bot.answer_question("Are bikes allowed?")["type"], "unknown")
+        self.bot.add_question("Are bikes allowed?", "Yes, in the gym.")
+        self.assertEqual(self.bot.answer_question("Are bikes allowed?")["response"], "Yes, in the gym.")
+        self.bot.remove_question("are bikes allowed?")
+        self.assertEqual(self.bot.answer_question("Are bikes allowed?")["type"], "unknown")
+
+
+class TestEditing(ChatBotTestCase):
+    def test_variants_are_added_to_the_existing_question(self):
+        self.assertTrue(self.bot.add_question("Where's the library", "Next to the cafe."))
+        self.assertNotIn("where's the library", self.bot.questions)
+        self.assertEqual(self.bot.questions["where is the library?"], ["In the main building.", "Next to the cafe."])
+
+    def test_edits_are_saved_to_the_csv(self):
+        self.bot.add_question("Are bikes allowed?", "Yes.")
+        self.bot.remove_question("when does the gym open?")
+        reloaded = ChatBot()
+        self.assertEqual(reloaded.questions["are bikes allowed?"], ["Yes."])
+        self.assertNotIn("when does the gym open?", reloaded.questions)
+
+    def test_edits_are_journaled_in_the_order_published(self):
+        self.bot.enable_journal("journal.log", sync_policy="none")
+        append = self.bot.journal.append
+
+        def slow_append(record):
+            if record["op"] == "add_question":
+                # A remove published meanwhile must not be journaled first
+                time.sleep(0.2)
+            append(record)
+
+        self.bot.journal.append = slow_append
+        adding = threading.Thread(target=self.bot.add_question, args=("Are bikes allowed?", "Yes."))
+        adding.start()
+        while "are bikes allowed?" not in self.bot.questions:
+            time.sleep(0.001)
+        self.bot.remove_question("are bikes allowed?")
+        adding.join()
+        self.bot.journal.close()
+        self.assertEqual([record["op"] for record in self.bot.journal.replay()], ["add_question", "remove_question"])
+
+    def test_reload_applies_only_the_difference(self):
+        version = self.bot.kb_version
+        write_questions([QUESTIONS[0], ("when does the gym open?", "At 7am."), ("are bikes allowed?", "Yes.")])
+        self.assertEqual(self.bot.reload_questions_from_csv(), (1, 1, 1))
+        self.assertEqual(self.bot.kb_version, version + 1)
+        self.assertEqual(self.bot.answer_question("when does the gym open?")["response"], "At 7am.")
+        self.assertEqual(self.bot.reload_questions_from_csv(), (0, 0, 0))
+        self.assertEqual(self.bot.kb_version, version + 1)
+
+    def test_reload_keeps_journaled_edits(self):
+        self.bot.enable_journal("journal.log", sync_policy="none")
+        self.bot.add_question("Are bikes allowed?", "Yes.")
+        self.bot.remove_question("when does the gym open?")
+        write_questions(QUESTIONS + [("where is the cafeteria?", "Next to the library.")])
+        self.assertEqual(self.bot.reload_questions_from_csv(), (1, 0, 0))
+        self.assertIn("are bikes allowed?", self.bot.questions)
+        self.assertNotIn("when does the gym open?", self.bot.questions)
+        self.bot.add_trivia_question("New trivia?", "Right", "Wrong 1", "Wrong 2", "Wrong 3", "Right")
+        self.assertEqual(self.bot.reload_trivia_from_csv(), len(TRIVIA) + 1)
+        self.bot.journal.close()
+        # A restart replays the journal over the same file
+        restarted = ChatBot()
+        restarted.enable_journal("journal.log", sync_policy="none")
+        self.addCleanup(restarted.journal.close)
+        self.assertEqual(dict(restarted.questions.items()), dict(self.bot.questions.items()))
+
+    def test_reload_keeps_edits_the_writer_has_not_saved(self):
+        self.bot.enable_background_writer(debounce=60, max_delay=60)
+        self.addCleanup(self.bot.writer.close)
+        self.bot.add_question("Are bikes allowed?", "Yes.")
+        write_questions(QUESTIONS + [("where is the cafeteria?", "Next to the library.")])
+        self.bot.reload_questions_from_csv()
+        self.assertIn("are bikes allowed?", self.bot.questions)
+        self.assertIn("where is the cafeteria?", self.bot.questions)
+        self.assertTrue(self.bot.flush(timeout=5))
+        self.assertEqual(dict(ChatBot().questions.items()), dict(self.bot.questions.items()))
+
+
+class TestChangeBroadcast(ChatBotTestCase):
+    def test_workers_replay_trivia_additions(self):
+        worker = ChatBot()
+        broadcasts = []
+        self.bot.change_listeners.append(lambda version, records: broadcasts.append((version, records)))
+        trivia = {"question": "Trivia question 0?", "options": ["Right", "Wrong 1", "Wrong 2", "Wrong 3"],
+                  "correct_answer": "Right"}
+        self.bot.add_trivia_question("Trivia question 0?", "Right", "Wrong 1", "Wrong 2", "Wrong 3", "Right")
+        self.assertEqual(broadcasts[0][1], [{"op": "add_trivia", "trivia": trivia}])
+        for version, records in broadcasts:
+            worker.apply_changes(version, records)
+        self.assertEqual(worker.kb.trivia, self.bot.kb.trivia)
+        self.assertEqual(worker.kb_version, self.bot.kb_version)
+
+    def test_first_poll_gets_the_whole_kb(self):
+        changes = self.bot.changes_since(0)
+        self.assertFalse(changes["resync"])
+        self.assertEqual(changes["kb_version"], self.bot.kb_version)
+        self.assertEqual(len(changes["changed"]), len(QUESTIONS))
+        self.assertEqual(changes["removed"], [])
+        self.assertEqual(len(changes["trivia"]), len(TRIVIA))
+        self.bot.add_question("New question?", "New answer")
+        changes = self.bot.changes_since(changes["kb_version"])
+        self.assertEqual(changes["changed"], [{"question": "new question?", "answers": ["New answer"]}])
+        self.assertTrue(self.bot.changes_since(0, epoch="another run")["resync"])
+
+
+if __name__ == '__main__':
+    unittest.main()
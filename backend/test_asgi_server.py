@@ -0,0 +1,213 @@
+import asyncio
+import json
+import unittest
+from contextlib import contextmanager
+
+from asgi_server import ASGIApp, CHAT_PATH, MAX_JSON_BYTES
+from list_pages import ListPages
+
+
+class FakeKB:
+    version = 7
+    questions = {"q": ["a"]}
+    trivia = []
+
+
+class FakeBot:
+    indexes_ready = True
+    kb = FakeKB()
+
+    def __init__(self):
+        self.sessions = []
+        self.kb_epoch = "e"
+        self.list_pages = ListPages()
+
+    def sync_with_store(self):
+        pass
+
+    @contextmanager
+    def trivia_session(self, session_id):
+        self.sessions.append(session_id)
+        yield
+
+    def has_trivia_session(self, session_id):
+        return self.trivia_active
+
+    def answer_question(self, question):
+        if question == "boom":
+            raise RuntimeError("lookup failed")
+        return {"response": question.upper(), "kb_version": self.kb.version}
+
+    def answer_questions(self, questions):
+        return [self.answer_question(question) for question in questions]
+
+    # A two question trivia game where "A" is always right
+    trivia_active = False
+    trivia_score = 0
+
+    def start_trivia_game(self, num_questions):
+        self.trivia_active = True
+        self.trivia_questions_remaining = [f"Q{n}" for n in range(1, num_questions + 1)]
+        return True
+
+    def ask_next_trivia_question(self):
+        return {"question": self.trivia_questions_remaining.pop(0)}
+
+    def process_trivia_answer(self, answer):
+        self.trivia_score += answer == "A"
+        return {"result": "correct" if answer == "A" else "incorrect", "correct_answer": "A",
+                "score": self.trivia_score, "total": 2}
+
+    def end_trivia_game(self):
+        self.trivia_active = False
+        return {"score": self.trivia_score, "total": 2}
+
+
+def echo_wsgi(environ, start_response):
+    body = environ["wsgi.input"].read()
+    payload = {"method": environ["REQUEST_METHOD"], "path": environ["PATH_INFO"],
+               "query": environ["QUERY_STRING"], "body": body.decode(),
+               "content_type": environ.get("CONTENT_TYPE")}
+    start_response("201 CREATED", [("Content-Type", "application/json")])
+    return [json.dumps(payload).encode()]
+
+
+def call(app, method, path, body=b"", headers=(), query=b""):
+    scope = {"type": "http", "method": method, "path": path, "query_string": query,
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        return messages.pop(0) if messages else {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    start, content = sent
+    return start["status"], dict(start["headers"]), content["body"]
+
+
+def chat(app, frames, headers=()):
+    """Send frames over the chat channel; returns everything the server sent"""
+    scope = {"type": "websocket", "path": CHAT_PATH, "query_string": b"",
+             "headers": [(name.encode(), value.encode()) for name, value in headers]}
+    messages = [{"type": "websocket.connect"}]
+    messages += [{"type": "websocket.receive", "text": frame} for frame in frames]
+    messages.append({"type": "websocket.disconnect", "code": 1000})
+    sent = []
+
+    async def receive():
+        return messages.pop(0)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(app(scope, receive, send))
+    return sent
+
+
+class TestASGIApp(unittest.TestCase):
+    def setUp(self):
+        self.bot = FakeBot()
+        self.app = ASGIApp(self.bot, echo_wsgi, workers=1)
+
+    def tearDown(self):
+        self.app.executor.shutdown()
+
+    def test_ask_is_answered_inline_like_flask_would(self):
+        status, headers, body = call(self.app, "POST", "/api/ask", b'{"question": "hi"}',
+                                     [("content-type", "application/json")])
+        self.assertEqual(status, 200)
+        self.assertEqual(body, b'{"kb_version":7,"response":"HI"}\n')
+        self.assertEqual(headers[b"content-type"], b"application/json")
+        self.assertEqual(self.app.served_inline, 1)
+        self.assertEqual(self.app.served_wsgi, 0)
+
+    def test_errors_use_the_flask_error_contract(self):
+        status, _, body = call(self.app, "POST", "/api/ask", b"not json")
+        self.assertEqual((status, json.loads(body)), (400, {"error": "Invalid request format"}))
+        status, _, body = call(self.app, "POST", "/api/ask", b'{"question": "boom"}')
+        self.assertEqual((status, json.loads(body)), (500, {"error": "lookup failed"}))
+        status, _, _ = call(self.app, "POST", "/api/ask", b"x" * (MAX_JSON_BYTES + 1))
+        self.assertEqual(status, 413)
+
+    def test_session_id_is_minted_then_reused(self):
+        _, headers, _ = call(self.app, "POST", "/api/ask", b'{"question": "hi"}')
+        # Not sent back until a game starts
+        self.assertNotIn(b"x-session-id", headers)
+        self.assertNotIn(b"set-cookie", headers)
+        _, headers, _ = call(self.app, "POST", "/api/trivia/start", b'{"num_questions": 2}')
+        sid = headers[b"x-session-id"].decode()
+        self.assertIn(f"chatbot_session={sid}".encode(), headers[b"set-cookie"])
+        _, headers, _ = call(self.app, "POST", "/api/ask", b'{"question": "hi"}',
+                             [("cookie", f"chatbot_session={sid}")])
+        self.assertEqual(headers[b"x-session-id"].decode(), sid)
+        self.assertNotIn(b"set-cookie", headers)
+        self.assertEqual(self.bot.sessions[1:], [sid, sid])
+
+    def test_batch_plays_the_callers_trivia_session(self):
+        sid = "s" * 24
+        _, headers, body = call(self.app, "POST", "/api/ask/batch", b'{"questions": ["hi"]}',
+                                [("x-session-id", sid)])
+        self.assertEqual(json.loads(body)["count"], 1)
+        self.assertEqual(self.bot.sessions, [sid])
+        self.assertEqual(headers[b"x-session-id"].decode(), sid)
+
+    def test_cors_headers_for_allowed_origins_only(self):
+        _, headers, _ = call(self.app, "GET", "/api/question/list", headers=[("origin", "http://localhost:3000")])
+        self.assertEqual(headers[b"access-control-allow-origin"], b"http://localhost:3000")
+        self.assertEqual(headers[b"access-control-allow-credentials"], b"true")
+        _, headers, _ = call(self.app, "GET", "/api/question/list", headers=[("origin", "http://evil.example")])
+        self.assertNotIn(b"access-control-allow-origin", headers)
+
+    def test_unchanged_list_is_not_modified(self):
+        status, headers, body = call(self.app, "GET", "/api/question/list")
+        self.assertEqual((status, body), (200, b'{"kb_version":7,"questions":["q"]}\n'))
+        self.assertEqual(headers[b"etag"], b'"e-7"')
+        status, headers, body = call(self.app, "GET", "/api/question/list", headers=[("if-none-match", '"e-7"')])
+        self.assertEqual((status, body), (304, b""))
+        self.assertNotIn(b"content-type", headers)
+        status, _, _ = call(self.app, "GET", "/api/question/list", query=b"cursor=%%%")
+        self.assertEqual(status, 400)
+
+    def test_other_routes_go_to_the_wsgi_app(self):
+        status, headers, body = call(self.app, "POST", "/api/question/add", b'{"question": "q"}',
+                                     [("content-type", "application/json")], query=b"x=1")
+        self.assertEqual(status, 201)
+        self.assertEqual(json.loads(body), {
+            "method": "POST", "path": "/api/question/add", "query": "x=1",
+            "body": '{"question": "q"}', "content_type": "application/json"
+        })
+        self.assertEqual(self.app.served_wsgi, 1)
+
+    def test_chat_channel_replies_with_the_route_payload(self):
+        sent = chat(self.app, ['{"id": 1, "type": "ask", "question": "hi"}', 'nonsense', '{"type": "nope"}'])
+        self.assertEqual(sent[0]["type"], "websocket.accept")
+        frames = [json.loads(message["text"]) for message in sent[1:]]
+        self.assertEqual(frames[0]["type"], "session")
+        self.assertEqual(frames[1], {"id": 1, "type": "ask", "status": 200,
+                                     "data": {"kb_version": 7, "response": "HI"}})
+        self.assertEqual([frame["status"] for frame in frames[2:]], [400, 400])
+        self.assertEqual(self.bot.sessions, [frames[0]["session_id"]])
+
+    def test_chat_channel_pushes_trivia_questions(self):
+        sent = chat(self.app, ['{"id": 1, "type": "trivia_start", "num_questions": 2}',
+                               '{"id": 2, "type": "trivia_answer", "answer": "A"}',
+                               '{"id": 3, "type": "trivia_answer", "answer": "B"}'])
+        frames = [json.loads(message["text"]) for message in sent[2:]]
+        self.assertEqual([frame["type"] for frame in frames], [
+            "trivia_start", "trivia_question", "trivia_answer", "trivia_question", "trivia_answer", "trivia_over"])
+        self.assertNotIn("current_question", frames[0]["data"])
+        self.assertEqual(frames[1]["data"], {"question": "Q1"})
+        self.assertEqual(frames[4]["data"]["result"], "incorrect")
+        self.assertEqual(frames[5]["data"], {"score": 1, "total": 2})
+
+    def test_chat_channel_refuses_other_origins(self):
+        sent = chat(self.app, [], headers=[("origin", "http://evil.example")])
+        self.assertEqual(sent, [{"type": "websocket.close", "code": 1008}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from bm25_index import BM25Index
+
+
+class TestBM25Index(unittest.TestCase):
+
+    def setUp(self):
+        self.index = BM25Index()
+        for question in ["where is the library?", "when does the library close?", "where can i park?"]:
+            self.index.add(question, question)
+
+    def test_search_ranks_best_first(self):
+        results = self.index.search("library close", k=2)
+        self.assertEqual(results[0][0], "when does the library close?")
+        self.assertEqual(len(results), 2)
+        self.assertGreater(results[0][1], results[1][1])
+
+    def test_remove_updates_postings(self):
+        self.assertTrue(self.index.remove("where can i park?"))
+        self.assertNotIn("park", self.index.postings)
+        self.assertEqual(self.index.search("park"), [])
+        self.assertFalse(self.index.remove("where can i park?"))
+
+    def test_add_existing_replaces_document(self):
+        self.index.add("where is the library?", "library hours")
+        self.assertNotIn("where is the library?", self.index.postings.get("where", {}))
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.total_length, sum(self.index.doc_lengths.values()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+from change_log import ChangeLog
+
+
+def set_question(question, answers):
+    return {"op": "set_question", "question": question, "answers": answers}
+
+
+def remove_question(question):
+    return {"op": "remove_question", "question": question}
+
+
+class TestChangeLog(unittest.TestCase):
+    def setUp(self):
+        self.log = ChangeLog(3, max_records=5)
+
+    def test_changes_are_merged_per_question(self):
+        self.log.max_records = 100
+        self.log.record(4, [set_question("a", ["1"])])
+        self.log.record(5, [set_question("b", ["2"]), set_question("a", ["1", "3"])])
+        self.log.record(6, [remove_question("b")])
+        self.assertEqual(self.log.since(3, 6), (6, {
+            "changed": [{"question": "a", "answers": ["1", "3"]}], "removed": ["b"], "trivia": None, "trivia_added": []}))
+        self.assertEqual(self.log.since(5, 6), (6, {"changed": [], "removed": ["b"], "trivia": None, "trivia_added": []}))
+        self.assertEqual(self.log.since(6, 6), (6, {"changed": [], "removed": [], "trivia": None, "trivia_added": []}))
+
+    def test_latest_trivia_wins(self):
+        self.log.record(4, [{"op": "set_trivia", "trivia": ["old"]}])
+        self.log.record(5, [{"op": "set_trivia", "trivia": ["new"]}])
+        self.assertEqual(self.log.since(3, 5)[1]["trivia"], ["new"])
+
+    def test_trivia_added_after_a_replacement(self):
+        self.log.max_records = 100
+        self.log.record(4, [{"op": "add_trivia", "trivia": "a"}])
+        self.log.record(5, [{"op": "set_trivia", "trivia": ["a", "b"]}])
+        self.log.record(6, [{"op": "add_trivia", "trivia": "c"}])
+        changes = self.log.since(3, 6)[1]
+        self.assertEqual((changes["trivia"], changes["trivia_added"]), (["a", "b"], ["c"]))
+        changes = self.log.since(5, 6)[1]
+        self.assertEqual((changes["trivia"], changes["trivia_added"]), (None, ["c"]))
+
+    def test_replaced_trivia_counts_per_question(self):
+        self.log.record(4, [set_question("a", ["1"])])
+        self.log.record(5, [{"op": "set_trivia", "trivia": ["a", "b", "c"]}])
+        self.assertEqual(self.log.since(3, 5), (5, None))
+        self.assertEqual(self.log.since(4, 5)[1]["trivia"], ["a", "b", "c"])
+
+    def test_versions_out_of_the_log_need_a_resync(self):
+        for version in range(4, 8):
+            self.log.record(version, [set_question(str(version), ["x"])])
+        # Each version costs its records plus one, so only 6 and 7 are kept
+        self.assertEqual(self.log.since(4, 7), (7, None))
+        self.assertEqual(self.log.since(5, 7)[1]["changed"],
+                         [{"question": "6", "answers": ["x"]}, {"question": "7", "answers": ["x"]}])
+        self.assertEqual(self.log.since(8, 7), (7, None))
+
+    def test_start_is_kept_when_the_log_moves_on(self):
+        for version in range(4, 8):
+            self.log.record(version, [])
+        self.log.record(9, [])
+        self.assertEqual((self.log.start, self.log.base), (3, 9))
+
+    def test_replaced_kb_restarts_the_log(self):
+        self.log.record(4, [set_question("a", ["1"])])
+        # Version 5 replaced the KB without records; 6 was published after it
+        self.assertEqual(self.log.since(3, 5), (5, None))
+        self.log.record(6, [])
+        self.log.record(8, [])
+        self.assertEqual(self.log.since(6, 8), (8, None))
+        self.assertEqual(self.log.since(8, 8), (8, {"changed": [], "removed": [], "trivia": None, "trivia_added": []}))
+
+
+if __name__ == '__main__':
+    unittest.main()
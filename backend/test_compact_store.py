@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import unittest
+
+from compact_store import CompactQuestions, PagedStringTable, TriviaQuestion, deep_sizeof, memory_report
+
+
+class TestCompactQuestions(unittest.TestCase):
+    def test_mapping_api(self):
+        questions = CompactQuestions({"hi": ["Hello", "Hey"], "bye": ["Goodbye"]})
+        self.assertEqual(questions["hi"], ["Hello", "Hey"])
+        self.assertIn("bye", questions)
+        self.assertEqual(list(questions), ["hi", "bye"])
+        self.assertEqual(questions.get("missing"), None)
+
+        questions["bye"] = questions["bye"] + ["See you"]
+        questions["hi"] = ["Hello"]
+        del questions["bye"]
+        self.assertEqual(dict(questions), {"hi": ["Hello"]})
+        self.assertEqual(len(questions), 1)
+
+    def test_answers_are_interned(self):
+        questions = CompactQuestions()
+        for i in range(100):
+            questions[f"question {i}"] = ["Ask the front desk.", "Call IT."]
+        self.assertEqual(len(questions.strings), 2)
+        self.assertEqual(len(questions.answer_ids), 200)
+
+    def test_compaction_reclaims_replaced_ranges(self):
+        questions = CompactQuestions()
+        for i in range(3000):
+            questions[f"q{i % 10}"] = [f"answer {i}", "shared"] + ["extra"] * (i % 3)
+        self.assertLess(len(questions.answer_ids), 3000)
+        self.assertEqual(questions["q9"], ["answer 2999", "shared", "extra", "extra"])
+
+    def test_copy_is_independent(self):
+        questions = CompactQuestions({"hi": ["Hello", "Hey"]})
+        copy = questions.copy()
+        copy["hi"] = ["Hello"]
+        copy["bye"] = ["Goodbye"]
+        self.assertEqual(dict(questions), {"hi": ["Hello", "Hey"]})
+        self.assertEqual(dict(copy), {"hi": ["Hello"], "bye": ["Goodbye"]})
+
+
+class TestPagedStringTable(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        for name in os.listdir(self.directory):
+            os.remove(os.path.join(self.directory, name))
+        os.rmdir(self.directory)
+
+    def test_answers_round_trip_through_disk(self):
+        questions = CompactQuestions(strings=PagedStringTable(directory=self.directory))
+        questions["hi"] = ["Héllo", "Hey"]
+        questions["hey"] = ["Hey"]
+        self.assertEqual(questions["hi"], ["Héllo", "Hey"])
+        self.assertEqual(questions["hey"], ["Hey"])
+        self.assertEqual(len(questions.strings), 2)
+
+    def test_cache_stays_within_budget(self):
+        table = PagedStringTable(cache_bytes=100, directory=self.directory)
+        ids = [table.intern(f"answer number {i:04d}") for i in range(50)]
+        for string_id in ids:
+            table[string_id]
+        self.assertLessEqual(table.stats()["cached_bytes"], 100)
+        table[ids[-1]]
+        self.assertEqual(table.stats()["hits"], 1)
+
+    def test_compaction_moves_to_a_new_file(self):
+        questions = CompactQuestions(strings=PagedStringTable(directory=self.directory))
+        for i in range(3000):
+            questions[f"question {i}"] = [f"answer {i}"]
+        for i in range(2000):
+            del questions[f"question {i}"]
+        self.assertLess(len(questions.strings), 3000)
+        self.assertEqual(questions["question 2500"], ["answer 2500"])
+        self.assertEqual(os.listdir(self.directory), [os.path.basename(questions.strings.path)])
+
+        questions.strings.close()
+        self.assertEqual(os.listdir(self.directory), [])
+
+
+class TestTriviaQuestion(unittest.TestCase):
+    def test_reads_like_a_dict(self):
+        item = {'question': 'What is 2+2?', 'options': ['1', '2', '3', '4'], 'correct_answer': '4'}
+        trivia = TriviaQuestion.from_mapping(item)
+        self.assertEqual(trivia['options'].index(trivia['correct_answer']), 3)
+        self.assertEqual(trivia, item)
+        self.assertIn(item, [trivia])
+        self.assertEqual(json.loads(json.dumps(trivia.to_dict())), item)
+        with self.assertRaises(KeyError):
+            trivia['missing']
+
+
+class TestMemoryReport(unittest.TestCase):
+    def test_compact_is_smaller(self):
+        questions = CompactQuestions({f"where is room {i}?": ["Building A", "Ask reception"] for i in range(500)})
+        trivia = [TriviaQuestion(f"Q{i}?", ["Yes", "No", "Maybe", "Never"], "Yes") for i in range(50)]
+        report = memory_report(questions, trivia)
+        self.assertEqual(report["questions"], 500)
+        self.assertLess(report["after"]["questions_bytes"], report["before"]["questions_bytes"])
+        self.assertLess(report["after"]["trivia_bytes"], report["before"]["trivia_bytes"])
+
+    def test_deep_sizeof_counts_shared_strings_once(self):
+        text = "x" * 100
+        self.assertLess(deep_sizeof([text, text]), deep_sizeof([text, text], share_strings=False))
+
+
+if __name__ == '__main__':
+    unittest.main()
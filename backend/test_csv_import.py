@@ -0,0 +1,134 @@
+import io
+import os
+import tempfile
+import unittest
+
+from csv_import import (ImportJob, ImportJobs, StagedImport, expand_import_paths, find_conflicts,
+                        row_records, stage_csv_file)
+
+
+def parse(data, on_error="skip", **limits):
+    job = ImportJob("test.csv", on_error)
+    staged = StagedImport(job, chunk_size=16, **limits)
+    ok = staged.parse(io.BytesIO(data.encode('utf-8') if isinstance(data, str) else data))
+    return ok, job, staged
+
+
+class TestStagedImport(unittest.TestCase):
+    def test_stages_valid_rows(self):
+        ok, job, staged = parse("question,answer1,answer2\nHello ,Hi, \nBye,See you,Later\n")
+        with staged:
+            self.assertTrue(ok)
+            rows = [row for batch in staged.batches(1) for row in batch]
+        self.assertEqual(rows, [("hello", ["Hi"]), ("bye", ["See you", "Later"])])
+        self.assertEqual((job.rows_read, job.rows_staged, job.error_count), (2, 2, 0))
+        self.assertGreater(job.bytes_read, 0)
+
+    def test_reports_row_errors(self):
+        data = "question,answer1\nok,yes\n,orphan\nno answer,\n,\nx,y,extra\n"
+        ok, job, staged = parse(data)
+        staged.close()
+        self.assertTrue(ok)
+        # Extra cells past the header are ignored
+        self.assertEqual(job.rows_staged, 2)
+        self.assertEqual([e["row"] for e in job.errors], [3, 4])
+        self.assertEqual(job.errors[0]["error"], "Missing question")
+
+        ok, job, staged = parse(data, on_error="reject")
+        staged.close()
+        self.assertFalse(ok)
+        self.assertEqual(job.status, "failed")
+        self.assertEqual(job.error_count, 2)
+
+    def test_fatal_errors(self):
+        ok, job, staged = parse("q,a\nx,y\n")
+        staged.close()
+        self.assertFalse(ok)
+        self.assertEqual(job.message, "Missing required headers")
+
+        ok, job, staged = parse(b"question,answer1\nok,\xff\xfe\n")
+        staged.close()
+        self.assertFalse(ok)
+        self.assertEqual(job.message, "File is not valid UTF-8")
+
+        ok, job, staged = parse("question,answer1\n" + "q,a\n" * 100, max_bytes=64)
+        staged.close()
+        self.assertFalse(ok)
+        self.assertIn("byte limit", job.message)
+
+        ok, job, staged = parse("question,answer1\n" + "q,a\n" * 10, max_rows=5)
+        staged.close()
+        self.assertFalse(ok)
+        self.assertIn("row limit", job.message)
+
+    def test_records(self):
+        ok, job, staged = parse("question,answer1\nA,1\n")
+        with staged:
+            self.assertEqual(list(staged.records()),
+                             [{"op": "set_question", "question": "a", "answers": ["1"]}])
+
+
+class TestMultiFileImport(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.paths = []
+        for name, body in [("b.csv", "question,answer1\nShared,from b\n"),
+                           ("a.csv", "question,answer1\nShared,from a\nOnly a,yes\n"),
+                           ("notes.txt", "ignored")]:
+            path = os.path.join(self.tmpdir.name, name)
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(body)
+            self.paths.append(path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_expand_import_paths(self):
+        a, b = os.path.join(self.tmpdir.name, "a.csv"), os.path.join(self.tmpdir.name, "b.csv")
+        self.assertEqual(expand_import_paths([self.tmpdir.name]), [a, b])
+        self.assertEqual(expand_import_paths([b, os.path.join(self.tmpdir.name, "*.csv")]), [b, a])
+
+    def test_stage_and_find_conflicts(self):
+        staged = []
+        for path in expand_import_paths([self.tmpdir.name]):
+            job, staging_path = stage_csv_file(path)
+            self.assertEqual(job.status, "staged")
+            staged.append(StagedImport(job, staging_path=staging_path))
+        try:
+            self.assertEqual([(q, os.path.basename(source)) for q, source in find_conflicts(staged)],
+                             [("shared", "b.csv")])
+            self.assertEqual([q for q, _ in find_conflicts(staged[:1], existing={"shared": ["known"]})],
+                             ["shared"])
+        finally:
+            for s in staged:
+                s.close()
+        self.assertFalse(any(os.path.exists(s.staging_path) for s in staged))
+
+    def test_stage_missing_file(self):
+        job, staging_path = stage_csv_file(os.path.join(self.tmpdir.name, "missing.csv"))
+        self.assertIsNone(staging_path)
+        self.assertEqual(job.status, "failed")
+
+    def test_row_records(self):
+        self.assertEqual(row_records("q", ["a", "b"], "merge"),
+                         [{"op": "add_question", "question": "q", "answer": "a"},
+                          {"op": "add_question", "question": "q", "answer": "b"}])
+        self.assertEqual(row_records("q", ["a"]), [{"op": "set_question", "question": "q", "answers": ["a"]}])
+
+
+class TestImportJobs(unittest.TestCase):
+    def test_keeps_recent_jobs(self):
+        jobs = ImportJobs(max_jobs=2)
+        created = []
+        for i in range(3):
+            job = ImportJob(f"{i}.csv")
+            job.finish("applied")
+            jobs.add(job)
+            created.append(job)
+        self.assertIsNone(jobs.get(created[0].id))
+        self.assertIs(jobs.get(created[2].id), created[2])
+        self.assertEqual(len(jobs.list()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
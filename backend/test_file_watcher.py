@@ -0,0 +1,54 @@
+import os
+import tempfile
+import unittest
+
+from file_watcher import FileWatcher
+
+
+class TestFileWatcher(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "questions.csv")
+        self.write("a")
+        self.calls = []
+        self.watcher = FileWatcher({self.path: self.calls.append}, interval=0)
+
+    def tearDown(self):
+        self.watcher.close()
+        self.tmpdir.cleanup()
+
+    def write(self, text):
+        with open(self.path, 'w') as f:
+            f.write(text)
+
+    def test_reports_change_once_settled(self):
+        self.assertEqual(self.watcher.poll(), [])
+        self.write("ab")
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.watcher.poll(), [self.path])
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.calls, [self.path])
+
+    def test_refresh_skips_own_writes(self):
+        self.write("abc")
+        self.watcher.poll()
+        self.watcher.refresh(self.path)
+        self.assertEqual(self.watcher.poll(), [])
+        self.assertEqual(self.calls, [])
+
+    def test_ignores_deleted_file_and_counts_failures(self):
+        os.remove(self.path)
+        self.watcher.poll()
+        self.assertEqual(self.watcher.poll(), [])
+
+        def fail(path):
+            raise ValueError("bad file")
+        watcher = FileWatcher({self.path: fail}, interval=0)
+        self.write("new")
+        watcher.poll()
+        watcher.poll()
+        self.assertEqual(watcher.stats()["failures"], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+from intents import IntentRouter
+
+
+class TestIntentRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.active = False
+        self.router = IntentRouter()
+        self.router.register("time", lambda query: "time", phrases=("time?", "What's the time?"))
+        self.router.register("weather", lambda query: "weather", patterns=(r"(is it|will it) rain(ing)?\??",))
+        self.router.register("greeting", lambda query: "greeting", patterns=(r"(hi|hello)( there)?",))
+        self.router.register("game", lambda query: query.upper(), when=lambda: self.active)
+
+    def test_exact_phrase(self):
+        self.assertEqual(self.router.route("what's the time?", "What's the time?"), "time")
+
+    def test_patterns_map_to_their_intent(self):
+        self.assertEqual(self.router.route("will it rain?", "will it rain?"), "weather")
+        self.assertEqual(self.router.route("hello there", "hello there"), "greeting")
+
+    def test_conditional_intent(self):
+        self.assertIsNone(self.router.route("b", "b"))
+        self.active = True
+        self.assertEqual(self.router.route("b", "b"), "B")
+
+    def test_hit_counters(self):
+        self.router.route("time?", "time?")
+        self.router.route("time?", "time?")
+        hits = {intent["name"]: intent["hits"] for intent in self.router.stats()}
+        self.assertEqual(hits["time"], 2)
+        self.assertEqual(hits["weather"], 0)
+
+    def test_duplicate_registration(self):
+        with self.assertRaises(ValueError):
+            self.router.register("time", lambda query: None)
+
+if __name__ == "__main__":
+    unittest.main()
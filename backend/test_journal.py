@@ -0,0 +1,47 @@
+import os
+import tempfile
+import unittest
+from journal import Journal
+
+
+class TestJournal(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "kb.journal")
+
+    def tearDown(self):
+        self.tempdir.cleanup()
+
+    def test_append_and_replay(self):
+        journal = Journal(self.path, sync_policy="always")
+        journal.append({"op": "add_question", "question": "q", "answer": "a"})
+        journal.append({"op": "remove_question", "question": "q"})
+        journal.close()
+        records = list(Journal(self.path, sync_policy="none").replay())
+        self.assertEqual([r["op"] for r in records], ["add_question", "remove_question"])
+
+    def test_replay_skips_torn_record(self):
+        with open(self.path, "w", encoding="utf-8") as f:
+            f.write('{"op": "remove_question", "question": "q"}\n{"op": "add_que')
+        records = list(Journal(self.path, sync_policy="none").replay())
+        self.assertEqual(len(records), 1)
+
+    def test_compaction_rotates_file(self):
+        journal = Journal(self.path, sync_policy="none", compact_threshold=10)
+        journal.append({"op": "remove_question", "question": "first"})
+        self.assertTrue(journal.needs_compaction())
+        self.assertTrue(journal.begin_compaction())
+        self.assertFalse(journal.begin_compaction())
+        journal.append({"op": "remove_question", "question": "second"})
+        self.assertEqual([r["question"] for r in journal.replay()], ["first", "second"])
+        journal.finish_compaction()
+        self.assertEqual([r["question"] for r in journal.replay()], ["second"])
+        journal.close()
+
+    def test_invalid_sync_policy(self):
+        with self.assertRaises(ValueError):
+            Journal(self.path, sync_policy="sometimes")
+
+if __name__ == "__main__":
+    unittest.main()
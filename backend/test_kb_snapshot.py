@@ -0,0 +1,62 @@
+import os
+import tempfile
+import unittest
+
+from kb_snapshot import KBSnapshot, SnapshotQuestions, compile_snapshot
+from normalizer import Normalizer
+
+
+class TestKBSnapshot(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, "questions.kb")
+        self.questions = {
+            "what is your name?": ["I am a chatbot.", "Call me bot."],
+            "how are you?": ["Fine, thanks."],
+            "où est la gare?": ["Tout droit."],
+        }
+        self.trivia = [{'question': 'What is 2+2?', 'options': ['1', '2', '3', '4'], 'correct_answer': '4'}]
+        self.normalizer = Normalizer()
+        compile_snapshot(self.questions, self.trivia, self.path, self.normalizer)
+        self.snapshot = KBSnapshot(self.path)
+
+    def tearDown(self):
+        self.snapshot.close()
+        self.tmpdir.cleanup()
+
+    def test_roundtrip(self):
+        self.assertEqual(len(self.snapshot), 3)
+        for key, answers in self.questions.items():
+            self.assertEqual(self.snapshot.get_answers(key), answers)
+        self.assertIsNone(self.snapshot.get_answers("missing"))
+        self.assertEqual(sorted(self.snapshot.keys()), sorted(self.questions))
+        self.assertEqual(self.snapshot.trivia(), self.trivia)
+
+    def test_canonical_lookup(self):
+        key = self.snapshot.canonical_key(self.normalizer("What's your name"))
+        self.assertEqual(key, "what is your name?")
+        self.assertIsNone(self.snapshot.canonical_key("unknown"))
+
+    def test_rejects_other_files(self):
+        bad = os.path.join(self.tmpdir.name, "bad.kb")
+        with open(bad, 'wb') as f:
+            f.write(b"\0" * 128)
+        with self.assertRaises(ValueError):
+            KBSnapshot(bad)
+
+    def test_overlay_edits(self):
+        questions = SnapshotQuestions(self.snapshot)
+        questions["new question"] = ["New answer."]
+        questions["how are you?"] = ["Great."]
+        del questions["what is your name?"]
+
+        self.assertEqual(len(questions), 3)
+        self.assertEqual(questions["how are you?"], ["Great."])
+        self.assertNotIn("what is your name?", questions)
+        self.assertEqual(sorted(questions), sorted(["how are you?", "new question", "où est la gare?"]))
+        # The mapped file is never modified
+        self.assertEqual(self.snapshot.get_answers("what is your name?"), self.questions["what is your name?"])
+
+
+if __name__ == '__main__':
+    unittest.main()
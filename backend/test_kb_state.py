@@ -0,0 +1,57 @@
+import unittest
+
+from compact_store import CompactQuestions
+from kb_state import KBState
+
+
+class TestKBState(unittest.TestCase):
+    def setUp(self):
+        self.kb = KBState(1, CompactQuestions({"hi": ["Hello"], "bye": ["Goodbye"]}), ["trivia"])
+
+    def test_edit_leaves_published_state_alone(self):
+        draft = self.kb.edit()
+        draft.store_answer("hi", "Hey")
+        draft.store_answers("new", ["Answer"])
+        draft.delete("bye")
+        draft.trivia.append("more trivia")
+
+        self.assertEqual(draft.version, 2)
+        self.assertEqual(dict(draft.questions), {"hi": ["Hello", "Hey"], "new": ["Answer"]})
+        self.assertEqual(dict(self.kb.questions), {"hi": ["Hello"], "bye": ["Goodbye"]})
+        self.assertEqual(self.kb.trivia, ["trivia"])
+
+    def test_edit_records_added_and_removed_keys(self):
+        draft = self.kb.edit()
+        draft.store_answers("new", ["Answer"])
+        draft.delete("bye")
+        draft.store_answer("bye", "Back again")
+        draft.store_answers("gone", ["Soon"])
+        draft.delete("gone")
+        self.assertEqual(draft.added, {"new"})
+        self.assertEqual(draft.removed, set())
+
+    def test_change_records_replay_the_edit(self):
+        draft = self.kb.edit()
+        draft.store_answer("hi", "Hey")
+        draft.store_answer("hi", "Hey")
+        draft.delete("bye")
+        draft.store_answers("new", ["Answer"])
+        records = draft.change_records(self.kb)
+        self.assertCountEqual(records, [
+            {"op": "remove_question", "question": "bye"},
+            {"op": "set_question", "question": "hi", "answers": ["Hello", "Hey"]},
+            {"op": "set_question", "question": "new", "answers": ["Answer"]}
+        ])
+
+        kb = KBState(1, CompactQuestions(), [])
+        trivia = {"question": "2+2?", "options": ["3", "4", "5", "6"], "correct_answer": "4"}
+        draft = kb.edit()
+        draft.trivia.append(trivia)
+        self.assertEqual(draft.change_records(kb), [{"op": "add_trivia", "trivia": trivia}])
+        replaced = draft.edit()
+        replaced.trivia = [dict(trivia)]
+        self.assertEqual(replaced.change_records(draft), [{"op": "set_trivia", "trivia": [trivia]}])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,77 @@
+import json
+import unittest
+
+from kb_state import KBState
+from list_pages import ListPages, decode_cursor, etag, not_modified
+
+
+def kb_with(version, questions, trivia=()):
+    return KBState(version, {question: ["answer"] for question in questions},
+                   [{"question": question} for question in trivia])
+
+
+class TestListPages(unittest.TestCase):
+    def setUp(self):
+        self.pages = ListPages()
+
+    def read(self, name, kb, **options):
+        return json.loads(self.pages.get(name, kb, **options))
+
+    def test_whole_list_keeps_kb_order(self):
+        kb = kb_with(3, ["b", "a"])
+        self.assertEqual(self.pages.get("questions", kb), b'{"kb_version":3,"questions":["b","a"]}\n')
+        self.assertEqual(etag("e", kb.version), '"e-3"')
+
+    def test_cursor_walks_sorted_pages(self):
+        kb = kb_with(1, ["delta", "alpha", "charlie", "bravo", "echo"])
+        first = self.read("questions", kb, limit=2)
+        self.assertEqual((first["questions"], first["total"]), (["alpha", "bravo"], 5))
+        second = self.read("questions", kb, cursor=first["next_cursor"], limit=2)
+        self.assertEqual(second["questions"], ["charlie", "delta"])
+        last = self.read("questions", kb, cursor=second["next_cursor"], limit=2)
+        self.assertEqual((last["questions"], last["next_cursor"]), (["echo"], None))
+
+    def test_cursor_survives_edits(self):
+        kb = kb_with(1, ["alpha", "bravo", "charlie", "delta"])
+        first = self.read("questions", kb, limit=2)
+        # The last item served is removed and one is added before the cursor
+        kb = kb_with(2, ["aardvark", "alpha", "charlie", "delta"])
+        second = self.read("questions", kb, cursor=first["next_cursor"], limit=2)
+        self.assertEqual(second["questions"], ["charlie", "delta"])
+
+    def test_duplicate_trivia_across_pages(self):
+        kb = kb_with(1, [], trivia=["same", "same", "same", "zz"])
+        first = self.read("trivia_questions", kb, limit=2)
+        second = self.read("trivia_questions", kb, cursor=first["next_cursor"], limit=2)
+        self.assertEqual(first["trivia_questions"] + second["trivia_questions"], ["same", "same", "same", "zz"])
+
+    def test_filter_ignores_case(self):
+        kb = kb_with(1, ["What is Python", "who are you", "python version"])
+        self.assertEqual(self.read("questions", kb, query="PYTHON")["questions"],
+                         ["What is Python", "python version"])
+
+    def test_pages_are_cached_per_version(self):
+        kb = kb_with(1, ["a"])
+        body = self.pages.get("questions", kb, limit=10)
+        self.assertIs(self.pages.get("questions", kb, limit=10), body)
+        self.pages.get("questions", kb_with(2, ["a"]), limit=10)
+        self.assertEqual(self.pages.stats()["invalidations"], 1)
+
+    def test_bad_paging_is_refused(self):
+        kb = kb_with(1, ["a"])
+        with self.assertRaises(ValueError):
+            self.pages.get("questions", kb, limit=0)
+        with self.assertRaises(ValueError):
+            self.pages.get("questions", kb, cursor="not a cursor")
+        with self.assertRaises(ValueError):
+            decode_cursor("WzEsMV0")  # [1,1]
+
+    def test_not_modified(self):
+        self.assertTrue(not_modified('"x-1", "e-3"', '"e-3"'))
+        self.assertTrue(not_modified("*", '"e-3"'))
+        self.assertFalse(not_modified('"e-2"', '"e-3"'))
+        self.assertFalse(not_modified(None, '"e-3"'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,22 @@
+import unittest
+from normalizer import Normalizer
+
+
+class TestNormalizer(unittest.TestCase):
+
+    def test_punctuation_and_whitespace(self):
+        normalize = Normalizer()
+        self.assertEqual(normalize("  What is   the library?!"), normalize("what is library"))
+
+    def test_unicode_and_contractions(self):
+        normalize = Normalizer()
+        self.assertEqual(normalize("Whatʼs the café’s address?"), "what is cafe s address")
+        self.assertEqual(normalize("I can't log in"), "i cannot log in")
+        self.assertEqual(normalize("They don't open"), "they do not open")
+
+    def test_stopwords_configurable(self):
+        self.assertEqual(Normalizer(remove_stopwords=False)("Hi, the library"), "hi the library")
+        self.assertEqual(Normalizer()("the"), "the")
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,61 @@
+import threading
+import unittest
+from persistence import BackgroundWriter
+
+
+class TestBackgroundWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.saves = []
+        self.lock = threading.Lock()
+
+    def saver(self, kind):
+        def save():
+            with self.lock:
+                self.saves.append(kind)
+            return True
+        return save
+
+    def test_burst_is_coalesced(self):
+        writer = BackgroundWriter({"questions": self.saver("questions")}, debounce=0.05)
+        for _ in range(100):
+            version = writer.mark_dirty("questions")
+        self.assertTrue(writer.wait_for(version, timeout=5))
+        self.assertEqual(self.saves, ["questions"])
+        writer.close()
+
+    def test_flush_skips_debounce(self):
+        writer = BackgroundWriter({"questions": self.saver("questions"), "trivia": self.saver("trivia")},
+                                  debounce=60, max_delay=60)
+        writer.mark_dirty("questions")
+        writer.mark_dirty("trivia")
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(sorted(self.saves), ["questions", "trivia"])
+        self.assertEqual(writer.last_persisted_version, 2)
+        writer.close()
+
+    def test_failed_save_is_not_reported_persisted(self):
+        writer = BackgroundWriter({"questions": lambda: False}, debounce=0.01)
+        version = writer.mark_dirty("questions")
+        self.assertFalse(writer.wait_for(version, timeout=0.2))
+        self.assertGreater(writer.stats()["failures"], 0)
+        writer.close(timeout=0.1)
+
+    def test_waits_for_kb_versions(self):
+        writer = BackgroundWriter({"questions": self.saver("questions")}, debounce=60, max_delay=60)
+        writer.mark_dirty("questions", 7)
+        self.assertFalse(writer.wait_for(7, timeout=0.05))
+        self.assertTrue(writer.flush(timeout=5))
+        self.assertEqual(writer.last_persisted_version, 7)
+        # Later versions marked nothing, so they have nothing left to save
+        self.assertTrue(writer.wait_for(9, timeout=0))
+        writer.close()
+
+    def test_unknown_kind(self):
+        writer = BackgroundWriter({}, debounce=0.01)
+        with self.assertRaises(ValueError):
+            writer.mark_dirty("questions")
+        writer.close()
+
+if __name__ == "__main__":
+    unittest.main()
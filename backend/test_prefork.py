@@ -0,0 +1,162 @@
+import io
+import os
+import tempfile
+import threading
+import time
+import unittest
+from multiprocessing import Pipe
+
+from app import ChatBot
+from compact_store import CompactQuestions
+from csv_import import ImportJobs
+from kb_state import KBState
+from prefork import SharedImportJobs, Writer, WriterClient
+from test_app import ChatBotTestCase
+from trivia_sessions import TriviaSessions
+
+
+class FakeWriterBot:
+    """The parts of ChatBot the writer uses: edits publish and notify listeners"""
+
+    def __init__(self):
+        self.kb = KBState(5, CompactQuestions({"hi": ["Hello"]}), [])
+        self.kb_lock = threading.RLock()
+        self.change_listeners = []
+        self.normalizer = None
+        self.trivia_sessions = TriviaSessions()
+        self.import_jobs = ImportJobs()
+
+    def add_question(self, question, answer):
+        with self.kb_lock:
+            previous = self.kb
+            kb = previous.edit()
+            kb.store_answer(question, answer)
+            self.kb = kb
+            for listener in self.change_listeners:
+                listener(kb.version, kb.change_records(previous))
+        return True
+
+
+class FakeReplica:
+    def __init__(self, version):
+        self.kb = KBState(version, CompactQuestions({"hi": ["Hello"]}), [])
+
+    def apply_changes(self, version, records):
+        kb = self.kb.edit()
+        for record in records:
+            kb.store_answers(record["question"], record["answers"])
+        kb.version = version
+        self.kb = kb
+
+
+class TestPrefork(unittest.TestCase):
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.bot = FakeWriterBot()
+        self.writer = Writer(self.bot, os.path.join(self.dir.name, "workers.kb"))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def start_worker(self, worker_id):
+        requests, worker_requests = Pipe()
+        worker_changes, changes = Pipe(duplex=False)
+        version = self.writer.subscribe(worker_id, changes)
+        threading.Thread(target=self.writer.serve, args=(requests,), daemon=True).start()
+        replica = FakeReplica(version)
+        client = WriterClient(replica, worker_requests, worker_changes, timeout=5)
+        threading.Thread(target=client.follow, daemon=True).start()
+        return replica, client
+
+    def test_subscribe_compiles_the_snapshot_once_per_version(self):
+        self.assertEqual(self.writer.subscribe(0, Pipe(duplex=False)[1]), 5)
+        mtime = os.path.getmtime(self.writer.snapshot_path)
+        self.writer.subscribe(1, Pipe(duplex=False)[1])
+        self.assertEqual(os.path.getmtime(self.writer.snapshot_path), mtime)
+        self.assertEqual(self.writer.snapshot_version, 5)
+
+    def test_edit_through_one_worker_reaches_every_worker(self):
+        first, first_client = self.start_worker(0)
+        second, _ = self.start_worker(1)
+        self.assertTrue(first_client.call("add_question", "bye", "Goodbye"))
+        # The caller reads its own write as soon as the call returns
+        self.assertEqual(first.kb.version, 6)
+        self.assertEqual(first.kb.questions["bye"], ["Goodbye"])
+        self.assertEqual(self.bot.kb.questions["bye"], ["Goodbye"])
+
+        with first_client.applied:
+            first_client.applied.wait_for(lambda: second.kb.version == 6, 5)
+        self.assertEqual(second.kb.questions["bye"], ["Goodbye"])
+
+    def test_writer_errors_are_raised_in_the_worker(self):
+        _, client = self.start_worker(0)
+        with self.assertRaises(RuntimeError):
+            client.call("compact_journal")
+
+
+class TestSessionsAcrossWorkers(ChatBotTestCase):
+    """Per-caller state reached from two workers of one real writer"""
+
+    def setUp(self):
+        super().setUp()
+        self.writer = Writer(self.bot, "workers.kb")
+        self.workers = [self.start_worker(worker_id) for worker_id in range(2)]
+
+    def start_worker(self, worker_id):
+        requests, worker_requests = Pipe()
+        worker_changes, changes = Pipe(duplex=False)
+        self.writer.subscribe(worker_id, changes)
+        threading.Thread(target=self.writer.serve, args=(requests,), daemon=True).start()
+        worker = ChatBot()
+        worker.primary = WriterClient(worker, worker_requests, worker_changes, timeout=5)
+        worker.import_jobs = SharedImportJobs(worker.primary, interval=0.01)
+        threading.Thread(target=worker.primary.follow, daemon=True).start()
+        return worker
+
+    def wait_until(self, condition):
+        deadline = time.monotonic() + 5
+        while not condition():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.001)
+
+    def test_trivia_started_on_one_worker_is_played_on_another(self):
+        first, second = self.workers
+        sid = "a" * 32
+        with first.trivia_session(sid):
+            self.assertEqual(first.answer_question("trivia")["type"], "trivia_start")
+        self.assertTrue(self.bot.trivia_sessions.get(sid).active)
+        self.wait_until(lambda: sid in second.primary.trivia_in_play)
+        with second.trivia_session(sid):
+            self.assertEqual(second.trivia_total, 0)
+            self.assertEqual(second.answer_question("A")["type"], "trivia_answer")
+        with first.trivia_session(sid):
+            self.assertEqual(first.trivia_total, 1)
+            self.assertEqual(first.answer_question("trivia")["type"], "trivia_end")
+        self.wait_until(lambda: sid not in second.primary.trivia_in_play)
+        # Other sessions are answered without asking the writer
+        with second.trivia_session("b" * 32):
+            self.assertEqual(second.answer_question("when does the gym open?")["response"], "At 6am.")
+        self.assertEqual(self.bot.trivia_session_stats()["active_games"], 0)
+        self.assertNotIn("b" * 32, second.trivia_sessions)
+
+    def test_new_workers_learn_the_games_in_play(self):
+        first, _ = self.workers
+        with first.trivia_session("a" * 32):
+            first.answer_question("trivia")
+        third = self.start_worker(2)
+        self.wait_until(lambda: "a" * 32 in third.primary.trivia_in_play)
+
+    def test_import_jobs_are_listed_by_every_worker(self):
+        first, second = self.workers
+        job = first.import_questions_stream(io.BytesIO(b"question,answer1\nAre bikes allowed?,Yes.\n"),
+                                            source="bikes.csv")
+        self.assertEqual(job.status, "applied")
+        # Reported when it started, and again once it finished
+        self.assertIsNotNone(second.import_jobs.get(job.id))
+        self.wait_until(lambda: second.import_jobs.get(job.id).to_dict()["status"] == "applied")
+        self.assertEqual([report["source"] for report in second.import_jobs.list()], ["bikes.csv"])
+        self.assertIsNone(second.import_jobs.get("missing"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,40 @@
+import unittest
+from unittest.mock import patch
+from query_cache import QueryCache
+
+
+class TestQueryCache(unittest.TestCase):
+
+    def test_hit_and_miss(self):
+        cache = QueryCache(max_size=2)
+        self.assertIsNone(cache.get("q", 0))
+        cache.put("q", 0, ("q", {}))
+        self.assertEqual(cache.get("q", 0), ("q", {}))
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+
+    def test_version_invalidates(self):
+        cache = QueryCache()
+        cache.put("q", 0, ("q", {}))
+        self.assertIsNone(cache.get("q", 1))
+        self.assertEqual(cache.invalidations, 1)
+        self.assertEqual(len(cache), 0)
+
+    def test_lru_eviction(self):
+        cache = QueryCache(max_size=2)
+        cache.put("a", 0, 1)
+        cache.put("b", 0, 2)
+        cache.get("a", 0)
+        cache.put("c", 0, 3)
+        self.assertIsNone(cache.get("b", 0))
+        self.assertEqual(cache.get("a", 0), 1)
+        self.assertEqual(cache.evictions, 1)
+
+    def test_ttl_expiry(self):
+        cache = QueryCache(ttl=10)
+        with patch("query_cache.time.monotonic", return_value=100):
+            cache.put("q", 0, 1)
+        with patch("query_cache.time.monotonic", return_value=111):
+            self.assertIsNone(cache.get("q", 0))
+
+if __name__ == "__main__":
+    unittest.main()
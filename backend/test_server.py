@@ -0,0 +1,119 @@
+import io
+import unittest
+
+from server import MAX_BATCH_SIZE, create_app
+from test_app import ChatBotTestCase
+
+
+class ServerTestCase(ChatBotTestCase):
+    """The Flask routes over a real ChatBot"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = create_app(self.bot).test_client()
+
+
+class TestAskBatch(ServerTestCase):
+    def test_answers_in_order(self):
+        response = self.client.post("/api/ask/batch", json={"questions": ["when does the gym open?", "where is the libary?"]})
+        self.assertEqual(response.status_code, 200)
+        data = response.get_json()
+        self.assertEqual(data["count"], 2)
+        self.assertEqual([answer["response"] for answer in data["answers"]], ["At 6am.", "In the main building."])
+
+    def test_trivia_in_a_batch_plays_the_callers_game(self):
+        first = self.client.post("/api/ask/batch", json={"questions": ["trivia"]},
+                                 headers={"X-Session-Id": "a" * 32})
+        self.assertEqual(first.get_json()["answers"][0]["type"], "trivia_start")
+        self.assertFalse(self.bot.default_trivia_game.active)
+        # Another caller's batch is still answered from the KB
+        other = self.client.post("/api/ask/batch", json={"questions": ["when does the gym open?"]},
+                                 headers={"X-Session-Id": "b" * 32})
+        self.assertEqual(other.get_json()["answers"][0]["response"], "At 6am.")
+        # And the first caller's next batch answers its game
+        answer = self.client.post("/api/ask/batch", json={"questions": ["A"]},
+                                  headers={"X-Session-Id": "a" * 32})
+        self.assertIn(answer.get_json()["answers"][0]["type"], ("trivia_answer", "trivia_final_result"))
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post("/api/ask/batch", json={"questions": "hi"}).status_code, 400)
+        response = self.client.post("/api/ask/batch", json={"questions": ["hi"] * (MAX_BATCH_SIZE + 1)})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Too many questions", response.get_json()["error"])
+
+
+class TestSessions(ServerTestCase):
+    def test_sessions_are_only_kept_once_trivia_starts(self):
+        for _ in range(3):
+            response = self.client.post("/api/ask", json={"question": "when does the gym open?"})
+            self.assertNotIn("X-Session-Id", response.headers)
+            self.assertNotIn("Set-Cookie", response.headers)
+        self.assertEqual(len(self.bot.trivia_sessions), 0)
+        response = self.client.post("/api/trivia/start", json={"num_questions": 1})
+        sid = response.headers["X-Session-Id"]
+        self.assertIn(f"chatbot_session={sid}", response.headers["Set-Cookie"])
+        self.assertEqual(len(self.bot.trivia_sessions), 1)
+        self.assertTrue(self.client.get("/api/trivia/status").get_json()["active"])
+
+
+class TestUpload(ServerTestCase):
+    def upload(self, data, query=""):
+        return self.client.post(f"/api/upload{query}", data=data.encode(), content_type="text/csv")
+
+    def test_conflict_policy_applies_to_a_single_file(self):
+        data = "question,answer1\nWhen does the gym open?,At 7am.\n"
+        self.assertEqual(self.upload(data, "?conflict=merge").status_code, 200)
+        self.assertEqual(self.bot.questions["when does the gym open?"], ["At 6am.", "At 7am."])
+        self.assertEqual(self.upload(data, "?conflict=last-wins").status_code, 200)
+        self.assertEqual(self.bot.questions["when does the gym open?"], ["At 7am."])
+
+    def test_reject_refuses_questions_already_known(self):
+        version = self.bot.kb_version
+        response = self.upload("question,answer1\nAre bikes allowed?,Yes.\nWhen does the gym open?,At 7am.\n",
+                               "?conflict=reject")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("when does the gym open?", response.get_json()["details"])
+        self.assertEqual(self.bot.kb_version, version)
+        self.assertNotIn("are bikes allowed?", self.bot.questions)
+
+        response = self.client.post("/api/upload?conflict=reject", data={
+            "file": [(io.BytesIO(b"question,answer1\nAre bikes allowed?,Yes.\n"), "a.csv"),
+                     (io.BytesIO(b"question,answer1\nwhere is the library?,Here.\n"), "b.csv")]
+        }, content_type="multipart/form-data")
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.get_json()["import"]["conflicts"],
+                         [{"question": "where is the library?", "source": "b.csv"}])
+        self.assertNotIn("are bikes allowed?", self.bot.questions)
+
+    def test_invalid_rows_are_skipped_unless_rejected(self):
+        data = "question,answer1\nAre bikes allowed?,Yes.\n,No question.\n"
+        response = self.upload(data)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["import"]["error_count"], 1)
+        self.assertEqual(self.bot.questions["are bikes allowed?"], ["Yes."])
+        self.bot.remove_question("are bikes allowed?")
+        self.assertEqual(self.upload(data, "?on_error=reject").status_code, 400)
+        self.assertNotIn("are bikes allowed?", self.bot.questions)
+
+    def test_extra_columns_are_ignored(self):
+        response = self.upload("question,answer1\nAre bikes allowed?,Yes.,internal note\n")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.bot.questions["are bikes allowed?"], ["Yes."])
+
+
+class TestPersistence(ServerTestCase):
+    def test_flush_waits_for_the_version_an_edit_returned(self):
+        self.bot.enable_background_writer(debounce=0.01)
+        self.addCleanup(self.bot.writer.close)
+        response = self.client.post("/api/question/add", json={"question": "Are bikes allowed?", "answer": "Yes."})
+        version = response.get_json()["kb_version"]
+        self.assertEqual(version, self.bot.kb_version)
+        response = self.client.post("/api/persistence/flush", json={"version": version, "timeout": 5})
+        self.assertEqual(response.get_json()["status"], "persisted")
+        self.assertGreaterEqual(response.get_json()["last_persisted_version"], version)
+        with open("questions.csv", encoding="utf-8") as f:
+            self.assertIn("are bikes allowed?", f.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
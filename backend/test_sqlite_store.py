@@ -0,0 +1,59 @@
+import os
+import tempfile
+import unittest
+from sqlite_store import SQLiteStore
+
+
+class TestSQLiteStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tempdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tempdir.name, "kb.db")
+        self.store = SQLiteStore(self.path)
+
+    def tearDown(self):
+        self.store.close()
+        self.tempdir.cleanup()
+
+    def test_apply_records(self):
+        self.assertTrue(self.store.is_empty())
+        self.store.apply_many([
+            {"op": "add_question", "question": "what is ai?", "answer": "One"},
+            {"op": "add_question", "question": "what is ai?", "answer": "Two"},
+            {"op": "set_question", "question": "who are you?", "answers": ["A bot"]},
+            {"op": "remove_question", "question": "who are you?"}
+        ])
+        self.assertEqual(self.store.load_questions(), {"what is ai?": ["One", "Two"]})
+
+    def test_failed_transaction_rolls_back(self):
+        with self.assertRaises(ValueError):
+            self.store.apply_many([
+                {"op": "set_question", "question": "q", "answers": ["a"]},
+                {"op": "bogus"}
+            ])
+        self.assertIsNone(self.store.get_answers("q"))
+
+    def test_full_text_search(self):
+        self.store.apply_many([
+            {"op": "set_question", "question": "where is the library?", "answers": ["North"]},
+            {"op": "set_question", "question": "where can i park?", "answers": ["Lot B"]}
+        ])
+        results = self.store.search("library where", k=5)
+        self.assertEqual(results[0][0], "where is the library?")
+
+    def test_changes_seen_by_other_connection(self):
+        other = SQLiteStore(self.path)
+        other.has_external_changes()
+        seq = other.last_change()
+        self.store.apply({"op": "set_question", "question": "q", "answers": ["a"]})
+        self.store.apply({"op": "add_trivia", "trivia": {
+            "question": "t?", "options": ["a", "b", "c", "d"], "correct_answer": "a"}})
+        self.assertTrue(other.has_external_changes())
+        latest, questions, trivia_changed = other.changes_since(seq)
+        self.assertGreater(latest, seq)
+        self.assertEqual(questions, {"q"})
+        self.assertTrue(trivia_changed)
+        other.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from suggest_index import SuggestIndex
+
+
+class TestSuggestIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = SuggestIndex()
+        self.index.build(["where is the library?", "what is ai?", "where can i park?", "who are you?"])
+
+    def test_complete_prefix(self):
+        self.assertEqual(self.index.complete("where"), ["where can i park?", "where is the library?"])
+        self.assertEqual(self.index.complete("wh", limit=1), ["what is ai?"])
+        self.assertEqual(self.index.complete("zzz"), [])
+
+    def test_popularity_weighting(self):
+        weights = {"where is the library?": 5}
+        self.assertEqual(self.index.complete("where", weights=weights)[0], "where is the library?")
+
+    def test_incremental_add_remove(self):
+        self.index.add("where is the gym?")
+        self.assertIn("where is the gym?", self.index.complete("where is"))
+        self.assertTrue(self.index.remove("where can i park?"))
+        self.assertFalse(self.index.remove("where can i park?"))
+        self.assertEqual(self.index.complete("where"), ["where is the gym?", "where is the library?"])
+
+    def test_remove_deletes_in_place(self):
+        keys = self.index.keys
+        completed = self.index.complete("where")
+        self.assertTrue(self.index.remove("where can i park?"))
+        self.assertIs(self.index.keys, keys)
+        self.assertEqual(keys, ["what is ai?", "where is the library?", "who are you?"])
+        # Results already handed out are copies
+        self.assertEqual(completed, ["where can i park?", "where is the library?"])
+
+if __name__ == "__main__":
+    unittest.main()
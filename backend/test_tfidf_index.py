@@ -0,0 +1,46 @@
+import unittest
+from tfidf_index import TfidfIndex, tokenize
+
+
+class TestTfidfIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TfidfIndex()
+        self.index.build([
+            "where is the library?",
+            "when does the cafeteria open?",
+            "how do i reset my password?"
+        ])
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Where's the Library?"), ["where", "s", "the", "library"])
+
+    def test_query_best_match(self):
+        key, score = self.index.query("library location, where is it")
+        self.assertEqual(key, "where is the library?")
+        self.assertGreater(score, 0.5)
+
+    def test_query_below_threshold(self):
+        key, score = self.index.query("the", threshold=0.9)
+        self.assertIsNone(key)
+
+    def test_query_unknown_terms(self):
+        self.assertEqual(self.index.query("zebra"), (None, 0.0))
+
+    def test_stopwords_alone_do_not_match(self):
+        self.assertEqual(self.index.query("where is it?"), (None, 0.0))
+        self.assertEqual(self.index.query("where is the gym?"), (None, 0.0))
+
+    def test_unknown_words_lower_the_score(self):
+        _, known = self.index.query("reset my password")
+        _, partly = self.index.query("reset my phone")
+        self.assertLess(partly, 0.5)
+        self.assertGreater(known, partly)
+
+    def test_query_many_keeps_order(self):
+        results = self.index.query_many(["reset password", "cafeteria open"])
+        self.assertEqual([key for key, _ in results],
+                         ["how do i reset my password?", "when does the cafeteria open?"])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,77 @@
+import unittest
+
+from trivia_sessions import TriviaGame, TriviaSessions, new_session_id, valid_session_id
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTriviaSessions(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.sessions = TriviaSessions(ttl=60, max_sessions=3, clock=self.clock)
+
+    def test_each_session_has_its_own_game(self):
+        alice = self.sessions.get("alice")
+        alice.active = True
+        alice.score = 2
+        self.assertIs(self.sessions.get("alice"), alice)
+        self.assertFalse(self.sessions.get("bob").active)
+        self.assertIsNone(self.sessions.get("carol", create=False))
+
+    def test_game_state_moves_between_games(self):
+        alice = self.sessions.get("alice")
+        alice.active = True
+        alice.remaining = ["q1", "q2"]
+        copy = self.sessions.get("bob")
+        copy.restore(alice.state())
+        self.assertEqual(copy.state(), alice.state())
+        self.assertIsNot(copy.remaining, alice.remaining)
+        self.assertEqual(self.sessions.active_ids(), ["alice", "bob"])
+        copy.restore(None)
+        self.assertFalse(copy.active)
+        self.assertEqual(self.sessions.active_ids(), ["alice"])
+
+    def test_added_games_keep_the_first_one(self):
+        alice = TriviaGame("alice")
+        self.assertIs(self.sessions.add(alice), alice)
+        self.assertIs(self.sessions.add(TriviaGame("alice")), alice)
+        self.assertIn("alice", self.sessions)
+        self.assertEqual(self.sessions.stats()["created"], 1)
+
+    def test_idle_sessions_expire(self):
+        self.sessions.get("alice")
+        self.clock.now = 30
+        self.sessions.get("bob")
+        self.clock.now = 70
+        # Touching bob keeps him; alice has been idle past the TTL
+        self.sessions.get("bob")
+        self.assertIsNone(self.sessions.get("alice", create=False))
+        self.assertEqual(self.sessions.stats()["expired"], 1)
+        self.clock.now = 200
+        self.assertEqual(self.sessions.expire(), 1)
+        self.assertEqual(len(self.sessions), 0)
+
+    def test_least_recently_used_session_is_evicted_at_the_cap(self):
+        for name in ("alice", "bob", "carol"):
+            self.sessions.get(name)
+        self.sessions.get("alice")
+        self.sessions.get("dave")
+        self.assertIsNone(self.sessions.get("bob", create=False))
+        self.assertIsNotNone(self.sessions.get("alice", create=False))
+        self.assertEqual(self.sessions.stats()["evicted"], 1)
+
+    def test_session_ids(self):
+        self.assertTrue(valid_session_id(new_session_id()))
+        self.assertNotEqual(new_session_id(), new_session_id())
+        for bad in (None, "", "short", "x" * 65, "has spaces in it, too many"):
+            self.assertFalse(valid_session_id(bad))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,30 @@
+import unittest
+from typo_index import TypoIndex, edit_distance
+
+
+class TestTypoIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.index = TypoIndex(max_edit_distance=2)
+        self.index.add("where is the library?")
+        self.index.add("where is the cafeteria?")
+
+    def test_edit_distance(self):
+        self.assertEqual(edit_distance("libary", "library", 2), 1)
+        self.assertEqual(edit_distance("abc", "xyz", 1), 2)
+
+    def test_lookup_corrects_typos(self):
+        self.assertEqual(self.index.lookup("wher is the libary?"), ("where is the library?", 2))
+
+    def test_lookup_respects_max_distance(self):
+        self.assertEqual(self.index.lookup("wher is teh libary?"), (None, None))
+
+    def test_remove_drops_unused_words(self):
+        self.assertTrue(self.index.remove("where is the library?"))
+        self.assertNotIn("library", self.index.word_counts)
+        self.assertIn("where", self.index.word_counts)
+        self.assertEqual(self.index.lookup("where is the libary"), (None, None))
+        self.assertTrue(all(self.index.deletes.values()))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,112 @@
+import math
+
+import numpy as np
+from scipy import sparse
+
+from normalizer import MATCH_STOPWORDS
+from tokenizer import tokenize
+
+
+class TfidfIndex:
+    """TF-IDF vectors for the question keys, scored with sparse matrix products.
+
+    The matrix is stored term-major (terms x questions) so a query only
+    touches the posting rows of its own terms instead of every question.
+    Stopwords are left out on both sides, and query words the index has
+    never seen still count towards the query's norm, so a question only
+    scores high when its topic words match.
+    """
+
+    def __init__(self, stopwords=MATCH_STOPWORDS):
+        self.stopwords = frozenset(stopwords)
+        self.keys = []
+        self.vocabulary = {}
+        self.idf = np.zeros(0, dtype=np.float32)
+        self.unknown_idf = 1.0
+        self.term_matrix = sparse.csr_matrix((0, 0), dtype=np.float32)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def build(self, keys):
+        self.keys = list(keys)
+        self.vocabulary = {}
+        rows, cols = [], []
+        for row, key in enumerate(self.keys):
+            for token in self._terms(key):
+                col = self.vocabulary.setdefault(token, len(self.vocabulary))
+                rows.append(row)
+                cols.append(col)
+
+        n_docs, n_terms = len(self.keys), len(self.vocabulary)
+        counts = sparse.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)),
+            shape=(n_docs, n_terms)
+        )
+        counts.sum_duplicates()
+
+        df = np.bincount(counts.indices, minlength=n_terms)
+        self.idf = (np.log((1 + n_docs) / (1 + df)) + 1).astype(np.float32)
+
+        weighted = counts.multiply(self.idf).tocsr()
+        norms = np.sqrt(np.asarray(weighted.multiply(weighted).sum(axis=1)).ravel())
+        norms[norms == 0] = 1
+        weighted = sparse.diags(1 / norms).dot(weighted)
+
+        self.term_matrix = weighted.T.tocsr().astype(np.float32)
+        # What a word in no question weighs (document frequency 0)
+        self.unknown_idf = math.log(1 + n_docs) + 1
+
+    def _terms(self, text):
+        return [token for token in tokenize(text) if token not in self.stopwords]
+
+    def _query_matrix(self, texts):
+        rows, cols, data = [], [], []
+        for row, text in enumerate(texts):
+            counts = {}
+            unknown = {}
+            for token in self._terms(text):
+                col = self.vocabulary.get(token)
+                if col is not None:
+                    counts[col] = counts.get(col, 0) + 1
+                else:
+                    unknown[token] = unknown.get(token, 0) + 1
+            if not counts:
+                continue
+            weights = {col: count * self.idf[col] for col, count in counts.items()}
+            norm = math.sqrt(sum(w * w for w in weights.values()) +
+                             sum((count * self.unknown_idf) ** 2 for count in unknown.values()))
+            for col, weight in weights.items():
+                rows.append(row)
+                cols.append(col)
+                data.append(weight / norm)
+        return sparse.csr_matrix(
+            (np.asarray(data, dtype=np.float32), (rows, cols)),
+            shape=(len(texts), len(self.vocabulary))
+        )
+
+    def query(self, text, threshold=0.0):
+        """Return (key, score) of the closest question, or (None, 0.0)"""
+        return self.query_many([text], threshold)[0]
+
+    def query_many(self, texts, threshold=0.0):
+        """Score a batch of queries in one sparse product"""
+        if not texts:
+            return []
+        if not self.keys:
+            return [(None, 0.0)] * len(texts)
+
+        scores = self._query_matrix(texts).dot(self.term_matrix).tocsr()
+        results = []
+        for row in range(scores.shape[0]):
+            start, end = scores.indptr[row], scores.indptr[row + 1]
+            if start == end:
+                results.append((None, 0.0))
+                continue
+            best = start + int(np.argmax(scores.data[start:end]))
+            score = float(scores.data[best])
+            if score < threshold:
+                results.append((None, score))
+            else:
+                results.append((self.keys[scores.indices[best]], score))
+        return results
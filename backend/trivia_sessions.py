@@ -0,0 +1,159 @@
+import re
+import secrets
+import threading
+import time
+from collections import OrderedDict
+
+# Client-supplied session ids must look like the ones new_session_id() makes
+SESSION_ID_PATTERN = re.compile(r"[A-Za-z0-9_-]{16,64}")
+
+
+def new_session_id():
+    return secrets.token_urlsafe(18)
+
+
+def valid_session_id(session_id):
+    return bool(session_id) and SESSION_ID_PATTERN.fullmatch(session_id) is not None
+
+
+class TriviaGame:
+    """One player's trivia game. Hold `lock` while reading or changing it."""
+
+    __slots__ = ("session_id", "active", "score", "total", "current", "remaining", "last_seen", "lock")
+
+    def __init__(self, session_id=None):
+        self.session_id = session_id
+        self.active = False
+        self.score = 0
+        self.total = 0
+        self.current = None
+        self.remaining = []
+        self.last_seen = 0.0
+        self.lock = threading.Lock()
+
+    def reset(self):
+        self.active = False
+        self.score = 0
+        self.total = 0
+        self.current = None
+        self.remaining = []
+
+    def state(self):
+        """The game as plain values, to hand to another process"""
+        return {"active": self.active, "score": self.score, "total": self.total,
+                "current": self.current, "remaining": list(self.remaining)}
+
+    def restore(self, state):
+        """Take on a state() from elsewhere; None is a game not in play"""
+        if state is None:
+            self.reset()
+            return
+        self.active = state["active"]
+        self.score = state["score"]
+        self.total = state["total"]
+        self.current = state["current"]
+        self.remaining = list(state["remaining"])
+
+
+class TriviaSessions:
+    """Trivia games by session id, expired after ttl seconds idle.
+
+    Sessions are kept in an OrderedDict in least recently used order. With
+    one idle TTL for everyone that is also expiry order, so expired sessions
+    are always at the front and are dropped in O(1) each as lookups pass by;
+    past max_sessions the least recently used session goes first. The
+    registry lock only covers the dict operations; games are played under
+    their own lock, so players never wait on each other.
+    """
+
+    def __init__(self, ttl=1800, max_sessions=50000, clock=time.monotonic):
+        if max_sessions < 1:
+            raise ValueError("max_sessions must be at least 1")
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.clock = clock
+        self.sessions = OrderedDict()
+        self.lock = threading.Lock()
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def __contains__(self, session_id):
+        return session_id in self.sessions
+
+    def get(self, session_id, create=True):
+        """The game for session_id, created if needed (else None)"""
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
+            game = self.sessions.get(session_id)
+            if game is not None:
+                self.sessions.move_to_end(session_id)
+            elif create:
+                game = self._insert(TriviaGame(session_id))
+            if game is not None:
+                game.last_seen = now
+            return game
+
+    def add(self, game):
+        """Keep game under its session id; returns the game kept, which is an
+        earlier one if the session was added meanwhile"""
+        now = self.clock()
+        with self.lock:
+            self._expire(now)
+            kept = self.sessions.get(game.session_id)
+            if kept is None:
+                kept = self._insert(game)
+            else:
+                self.sessions.move_to_end(game.session_id)
+            kept.last_seen = now
+            return kept
+
+    def _insert(self, game):
+        self.sessions[game.session_id] = game
+        self.created += 1
+        while len(self.sessions) > self.max_sessions:
+            self.sessions.popitem(last=False)
+            self.evicted += 1
+        return game
+
+    def active_ids(self):
+        """Ids of the sessions with a game in play"""
+        with self.lock:
+            return [session_id for session_id, game in self.sessions.items() if game.active]
+
+    def remove(self, session_id):
+        with self.lock:
+            return self.sessions.pop(session_id, None) is not None
+
+    def expire(self):
+        """Drop idle sessions now; returns how many went"""
+        with self.lock:
+            return self._expire(self.clock())
+
+    def _expire(self, now):
+        count = 0
+        sessions = self.sessions
+        while sessions:
+            game = sessions[next(iter(sessions))]
+            if now - game.last_seen <= self.ttl:
+                break
+            sessions.popitem(last=False)
+            count += 1
+        self.expired += count
+        return count
+
+    def stats(self):
+        with self.lock:
+            return {
+                "sessions": len(self.sessions),
+                "active_games": sum(1 for game in self.sessions.values() if game.active),
+                "max_sessions": self.max_sessions,
+                "ttl": self.ttl,
+                "created": self.created,
+                "expired": self.expired,
+                "evicted": self.evicted
+            }
@@ -0,0 +1,161 @@
+import sys
+
+from tokenizer import tokenize
+
+
+def edit_distance(a, b, limit):
+    """Levenshtein distance between a and b, or limit + 1 once it is exceeded"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous = list(range(len(b) + 1))
+    for i, ca in enumerate(a, 1):
+        current = [i]
+        for j, cb in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ca != cb)))
+        if min(current) > limit:
+            return limit + 1
+        previous = current
+    return previous[-1]
+
+
+def delete_variants(word, max_distance):
+    """All strings reachable from word by deleting up to max_distance characters"""
+    variants = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        next_frontier = set()
+        for variant in frontier:
+            if len(variant) > 1:
+                for i in range(len(variant)):
+                    next_frontier.add(variant[:i] + variant[i + 1:])
+        variants |= next_frontier
+        frontier = next_frontier
+    return variants
+
+
+class TypoIndex:
+    """Symmetric-delete (SymSpell) spelling correction over question keys.
+
+    Every word used in a key is indexed under its delete variants, so a
+    misspelled query word is corrected with a handful of dict lookups. The
+    corrected phrase is then resolved to a key through the phrase table.
+    Lookups only use single dict and set operations, so they may run while
+    another thread adds or removes keys.
+    """
+
+    def __init__(self, max_edit_distance=2, prefix_length=7):
+        self.max_edit_distance = max_edit_distance
+        self.prefix_length = prefix_length
+        self.word_counts = {}
+        self.deletes = {}
+        self.phrases = {}
+
+    def __len__(self):
+        return len(self.phrases)
+
+    def _variants(self, word):
+        return delete_variants(word[:self.prefix_length], self.max_edit_distance)
+
+    def add(self, key):
+        tokens = tokenize(key)
+        if not tokens:
+            return
+        phrase = " ".join(tokens)
+        if phrase in self.phrases:
+            return
+        self.phrases[phrase] = key
+
+        for word in set(tokens):
+            count = self.word_counts.get(word, 0)
+            self.word_counts[word] = count + 1
+            if count == 0:
+                for variant in self._variants(word):
+                    self.deletes.setdefault(variant, set()).add(word)
+
+    def remove(self, key):
+        phrase = " ".join(tokenize(key))
+        if self.phrases.get(phrase) != key:
+            return False
+        del self.phrases[phrase]
+
+        for word in set(phrase.split()):
+            count = self.word_counts[word] - 1
+            if count:
+                self.word_counts[word] = count
+                continue
+            del self.word_counts[word]
+            for variant in self._variants(word):
+                words = self.deletes[variant]
+                words.discard(word)
+                if not words:
+                    del self.deletes[variant]
+        return True
+
+    def correct_word(self, word, max_distance):
+        """Return (closest known word, distance), or (None, max_distance + 1)"""
+        if word in self.word_counts:
+            return word, 0
+
+        # Widen the search one delete level at a time and stop as soon as a
+        # candidate at least as close as the next level has been found
+        best, best_distance = None, max_distance + 1
+        seen = set()
+        frontier = {word[:self.prefix_length]}
+        for level in range(max_distance + 1):
+            candidates = set()
+            for variant in frontier:
+                candidates |= self.deletes.get(variant, set())
+            for candidate in candidates - seen:
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                if distance < best_distance or (
+                        distance == best_distance and
+                        self.word_counts.get(candidate, 0) > self.word_counts.get(best, 0)):
+                    best, best_distance = candidate, distance
+            seen |= candidates
+            if best_distance <= level + 1:
+                break
+            frontier = {v[:i] + v[i + 1:] for v in frontier if len(v) > 1 for i in range(len(v))}
+        return best, best_distance
+
+    def lookup(self, query):
+        """Return (key, total edit distance) of the matching question, or (None, None)"""
+        tokens = tokenize(query)
+        if not tokens:
+            return None, None
+
+        budget = self.max_edit_distance
+        corrected = []
+        for token in tokens:
+            word, distance = self.correct_word(token, budget)
+            if word is None:
+                return None, None
+            budget -= distance
+            corrected.append(word)
+
+        key = self.phrases.get(" ".join(corrected))
+        if key is None:
+            return None, None
+        return key, self.max_edit_distance - budget
+
+    def memory_usage(self):
+        """Approximate bytes held by the precomputed structures"""
+        deletes_bytes = sys.getsizeof(self.deletes) + sum(
+            sys.getsizeof(variant) + sys.getsizeof(words) for variant, words in self.deletes.items()
+        )
+        words_bytes = sys.getsizeof(self.word_counts) + sum(
+            sys.getsizeof(word) for word in self.word_counts
+        )
+        phrases_bytes = sys.getsizeof(self.phrases) + sum(
+            sys.getsizeof(phrase) for phrase in self.phrases
+        )
+        return {
+            "words": len(self.word_counts),
+            "delete_entries": len(self.deletes),
+            "phrases": len(self.phrases),
+            "deletes_bytes": deletes_bytes,
+            "words_bytes": words_bytes,
+            "phrases_bytes": phrases_bytes,
+            "total_bytes": deletes_bytes + words_bytes + phrases_bytes
+        }
@@ -1,6 +1,24 @@
 import React, { useState, useEffect, useRef } from "react";
 import "./App.css";
 
+// Chat channel served by the backend's ASGI mode (python app.py --serve asgi)
+const CHAT_URL = "ws://localhost:5040/api/chat";
+
+// HTTP routes used for channel messages while the channel is not connected
+const CHAT_ROUTES = {
+  ask: "http://localhost:5040/api/ask",
+  trivia_start: "http://localhost:5040/api/trivia/start",
+  trivia_answer: "http://localhost:5040/api/trivia/answer",
+  trivia_end: "http://localhost:5040/api/trivia/end"
+};
+
+// Reply fields the channel pushes as events of their own instead
+const PUSHED_FIELDS = {
+  current_question: "trivia_question",
+  next_question: "trivia_question",
+  final_result: "trivia_over"
+};
+
 function App() {
   const [input, setInput] = useState("");
   const [messages, setMessages] = useState([]);
@@ -22,6 +40,9 @@ function App() {
   const messagesEndRef = useRef(null);
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploadStatus, setUploadStatus] = useState("");
+  const socketRef = useRef(null);
+  const pendingRef = useRef(new Map());
+  const nextIdRef = useRef(1);
 
   const getCurrentTimestamp = () => {
     const now = new Date();
@@ -41,11 +62,114 @@ function App() {
       timestamp: getCurrentTimestamp()
     }]);
     fetchQuestionList();
+    return connectChat();
   }, []);
 
+  // One WebSocket carries chat and trivia messages; it reconnects after a
+  // drop, and until it is open messages go over plain HTTP instead
+  const connectChat = () => {
+    let closed = false;
+    let retryTimer = null;
+    let retryDelay = 1000;
+    let current = null;
+    const connect = () => {
+      const socket = new WebSocket(CHAT_URL);
+      current = socket;
+      socket.onopen = () => {
+        if (closed) return;
+        socketRef.current = socket;
+        retryDelay = 1000;
+      };
+      socket.onmessage = (event) => {
+        const frame = JSON.parse(event.data);
+        const pending = pendingRef.current.get(frame.id);
+        if (pending) {
+          pendingRef.current.delete(frame.id);
+          pending.resolve({ ok: frame.status === 200, data: frame.data });
+        } else {
+          handlePush(frame);
+        }
+      };
+      socket.onclose = () => {
+        if (socketRef.current === socket) {
+          socketRef.current = null;
+          pendingRef.current.forEach(pending => pending.reject(new Error("Connection lost")));
+          pendingRef.current.clear();
+        }
+        // Back off while the server is down or serves HTTP only
+        if (!closed) {
+          retryTimer = setTimeout(connect, retryDelay);
+          retryDelay = Math.min(retryDelay * 2, 60000);
+        }
+      };
+    };
+    connect();
+    return () => {
+      closed = true;
+      clearTimeout(retryTimer);
+      current.close();
+    };
+  };
+
+  // Send a channel message; resolves to { ok, data } with data as the HTTP route returns it
+  const callChat = async (type, payload = {}) => {
+    const socket = socketRef.current;
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      const id = nextIdRef.current++;
+      return new Promise((resolve, reject) => {
+        pendingRef.current.set(id, { resolve, reject });
+        socket.send(JSON.stringify({ id, type, ...payload }));
+      });
+    }
+
+    const res = await fetch(CHAT_ROUTES[type], {
+      method: "POST",
+      credentials: "include",
+      headers: { "Content-Type": "application/json" },
+      body: JSON.stringify(payload)
+    });
+    const data = await res.json();
+    // Deliver the pushed parts the way the channel would: after the reply
+    const events = [];
+    if (res.ok) {
+      Object.keys(PUSHED_FIELDS).forEach(field => {
+        if (data[field]) {
+          events.push({ type: PUSHED_FIELDS[field], data: data[field] });
+          delete data[field];
+        }
+      });
+    }
+    setTimeout(() => events.forEach(handlePush), 0);
+    return { ok: res.ok, data };
+  };
+
+  const handlePush = (event) => {
+    if (event.type === "trivia_question") {
+      setTriviaStatus(prev => ({ ...prev, active: true, currentQuestion: event.data }));
+      setMessages(prev => [...prev, {
+        sender: "bot",
+        text: formatTriviaQuestion(event.data),
+        isTrivia: true,
+        tab: "trivia",
+        timestamp: getCurrentTimestamp()
+      }]);
+    } else if (event.type === "trivia_over") {
+      const percentage = (event.data.score / event.data.total * 100).toFixed(1);
+      setMessages(prev => [...prev, {
+        sender: "bot",
+        text: `🎉 Game Over! Final score: ${event.data.score}/${event.data.total} (${percentage}%) - ${event.data.message}`,
+        isTrivia: true,
+        tab: "trivia",
+        timestamp: getCurrentTimestamp()
+      }]);
+      setTriviaStatus(prev => ({ ...prev, active: false, currentQuestion: null }));
+    }
+  };
+
   const fetchQuestionList = async () => {
     try {
-      const res = await fetch("http://localhost:5040/api/question/list");
+      // Revalidates with the list's ETag; an unchanged list comes back as a 304
+      const res = await fetch("http://localhost:5040/api/question/list", { cache: "no-cache" });
       const data = await res.json();
       if (data.questions) {
         setQuestionList(data.questions);
@@ -78,20 +202,15 @@ function App() {
       let response;
       
       if (triviaStatus.active && activeTab === "trivia") {
-        const res = await fetch("http://localhost:5040/api/trivia/answer", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ answer: input })
-        });
-        
-        if (!res.ok) throw new Error("Failed to process trivia answer");
-        const data = await res.json();
+        const { ok, data } = await callChat("trivia_answer", { answer: input });
+        if (!ok) throw new Error("Failed to process trivia answer");
         
+        // The next question (or the final result) is pushed right after this reply
         setTriviaStatus(prev => ({
           ...prev,
           score: data.score,
           total: data.total,
-          currentQuestion: data.next_question || null
+          currentQuestion: null
         }));
         
         // Create response message
@@ -105,36 +224,9 @@ function App() {
         
         // Add response to messages
         setMessages(prev => [...prev, response]);
-        
-        // Handle next question or game end
-        if (data.next_question) {
-          setMessages(prev => [...prev, {
-            sender: "bot",
-            text: formatTriviaQuestion(data.next_question),
-            isTrivia: true,
-            tab: "trivia",
-            timestamp: getCurrentTimestamp()
-          }]);
-        } else if (data.final_result) {
-          const percentage = (data.final_result.score / data.final_result.total * 100).toFixed(1);
-          setMessages(prev => [...prev, {
-            sender: "bot",
-            text: `🎉 Game Over! Final score: ${data.final_result.score}/${data.final_result.total} (${percentage}%) - ${data.final_result.message}`,
-            isTrivia: true,
-            tab: "trivia",
-            timestamp: getCurrentTimestamp()
-          }]);
-          setTriviaStatus(prev => ({ ...prev, active: false }));
-        }
       } else {
-        const res = await fetch("http://localhost:5040/api/ask", {
-          method: "POST",
-          headers: { "Content-Type": "application/json" },
-          body: JSON.stringify({ question: input })
-        });
-        
-        if (!res.ok) throw new Error("Failed to get response");
-        const data = await res.json();
+        const { ok, data } = await callChat("ask", { question: input });
+        if (!ok) throw new Error("Failed to get response");
         
         response = {
           sender: "bot",
@@ -175,20 +267,15 @@ function App() {
     setError("");
     
     try {
-      const res = await fetch("http://localhost:5040/api/trivia/start", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-        body: JSON.stringify({ num_questions: numQuestions }),
-      });
-      
-      if (!res.ok) throw new Error("Failed to start trivia");
-      const data = await res.json();
+      const { ok, data } = await callChat("trivia_start", { num_questions: numQuestions });
+      if (!ok) throw new Error("Failed to start trivia");
       
+      // The first question is pushed right after this reply
       setTriviaStatus({
         active: data.game_active,
         score: data.score,
         total: data.total,
-        currentQuestion: data.current_question
+        currentQuestion: null
       });
       
       setMessages(prev => [...prev, {
@@ -197,12 +284,6 @@ function App() {
         isTrivia: true,
         tab: "trivia",
         timestamp: getCurrentTimestamp()
-      }, {
-        sender: "bot",
-        text: formatTriviaQuestion(data.current_question),
-        isTrivia: true,
-        tab: "trivia",
-        timestamp: getCurrentTimestamp()
       }]);
       
       // Switch to trivia tab if not already there
@@ -225,14 +306,8 @@ function App() {
   const endTrivia = async () => {
     setIsLoading(true);
     try {
-      const res = await fetch("http://localhost:5040/api/trivia/end", {
-        method: "POST",
-        headers: { "Content-Type": "application/json" },
-      });
-      
-      const data = await res.json();
-      
-      if (!res.ok) throw new Error(data.error || "Failed to end trivia");
+      const { ok, data } = await callChat("trivia_end");
+      if (!ok) throw new Error(data.error || "Failed to end trivia");
       
       setTriviaStatus({
         active: false,